@@ -1,45 +1,177 @@
 import os
 import time
+import threading
 import numpy as np
 import ursina
 
 from include.camera import PlayerCamera
-from include.player import Player
+from include.player import PlayerManager, INPUT_MAPS
 from include.shaders import ShaderCollection
 from include.entities import FloatingFollower, EnemyManager
 from include.projectiles import ProjectileManager
 from include.portals import PortalManager
-from include.buttons import ButtonManager
-
-from panda3d.core import ShaderBuffer, GeomEnums
+from include.buttons import ButtonManager, PLATE
+from include.collision import CollisionField
+from include.navigation import FlowField
+from include.sight import LineOfSight
+from include.kernels import resolve_walls, apply_damage, teleport
+from include.scheduler import Stage, StageScheduler
+from include.packing import byte_report
+from include.render_state import RenderState, buffer_key
+from include.metrics import MetricsRecorder, MetricsServer
+from include.sampler import SamplingProfiler
+from include.memory import AllocationTracker, GCPolicy
+from include.resolution import ResolutionController, OffscreenCanvas
+from include.netcode import SnapshotServer, SnapshotClient, RemoteBuffer
+from include.state import StateRing
+from include.world import ROOM_WALLS, ROOM_PORTALS, ROOM_TRIGGERS, room_bounds
+from include.particles import ParticleSystem
+from include.shared import SharedArrays
+from include.awareness import AwarenessField
+from include.frames import RenderFrame, FrameBuffers, SimulationThread, TickPacer
+
+from panda3d.core import ShaderBuffer, GeomEnums, TransparencyAttrib
 
 def generate_empty_shader_buffer(name, size):
     return ShaderBuffer(name, np.zeros(size, dtype=np.float32).tobytes(), GeomEnums.UH_static)
 
 SHADER_CONFIG = {
     "canvas"        : {"fragment":"canvas.frag",        "vertex":"common.vert"},
+    "particles"     : {"fragment":"particles.frag",     "vertex":"particles.vert"},
+    "awareness"     : {"fragment":"awareness.frag",     "vertex":"common.vert"},
+    "static"        : {"fragment":"static.frag",        "vertex":"common.vert"},
+}
+
+# uniform holding the drawn row count of each sprite buffer
+COUNT_UNIFORMS = {
+    "PlayerData"            : "count",
+    "EnemyData"             : "enemy_count",
+    "PlayerProjectileData"  : "player_projectile_count",
+    "EnemyProjectileData"   : "enemy_projectile_count",
+    "ButtonData"            : "button_count",
 }
 
+# upload sprites as half floats / rgba8 / unorm16 instead of float32
+COMPACT_SSBO = False
+
+# threads used for independent update stages, 1 runs every stage inline
+STAGE_WORKERS = 4
+
+# with a window the simulation runs on its own thread at this tick rate and the
+# render thread only presents the newest completed frame, 0 simulates once per frame
+SIM_TICK_RATE = int(os.environ.get("WIZARDTIME_SIM_TICK_RATE", 60))
+
+# local port for the Prometheus metrics endpoint, 0 disables it
+METRICS_PORT = int(os.environ.get("WIZARDTIME_METRICS_PORT", 0))
+
+# render the canvas offscreen at a scale picked from frame times, upscaled to the window
+DYNAMIC_RESOLUTION = True
+RESOLUTION_MIN_SCALE = 0.5
+
+# keep the cyclic GC out of frames: freeze after start, collect in idle time
+GC_POLICY = True
+
+# attribute allocations to update stages with tracemalloc, slow, instrumentation only
+TRACK_ALLOCATIONS = bool(int(os.environ.get("WIZARDTIME_TRACK_ALLOCATIONS", 0)))
+
+# players on this machine, each takes the next keyboard map in INPUT_MAPS
+LOCAL_PLAYERS = 1
+# random input players for load testing
+BOT_PLAYERS = int(os.environ.get("WIZARDTIME_BOT_PLAYERS", 0))
+MAX_PLAYERS = 64
+
+# enemy update levels, (distance as a multiple of follow range, update interval in ticks),
+# the last level takes everything further, aggroed enemies always update every tick
+ENEMY_LOD_LEVELS = [(1.0, 1), (2.0, 2), (np.inf, 4)]
+
+# hit and death particles alive at once, the oldest are dropped past this
+MAX_PARTICLES = 20000
+
+# enemy awareness and follow ranges drawn over the canvas from a coverage grid baked
+# at this many world units per cell, rebaked once enemies drift past the threshold
+AWARENESS_OVERLAY = True
+AWARENESS_CELL_SIZE = 0.25
+AWARENESS_THRESHOLD = 0.25
+# world units of grid kept around the view, it is recentered once the view moves further
+AWARENESS_SLACK = 4
+
+# the view eases toward the first player at this rate per second, 0 snaps to it
+CAMERA_SMOOTHING = 8
+# world units around the screen whose sprites are still packed for drawing
+CULL_MARGIN = 2
+# size of the static layer bake as a multiple of the view, rebaked when the view leaves it
+STATIC_LAYER_COVERAGE = 1.5
+
+# run headless and stream snapshots to clients on this UDP port, 0 disables it
+SERVER_PORT = int(os.environ.get("WIZARDTIME_SERVER_PORT", 0))
+SERVER_TICK_RATE = 60
+# "host:port" of a server to render instead of simulating locally
+CONNECT = os.environ.get("WIZARDTIME_CONNECT", "")
+
+# snapshots of the full simulation kept for rollback, one saved per tick, 0 disables it
+ROLLBACK_FRAMES = int(os.environ.get("WIZARDTIME_ROLLBACK_FRAMES", 0))
+# hotkey that puts the room back to how it was when the game started
+RESTART_KEY = "f5"
+
+# name of the shared memory segments other processes attach to with
+# include.shared.attach to watch the live simulation arrays, empty disables it
+SHARED_STATE = os.environ.get("WIZARDTIME_SHARED_STATE", "")
+
+# hotkey and duration for the sampling profiler, output goes to ./profiles
+PROFILE_KEY = "f9"
+PROFILE_SECONDS = 5
+
 class Game:
     def __init__(self, *args, **kwargs):
         # self.app = ursina.Ursina(*args, size=ursina.Vec2(2560,1440), **kwargs)
         # self.app = ursina.Ursina(*args, size=ursina.Vec2(1920,1080), **kwargs)
         self.app = ursina.Ursina(*args, size=ursina.Vec2(1280,720), **kwargs)
-        self.start = time.time()
-        self.player = Player(game=self, x=0, y=0)
-        ec = PlayerCamera()
+        # simulation clock, every tick advances it by its dt and all timers run on it
+        self.sim_time = 0.0
+        self.compact_ssbo = COMPACT_SSBO
+        self.server_mode = bool(SERVER_PORT)
+        self.snapshot_server = None
+        self.remote = None
+        if CONNECT:
+            host, port = CONNECT.rsplit(":", 1)
+            self.remote = SnapshotClient((host, int(port)))
+        # managers allocate their backing arrays through this, so it comes first
+        self.shared = SharedArrays(SHARED_STATE) if SHARED_STATE else None
+        # the view culls what managers pack for drawing, so it comes before them, servers draw nothing
+        self.view = None
+        if not self.server_mode:
+            self.view = PlayerCamera(ursina.window.size[0] / ursina.window.size[1], smoothing=CAMERA_SMOOTHING, margin=CULL_MARGIN, bounds=room_bounds(ROOM_WALLS))
+        self.players = PlayerManager(self, max_entities=MAX_PLAYERS)
+        # a server has no keyboard, its players join over the network
+        for i in range(0 if self.server_mode else min(LOCAL_PLAYERS, len(INPUT_MAPS))):
+            self.players.spawn(position=(6 * i, 0), input_map=INPUT_MAPS[i])
+        for i in range(BOT_PLAYERS):
+            self.players.spawn(position=(6 * (i % 8) - 21, 6 * (i // 8 % 5) - 12), bot=True, color=ursina.color.light_gray)
         self.player_projectiles = ProjectileManager(self, "Player")
         self.enemy_projectiles = ProjectileManager(self, "Enemy")
         self.enemies = EnemyManager(self, "Enemy")
-        self.buttons = ButtonManager(self, "Button")
+        self.enemies.lod_levels = ENEMY_LOD_LEVELS
+        self.buttons = ButtonManager(self, "Button", [self.players, self.enemies, self.player_projectiles, self.enemy_projectiles])
         self.portal_manager = PortalManager(self)
-        self.portal_manager.add_portal_pair((15,-15), 6, ursina.color.red, (-15,15), 6, ursina.color.green)
+        for (position1, scale1), (position2, scale2) in ROOM_PORTALS:
+            self.portal_manager.add_portal_pair(position1, scale1, ursina.color.red, position2, scale2, ursina.color.green)
         self.portal_manager.update_ssbo()
 
+        if self.compact_ssbo:
+            SHADER_CONFIG["canvas"]["defines"] = {"COMPACT_SSBO": 1}
         self.shader_collection = ShaderCollection(
             os.path.join(os.path.dirname(__file__), "shaders"),
             SHADER_CONFIG
         )
+        for name, sizes in self.ssbo_byte_report().items():
+            print(f"{name}: {sizes['float_bytes']} bytes float32, {sizes['compact_bytes']} bytes compact")
+
+        # the canvas shader costs pixels x entities, so it renders offscreen
+        # at a scale that follows frame times, headless runs have no window for it
+        self.resolution = ResolutionController(min_scale=RESOLUTION_MIN_SCALE)
+        self.offscreen = None
+        if DYNAMIC_RESOLUTION and self.app.win is not None:
+            self.offscreen = OffscreenCanvas(ursina.window.size)
 
         self.profiler_data = {}
         self.info_display = ursina.Text(text='', position=(-0.85, 0.4), scale=1, color=ursina.color.white, collider=None)
@@ -48,6 +180,18 @@ class Game:
             # "background" : {"color":ursina.color.dark_gray}, 
             "canvas" : {"shader":self.shader_collection.shaders["canvas"], "texture":"assets/wizard.png"},
         }
+        if self.offscreen is not None:
+            shader = self.shader_collection.shaders["canvas"]
+            shader.compile()
+            self.offscreen.card.set_shader(shader._shader)
+            self.offscreen.card.set_texture(loader.loadTexture("assets/wizard.png"))
+            _layers["canvas"] = {"texture":ursina.Texture(self.offscreen.texture, filtering="bilinear")}
+        # the view spans 40 world units vertically, centered on the origin
+        aspect = ursina.window.size[0] / ursina.window.size[1]
+        self.awareness = None
+        if AWARENESS_OVERLAY and self.app.win is not None:
+            self.awareness = AwarenessField((-20 * aspect, -20), (40 * aspect, 40), AWARENESS_CELL_SIZE, AWARENESS_THRESHOLD, AWARENESS_SLACK)
+            _layers["awareness"] = {"shader":self.shader_collection.shaders["awareness"]}
 
         self.layers = {}
         for i, (name, conf) in list(enumerate(_layers.items())):
@@ -58,18 +202,56 @@ class Game:
                 **conf,
             )
             self.layers[name].z = self.layers[name].z - 0.02 * i
+        if self.awareness is not None:
+            overlay = self.layers["awareness"]
+            overlay.set_transparency(TransparencyAttrib.M_alpha)
+            overlay.set_shader_input("awareness_field", self.awareness.create_texture())
+            overlay.set_shader_input("field_origin", ursina.Vec2(*self.awareness.origin))
+            overlay.set_shader_input("field_size", ursina.Vec2(*self.awareness.size))
+            overlay.set_shader_input("screen_size", ursina.window.size)
+
+        # hit and death bursts, drawn as one point pass over the canvas
+        self.particles = ParticleSystem(MAX_PARTICLES)
+        if self.app.win is not None:
+            shader = self.shader_collection.shaders["particles"]
+            shader.compile()
+            self.particles.attach(shader._shader, ursina.scene)
+            self.particles.node.set_shader_input("aspect", ursina.window.size[0] / ursina.window.size[1])
+            self.particles.node.set_shader_input("pixels_per_unit", ursina.window.size[1] / 40)
 
         self.gravity = 0
+        self.collision = None
+        self.flow_field = None
+        self.line_of_sight = None
 
         # textures to be supplied to the shader
         self.textures = {
-            'background_texture'    : "assets/cobble.png",
-            'portal_texture'        : "assets/ball.png",
             'projectile_texture'    : "assets/projectile.png",
             'enemy_texture'         : "assets/enemy.png",
         }
+        self.static_textures = {
+            'background_texture'    : "assets/cobble.png",
+            'portal_texture'        : "assets/ball.png",
+        }
+        # node the canvas shader runs on
+        self.canvas = self.offscreen.card if self.offscreen is not None else self.layers["canvas"]
         for name, tex in self.textures.items():
-            self.layers["canvas"].set_shader_input(name, loader.loadTexture(tex))
+            self.canvas.set_shader_input(name, loader.loadTexture(tex))
+
+        # background, portals and grid only change with the portals, so they are
+        # rendered into a window sized texture on demand and the canvas starts from it
+        self.static_layer = None
+        self.static_state = None
+        self.static_bakes = 0
+        self.static_center = np.zeros(2)
+        if self.app.win is not None:
+            self.static_layer = OffscreenCanvas(ursina.window.size * STATIC_LAYER_COVERAGE, name="static", sort=-20)
+            shader = self.shader_collection.shaders["static"]
+            shader.compile()
+            self.static_layer.card.set_shader(shader._shader)
+            for name, tex in self.static_textures.items():
+                self.static_layer.card.set_shader_input(name, loader.loadTexture(tex))
+            self.static_state = RenderState(self.static_layer.card)
 
         # shader buffers to write to the shader
         # since the ref to a given SSBO can be updated
@@ -79,10 +261,15 @@ class Game:
             "EnemyProjectileData"   : self.enemy_projectiles,
             "PlayerProjectileData"  : self.player_projectiles,
             "EnemyData"             : self.enemies,
-            "PlayerData"            : self.player,
+            "PlayerData"            : self.players,
         }
+        # a client draws what the server sends instead of its own managers
+        if self.remote is not None:
+            self.ssbo_parents = {name: RemoteBuffer(name, self.compact_ssbo) for name in self.ssbo_parents}
+        self.ssbo_parents["ButtonData"] = self.buttons
+        self.render_state = RenderState(self.canvas)
         for name, base in self.ssbo_parents.items():
-            self.layers["canvas"].set_shader_input(name, base.ssbo)
+            self.render_state.set_buffer(name, base)
 
         # calc grid spacing and offset based on screen resolution
 
@@ -90,25 +277,38 @@ class Game:
         grid_offset:float = 0.0
         print(grid_spacing, grid_offset)
 
+        if self.static_state is not None:
+            for key, val in {
+                "screen_size"               : ursina.Vec2(*self.static_layer.window_size),
+                "view_scale"                : STATIC_LAYER_COVERAGE,
+                "grid_spacing"              : grid_spacing,
+                "grid_offset"               : grid_offset,
+                "grid_color"                : ursina.Vec4(1,1,1,1),
+                "portal_count"              : self.portal_manager.max_portal_pairs,
+            }.items():
+                self.static_state.set_input(key, val)
+            self.render_state.set_input("static_layer", self.static_layer.texture)
+            self.render_state.set_input("static_scale", ursina.Vec2(*self.static_layer.texture_scale))
+            self.render_state.set_input("static_coverage", STATIC_LAYER_COVERAGE)
+            portals = self.ssbo_parents["portalData"]
+            self.update_static_layer(self.view.center, (portals.ssbo, buffer_key(portals)))
+
         # general shader data
         for key, val in {
             "screen_size"               : ursina.window.size,
             "background_color"          : ursina.Vec4(0,0,0,0),
-            "grid_spacing"              : grid_spacing,
-            "grid_offset"               : grid_offset,
-            "grid_color"                : ursina.Vec4(1,1,1,1),
-            "count"                     : 1,
-            "portal_count"              : self.portal_manager.max_portal_pairs,
-            "enemy_count"               : np.count_nonzero(self.enemies.used_mask),
+            "count"                     : self.players.active_count,
+            "enemy_count"               : self.enemies.active_count,
             "player_projectile_count"   : 0,
             "enemy_projectile_count"    : 0,    
+            "button_count"              : 0,
         }.items():
-            self.layers["canvas"].set_shader_input(key, val)
-
-        # self.layers["awareness"].set_shader_input("positions", [[0,0,0]])
-        # self.layers["awareness"].set_shader_input("radii", [5])
-        # self.layers["awareness"].set_shader_input("circle_count", 0)
-        # self.layers["awareness"].set_shader_input("screen_size", ursina.window.size)
+            self.render_state.set_input(key, val)
+        # layers may draw before the first frame is published, so they start on the view as it is
+        if self.view is not None:
+            self.set_view_center(self.view.center)
+        if self.offscreen is not None:
+            self.apply_render_scale(self.resolution.scale)
 
         self.game_running = False
         self.paused = False
@@ -123,10 +323,64 @@ class Game:
 
         self.t = 0
         self.tick = 0
+        # tick and sim time, kept in an array so state snapshots can capture them
+        self._clock = np.zeros(2, dtype=np.float64)
+        self.room_state = None
+        self.rollback = None
+        self.stage_scheduler = StageScheduler(self.create_stages(), workers=STAGE_WORKERS)
+        # completed ticks reach the render thread through these, a tick holds the
+        # lock so key handlers and the UI never see a half updated simulation
+        self.sim_lock = threading.RLock()
+        awareness_shape = None if self.awareness is None else self.awareness.coverage.shape
+        self.frames = FrameBuffers(lambda: RenderFrame(MAX_PARTICLES, awareness_shape))
+        self.awareness_bake = -1
+        self.simulation = None
+        if SIM_TICK_RATE and self.app.win is not None and self.remote is None:
+            self.simulation = SimulationThread(self.simulate, SIM_TICK_RATE, self.sim_lock)
+        self.sampling_profiler = SamplingProfiler(
+            self.stage_scheduler.current_stages,
+            thread_prefix=("stage", "simulation"),
+            roots=(StageScheduler._run_stage.__code__,),
+        )
+        self.gc_policy = GCPolicy()
+        self.allocation_tracker = AllocationTracker()
+        if TRACK_ALLOCATIONS:
+            self.enable_allocation_tracking()
+        self.metrics = None
+        self.metrics_server = None
+        if METRICS_PORT:
+            self.metrics = MetricsRecorder()
+            self.metrics_server = MetricsServer(self.metrics, port=METRICS_PORT)
+            print(f"Serving metrics on http://{self.metrics_server.address[0]}:{self.metrics_server.address[1]}/metrics")
         self.create_sliders()
         self.start_game()
         
 
+    def create_stages(self) -> list[Stage]:
+        """Frame update stages in order, with the state each one reads and writes"""
+        stages = [
+            Stage('Player Input', lambda dt: self.read_player_input(), reads=("input",), writes=("player",)),
+            Stage('Player Movement', lambda dt: self.players.handle_movement(dt), writes=("player",)),
+            Stage('Player Projectile', lambda dt: self.players.handle_projectile(self.sim_time, dt), writes=("player", "player_projectiles")),
+            Stage('Player Bounds', lambda dt: self.handle_player_bounds(), reads=("collision",), writes=("player",)),
+            Stage('Flow Field', lambda dt: self.flow_field.update(self.players.positions), reads=("player",), writes=("flow_field",)),
+            Stage('Player Projectiles Update', lambda dt: self.player_projectiles.update(dt), reads=("collision",), writes=("player_projectiles",)),
+            Stage('Enemies Update', lambda dt: self.enemies.update(dt), reads=("player", "flow_field", "collision"), writes=("enemies", "enemy_projectiles", "line_of_sight")),
+            Stage('Enemies Overlap Resolve', lambda dt: self.enemies.resolve_external_overlap(self.players.positions, self.players.scales), reads=("player",), writes=("enemies",)),
+            Stage('Enemy Projectiles Update', lambda dt: self.enemy_projectiles.update(dt), reads=("collision",), writes=("enemy_projectiles",)),
+            Stage('Player Projectile Collisions', lambda dt: self.handle_player_projectile_collisions(), writes=("enemies", "player_projectiles", "particles")),
+            Stage('Enemy Projectile Collisions', lambda dt: self.handle_enemy_projectile_collisions(), reads=("player",), writes=("enemy_projectiles", "particles")),
+            Stage('Portal Collisions', lambda dt: self.handle_portal_collisions_abstract(self.players, self.players.portal_cooldown, 1 / 6), reads=("portals",), writes=("player",)),
+            Stage('Projectile Portal Collisions', lambda dt: self.handle_portal_collisions_abstract(self.player_projectiles), reads=("portals",), writes=("player_projectiles",)),
+            Stage('Enemy Portal Collisions', lambda dt: self.handle_portal_collisions_abstract(self.enemies), reads=("portals",), writes=("enemies",)),
+            Stage('Enemy Projectile Portal Collisions', lambda dt: self.handle_portal_collisions_abstract(self.enemy_projectiles), reads=("portals",), writes=("enemy_projectiles",)),
+            Stage('Triggers', lambda dt: self.handle_triggers(dt), reads=("player", "enemies", "player_projectiles", "enemy_projectiles"), writes=("buttons", "particles")),
+            Stage('Particles', lambda dt: self.particles.update(dt), writes=("particles",)),
+        ]
+        if self.awareness is not None:
+            stages.append(Stage('Awareness Field', lambda dt: self.awareness.update(self.enemies, self.view.center), reads=("enemies",), writes=("awareness",)))
+        return stages
+
     def create_sliders(self):
         """Creates sliders to adjust game parameters."""
         slider_config = [
@@ -158,6 +412,73 @@ class Game:
         b = ursina.Button(text="Show Info", position = (0.45, 0.45), scale=(0.2, 0.04))
         b.on_click = self.toggle_info
 
+    def input(self, key):
+        # handlers touch live simulation state, so they wait out the tick in flight
+        with self.sim_lock:
+            if key == PROFILE_KEY:
+                self.start_profiling()
+            elif key == RESTART_KEY:
+                self.restart_room()
+
+    def state_sources(self) -> list:
+        """Everything a StateRing has to capture for a tick to be replayed"""
+        return [self, self.players, self.enemies, self.player_projectiles, self.enemy_projectiles, self.portal_manager, self.buttons]
+
+    def state_arrays(self) -> list:
+        return [self._clock]
+
+    def state_saving(self) -> None:
+        self._clock[:] = (self.tick, self.sim_time)
+
+    def state_restored(self) -> None:
+        self.tick = int(self._clock[0])
+        self.sim_time = float(self._clock[1])
+        for manager in (self.players, self.enemies, self.player_projectiles, self.enemy_projectiles, self.portal_manager, self.buttons):
+            manager.update_ssbo()
+
+    def save_state(self, ring:StateRing) -> int:
+        return ring.save(self.tick)
+
+    def restore_state(self, ring:StateRing, tick:int) -> bool:
+        """Rolls the simulation back to `tick`, False if the ring no longer holds it"""
+        slot = ring.find(tick)
+        if slot is None:
+            return False
+        self.restore_slot(ring, slot)
+        return True
+
+    def restart_room(self) -> None:
+        if self.room_state is not None:
+            self.restore_slot(self.room_state, 0)
+
+    def restore_slot(self, ring:StateRing, slot:int) -> None:
+        # restores land outside update, shared state readers must still see them as a frame
+        if self.shared is not None:
+            self.shared.begin_frame()
+        ring.restore(slot)
+        if self.shared is not None:
+            self.shared.end_frame(self.tick, self.sim_time)
+
+    def start_profiling(self, duration:float = PROFILE_SECONDS) -> bool:
+        """Samples the frame loop for `duration` seconds, writes folded stacks and a summary"""
+        started = self.sampling_profiler.start(duration)
+        if started:
+            print(f"Profiling for {duration}s")
+        return started
+
+    def enable_allocation_tracking(self) -> None:
+        """Per stage tracemalloc accounting, stages run serially while it is on"""
+        self.allocation_tracker.start()
+        if self.allocation_tracker not in self.stage_scheduler.hooks:
+            self.stage_scheduler.hooks.append(self.allocation_tracker)
+        self.stage_scheduler.serial = True
+
+    def disable_allocation_tracking(self) -> None:
+        if self.allocation_tracker in self.stage_scheduler.hooks:
+            self.stage_scheduler.hooks.remove(self.allocation_tracker)
+        self.allocation_tracker.stop()
+        self.stage_scheduler.serial = False
+
     def toggle_sliders(self):
         self.show_sliders = not self.show_sliders
         if self.show_sliders:
@@ -178,93 +499,84 @@ class Game:
         self.game_running = True
         self.paused = False
         self.game_entities = [
-            ursina.Entity(model='cube', color=ursina.color.white33, scale=(69, 5, 1), position=(0,22,0), collider=None),
-            ursina.Entity(model='cube', color=ursina.color.white33, scale=(69, 5, 1), position=(0,-22,0), collider=None),
-            ursina.Entity(model='cube', color=ursina.color.white33, scale=(7, 50, 1), position=(38,0,0), collider=None),
-            ursina.Entity(model='cube', color=ursina.color.white33, scale=(7, 50, 1), position=(-38,0,0), collider=None),
+            ursina.Entity(model='cube', color=ursina.color.white33, scale=(*scale, 1), position=(*position, 0), collider=None)
+            for position, scale in ROOM_WALLS
         ]
+        # walls are baked once per room, every system resolves against the field
+        self.collision = CollisionField(ROOM_WALLS)
+        self.flow_field = FlowField(self.collision)
+        self.line_of_sight = LineOfSight(self.collision, self.enemies.max_entities)
+        for position, radius, kind in ROOM_TRIGGERS:
+            self.buttons.spawn(position, radius, kind, color=ursina.color.yellow if kind == PLATE else ursina.color.azure)
         for i in range(-11,11):
             for j in range(-7,7):
                 # if not i % 3 and not j % 3:
-                self.spawn_creature(FloatingFollower, config={"x":i,"y":j})
+                if self.remote is None:
+                    self.spawn_creature(FloatingFollower, config={"x":i,"y":j})
         self.show_info = False
         self.update_ui()
         self.toggle_info()
         self.last_update = time.time()
+        if self.remote is None:
+            self.room_state = StateRing(self.state_sources(), slots=1)
+            self.save_state(self.room_state)
+            if ROLLBACK_FRAMES:
+                self.rollback = StateRing(self.state_sources(), slots=ROLLBACK_FRAMES)
+        if GC_POLICY:
+            self.gc_policy.freeze()
+            self.gc_policy.enable()
+        if self.simulation is not None:
+            self.simulation.start()
+
+    def read_player_input(self):
+        self.players.read_input()
+        self.players.drive_bots(self.sim_time)
 
     def handle_player_bounds(self):
-        bounds = (13, 23)
-        half_height = bounds[0] * 1.5
-        half_width = bounds[1] * 1.5
-        player_x, player_y = self.player.x, self.player.y
-        
-        half_scale = self.player.scale/2
-
-        if player_x - half_scale < -half_width:
-            self.player.x = -half_width + half_scale
-            self.player.x_velocity = 0
-        elif player_x + half_scale > half_width:
-            self.player.x = half_width - half_scale
-            self.player.x_velocity = 0
-
-        # Check for vertical bounds
-        if player_y - half_scale < -half_height:
-            self.player.y = -half_height + half_scale
-            self.player.y_velocity = 0
-        elif player_y + half_scale > half_height:
-            self.player.y = half_height - half_scale
-            self.player.y_velocity = 0
+        resolve_walls(self.players.data, self.players.active_indices, self.collision)
 
     def handle_player_projectile_collisions(self):
-        if not np.count_nonzero(self.enemies.used_mask):
+        if not self.enemies.active_count:
             return
-        if not np.count_nonzero(self.player_projectiles.used_mask):
+        if not self.player_projectiles.active_count:
             return
     
-        subset = self.enemies.data[self.enemies.used_mask, :4]
-        collisions = self.player_projectiles.check_collisions_multiple(
-            subset[:, :2],
-            subset[:, 3]
+        indices = self.enemies.active_indices
+        offsets, projectiles = self.player_projectiles.colliders.query(
+            self.enemies.data[indices, 0:2],
+            self.enemies.data[indices, 2] / 2,
+            first_only=True,
         )
+        if not len(projectiles):
+            return
 
-        indices = [i for i, j in enumerate(self.enemies.used_mask) if self.enemies.used_mask[i]]
-        for i, id_ in enumerate(indices):
-            cols = collisions[i]
-            if not cols:
-                continue
-            if self.enemies.data[id_, 19] > 0:
-                self.enemies.data[id_, 19] = max(0, self.enemies.data[id_, 19] - 5 * len(cols))
-            else:
-                self.enemies.data[id_, 18] = max(0, self.enemies.data[id_, 18] - 5 * len(cols))
-
-            if self.enemies.data[id_, 18] <= 0:
-                self.enemies.despawn(id_)
-        to_despawn = list(set(proj for collision in collisions for proj in collision))
-        self.player_projectiles.despawn_multiple(to_despawn)       
+        damage = 5 * np.diff(offsets)
+        hit = indices[damage > 0]
+        _, killed = apply_damage(self.enemies.data, hit, damage[damage > 0])
+        self.particles.emit(self.enemies.data[hit, 0:2], self.players.projectile_color, count=6, speed=10, lifetime=0.3, size=0.4)
+        self.particles.emit(self.enemies.data[killed, 0:2], self.enemies.data[killed, 4:8], count=40, speed=18, lifetime=0.8, size=0.8)
+        self.enemies.despawn_multiple(killed)
+        self.player_projectiles.despawn_multiple(projectiles)
 
     def handle_enemy_projectile_collisions(self):
-        collisions = self.enemy_projectiles.check_collisions(self.player.position2d, self.player.scale)
-        for c in collisions:
-            continue
-            # if self.player.shield > 0:
-            #     self.player.shield = max(0, self.player.shield-5)
-            # else:
-            #     self.player.health = max(0, self.player.health - 5)
-            # if self.player.health <= 0:
-            #     raise ValueError("YOU DIED")
+        offsets, collisions = self.enemy_projectiles.colliders.query(self.players.positions, self.players.scales / 2)
+        # hits per player, np.diff(offsets), would feed damage:
+        # shields first, then health, YOU DIED at zero
+        if len(collisions):
+            self.particles.emit(self.enemy_projectiles.data[collisions, 0:2], self.enemy_projectiles.data[collisions, 4:8], count=10, speed=12, lifetime=0.4, size=0.5)
         self.enemy_projectiles.despawn_multiple(collisions)
 
     def update_ui(self):
         # Update sliders
         if self.show_sliders:
-            self.player.base_acceleration = self.sliders["base_acceleration"].value
-            self.player.max_velocity = self.sliders["max_velocity"].value
-            self.player.min_velocity = self.sliders["min_velocity"].value
-            self.player.decay_rate = self.sliders["decay_rate"].value
-            self.player.fire_rate = self.sliders["fire_rate"].value
-            self.player.projectile_decay_rate = self.sliders["projectile_decay_rate"].value
-            self.player.projectile_speed_multiplier = self.sliders["projectile_speed_multiplier"].value
-            self.player.range = self.sliders["range"].value
+            self.players.base_acceleration = self.sliders["base_acceleration"].value
+            self.players.max_velocity = self.sliders["max_velocity"].value
+            self.players.min_velocity = self.sliders["min_velocity"].value
+            self.players.decay_rate = self.sliders["decay_rate"].value
+            self.players.fire_rate = self.sliders["fire_rate"].value
+            self.players.projectile_decay_rate = self.sliders["projectile_decay_rate"].value
+            self.players.projectile_speed_multiplier = self.sliders["projectile_speed_multiplier"].value
+            self.players.range = self.sliders["range"].value
             self.gravity = self.sliders["gravity"].value
             # Update slider text
             for name, slider in self.sliders.items():
@@ -272,132 +584,292 @@ class Game:
         if self.show_info:
             self.update_info_display()
 
-    def handle_portal_collisions(self):
-        now = time.time()
-        if self.player.next_portal < now:
-            cols = self.portal_manager.check_collisions(self.player.position2d, self.player.scale/3, overlap=1)
-            if len(cols):
-                _id = cols[0]
-                ids = self.portal_manager.get_paired_indicies(cols[0])
-                _id2 = [__id for __id in ids if not __id == _id][0]
-                pos = self.portal_manager.data[_id2][0:2]
-                self.player.x, self.player.y = (*pos[0:2],)
-                self.player.next_portal = now + self.player.portal_cooldown 
-
-    def handle_portal_collisions_abstract(self, entity_system):
+    def handle_triggers(self, dt:float):
+        """Updates trigger occupancy, plates burst when something steps on them"""
+        self.buttons.update(dt)
+        entered = self.buttons.entered
+        if len(entered):
+            triggers = entered[self.buttons.data[entered[:, 0], 8] == PLATE, 0]
+            self.particles.emit(self.buttons.data[triggers, 0:2], self.buttons.data[triggers, 4:8], count=24, speed=8, lifetime=0.6, size=0.5)
+
+    def handle_portal_collisions_abstract(self, entity_system, cooldown:float = 0.5, radius_scale:float = 0.5):
         """Handles portal collisions for all entities in the system."""
-        now = time.time()-self.start
-        
-        eligible_entities = np.where(entity_system.data[:, 12] < now)[0]
+        now = self.sim_time
+
+        active = entity_system.active_indices
+        eligible_entities = active[entity_system.data[active, 12] < now]
         if not len(eligible_entities):
             return
-        subset_positions = entity_system.data[:, 0:2][eligible_entities]
-        subset_scales = entity_system.data[:, 2][eligible_entities]
-        collisions = self.portal_manager.check_collisions_multiple(
-            subset_positions,
-            subset_scales
+        offsets, portals = self.portal_manager.colliders.query(
+            entity_system.data[eligible_entities, 0:2],
+            entity_system.data[eligible_entities, 2] * radius_scale,
         )
-        for i, id_ in enumerate(eligible_entities):
-            if not len(collisions[i]):
-                continue
-            primary_portal = collisions[i][0]
-            paired_portals = self.portal_manager.get_paired_indicies(primary_portal)
-            paired_portal = [p for p in paired_portals if p != primary_portal][0]
-            target_position = self.portal_manager.data[paired_portal][0:2]
-            entity_system.data[id_, 0:2] = target_position
-            entity_system.data[id_, 12] = now + 0.5
-        
-    def update(self):
-        if not all((self.game_running, not self.paused)):
+        if not len(portals):
             return
-        # self.profiler_data = {}
-        start_time = time.perf_counter()
-
-        dt = ursina.time.dt
-
-        start_time = time.perf_counter()
-        self.player.handle_movement(dt)
-        self.record_time('Player Movement', start_time)
-
-        start_time = time.perf_counter()
-        self.player.handle_projectile()
-        self.record_time('Player Projectile', start_time)
-
-        start_time = time.perf_counter()
-        self.handle_player_bounds()
-        self.record_time('Player Bounds', start_time)
-
-        start_time = time.perf_counter()
-        self.player_projectiles.update(dt)
-        self.record_time('Player Projectiles Update', start_time)
-
-        start_time = time.perf_counter()
-        self.enemies.update(dt)
-        self.record_time('Enemies Update', start_time)
-
-        start_time = time.perf_counter()
-        self.enemies.resolve_external_overlap(self.player.position2d, self.player.scale)
-        self.record_time('Enemies Overlap Resolve', start_time)
+        # the first portal touched sends the entity to the other end of its pair
+        teleport(entity_system.data, eligible_entities, offsets, portals, self.portal_manager.data,
+                 self.portal_manager.max_portal_pairs, now, cooldown)
 
-        start_time = time.perf_counter()
-        self.enemy_projectiles.update(dt)
-        self.record_time('Enemy Projectiles Update', start_time)
+    def update(self, dt:float | None = None):
+        if not all((self.game_running, not self.paused)):
+            return
+        if self.remote is not None:
+            return self.update_remote()
+        if dt is None:
+            dt = ursina.time.dt
+        # keys are only read here, the Player Input stage applies the newest sample
+        self.players.sample_input()
+        if self.simulation is None:
+            self.simulate(dt)
+
+        # a slow tick leaves the last frame up instead of holding up this one
+        frame = self.frames.latest()
+        if frame is not None:
+            start_time = time.perf_counter()
+            self.present(frame)
+            self.record_time('Present', start_time)
+            if not self.frames.presented % 60:
+                with self.sim_lock:
+                    self.update_ui()
+
+        self.update_render_scale(dt)
+
+    def simulate(self, dt:float) -> None:
+        """One simulation tick, it ends by publishing what there is to draw"""
+        if not all((self.game_running, not self.paused)):
+            return
+        frame_start = time.perf_counter()
+        # the tick covers (sim_time - dt, sim_time], timers due in it fire now
+        self.sim_time += dt
+        if self.shared is not None:
+            self.shared.begin_frame()
 
-        start_time = time.perf_counter()
-        self.handle_player_projectile_collisions()
-        self.record_time('Player Projectile Collisions', start_time)
+        self.follow_view(dt)
 
-        start_time = time.perf_counter()
-        self.handle_enemy_projectile_collisions()
-        self.record_time('Enemy Projectile Collisions', start_time)
+        # independent stages overlap on the stage pool, timings come back per stage
+        self.stage_scheduler.run(dt)
+        self.profiler_data.update(self.stage_scheduler.timings)
+        self.profiler_data.update(self.stage_scheduler.summary)
 
-        start_time = time.perf_counter()
-        self.handle_portal_collisions()
-        self.record_time('Portal Collisions', start_time)
+        self.players.update_ssbo()
+        self.publish_frame()
 
-        start_time = time.perf_counter()
-        self.handle_portal_collisions_abstract(self.player_projectiles)
-        self.record_time('Projectile Portal Collisions', start_time)
+        if self.metrics is not None:
+            self.record_metrics((time.perf_counter() - frame_start) * 1000)
 
+        self.tick += 1
+        if self.rollback is not None:
+            self.save_state(self.rollback)
+        if self.shared is not None:
+            self.shared.end_frame(self.tick, self.sim_time, {**self.profiler_data, **self.enemies.profiler_data})
+        self.gc_policy.end_frame((time.perf_counter() - frame_start) * 1000)
+
+    def publish_frame(self) -> None:
+        """Fills the frame slot the renderer is not holding with this tick's buffers, view and particles, then swaps it in"""
         start_time = time.perf_counter()
-        self.handle_portal_collisions_abstract(self.enemies)
-        self.record_time('Enemy Portal Collisions', start_time)
-
+        frame = self.frames.writing
+        frame.tick = self.tick
+        if self.view is not None:
+            frame.view_center[:] = self.view.center
+        for name, base in self.ssbo_parents.items():
+            frame.buffers[name] = (base.ssbo, buffer_key(base))
+        for name, uniform in COUNT_UNIFORMS.items():
+            frame.counts[uniform] = self.ssbo_parents[name].drawn_count
+        frame.particle_count = self.particles.pack(frame.particles) if self.particles.node is not None else 0
+        # every slot catches up on the newest bake, a skipped frame may have been the one carrying it
+        if self.awareness is not None and frame.awareness_bake != self.awareness.bakes:
+            frame.awareness[...] = self.awareness.coverage
+            frame.awareness_origin[:] = self.awareness.origin
+            frame.awareness_bake = self.awareness.bakes
+        self.frames.publish()
+        self.record_time('Frame Publish', start_time)
+
+    def present(self, frame:RenderFrame) -> None:
+        """Hands a published frame to the layers, all the render thread does with simulation output"""
+        self.set_view_center(frame.view_center)
         start_time = time.perf_counter()
-        self.handle_portal_collisions_abstract(self.enemy_projectiles)
-        self.record_time('Enemy Projectile Portal Collisions', start_time)
-
-        # write shader data
-        self.player.update_ssbo()
-        self.layers["canvas"].set_shader_input("PlayerData", self.player.ssbo)
-        self.layers["canvas"].set_shader_input("enemy_count", np.count_nonzero(self.enemies.used_mask))
-        self.layers["canvas"].set_shader_input("EnemyData", self.enemies.ssbo)
-        self.layers["canvas"].set_shader_input("EnemyProjectileData", self.enemy_projectiles.ssbo)
-        self.layers["canvas"].set_shader_input("enemy_projectile_count", np.count_nonzero(self.enemy_projectiles.used_mask))
-        self.layers["canvas"].set_shader_input("PlayerProjectileData", self.player_projectiles.ssbo)
-        self.layers["canvas"].set_shader_input("player_projectile_count", np.count_nonzero(self.player_projectiles.used_mask))
-
+        self.particles.draw(frame.particles, frame.particle_count)
+        self.record_time('Particles Draw', start_time)
+        if self.awareness is not None and frame.awareness_bake != self.awareness_bake:
+            start_time = time.perf_counter()
+            self.awareness.upload(frame.awareness)
+            self.layers["awareness"].set_shader_input("field_origin", ursina.Vec2(*frame.awareness_origin))
+            self.awareness_bake = frame.awareness_bake
+            self.record_time('Awareness Upload', start_time)
+        self.present_buffers(frame.buffers, frame.counts, frame.view_center)
+
+    def present_buffers(self, buffers:dict, counts:dict, center:np.ndarray) -> None:
+        # only inputs whose value or buffer generation changed reach the driver
+        for name, (ssbo, key) in buffers.items():
+            self.render_state.set_ssbo(name, ssbo, key)
+        self.update_static_layer(center, buffers["portalData"])
+        for uniform, count in counts.items():
+            self.render_state.set_input(uniform, count)
+
+    def update_render_scale(self, dt:float) -> None:
+        """Feeds the whole frame time, GPU included, to the resolution controller"""
+        if self.offscreen is None:
+            return
+        scale = self.resolution.observe(dt * 1000)
+        if scale is not None:
+            self.apply_render_scale(scale)
+
+    def apply_render_scale(self, scale:float) -> None:
+        size = self.offscreen.set_scale(scale)
+        self.layers["canvas"].texture_scale = self.offscreen.texture_scale
+        self.render_state.set_input("screen_size", ursina.Vec2(*size))
+
+    def visible_rows(self, data:np.ndarray, rows:np.ndarray, radius_scale:float = 0.5) -> np.ndarray:
+        """`rows` of a manager's data whose sprite, column 2 times `radius_scale` in radius, is in view"""
+        if self.view is None or not len(rows):
+            return rows
+        return rows[self.view.visible(data[rows, 0:2], data[rows, 2] * radius_scale)]
+
+    def follow_view(self, dt:float) -> None:
+        """Moves the view toward the first player"""
+        if self.view is None:
+            return
+        players = self.ssbo_parents["PlayerData"] if self.remote is not None else self.players
+        if players.active_count:
+            # a client only has the drawn rows, the server sends its own players first
+            row = players._buffer[0, 0:2] if self.remote is not None else players.data[players.active_indices[0], 0:2]
+            self.view.follow(row, dt)
+
+    def set_view_center(self, center:np.ndarray) -> None:
+        """Hands the view center to every layer drawn in world space"""
+        if self.view is None:
+            return
+        center = ursina.Vec2(*center)
+        self.render_state.set_input("view_center", center)
+        if self.particles.node is not None:
+            self.particles.node.set_shader_input("view_center", center)
+        if self.awareness is not None:
+            self.layers["awareness"].set_shader_input("view_center", center)
+
+    def update_static_layer(self, center:np.ndarray, portals:tuple) -> None:
+        """Rebakes background, portals and grid for one frame when the (ssbo, key) portal buffer changed or the view left the bake"""
+        if self.static_state is None:
+            return
+        portals_changed = self.static_state.set_ssbo("portalData", *portals)
+        drifted = np.any(np.abs(center - self.static_center) > self.view.half_extent * (STATIC_LAYER_COVERAGE - 1))
+        if portals_changed or drifted:
+            self.static_center[:] = center
+            self.static_state.set_input("view_center", ursina.Vec2(*self.static_center))
+            self.render_state.set_input("static_center", ursina.Vec2(*self.static_center))
+            self.static_layer.render_once()
+            self.static_bakes += 1
+
+    def update_remote(self):
+        """Client mode, sends local input and pushes the newest snapshot into the canvas SSBOs"""
+        self.players.sample_input()
+        self.players.read_input()
+        if self.players.active_count:
+            slot = self.players.active_indices[0]
+            self.remote.send_input(self.players.move_input[slot], self.players.fire_input[slot])
+        else:
+            self.remote.send_input()
+        self.follow_view(ursina.time.dt)
+        if self.view is not None:
+            self.set_view_center(self.view.center)
+        snapshot = self.remote.receive()
+        if snapshot is not None:
+            for name, (count, rows) in snapshot.items():
+                self.ssbo_parents[name].load(count, rows)
+        buffers = {name: (base.ssbo, buffer_key(base)) for name, base in self.ssbo_parents.items()}
+        # buttons are not streamed, their count stays as set at start
+        counts = {
+            uniform: self.ssbo_parents[name].active_count
+            for name, uniform in COUNT_UNIFORMS.items() if name != "ButtonData"
+        }
+        self.present_buffers(buffers, counts, self.view.center if self.view is not None else np.zeros(2))
         if not self.tick % 60:
             self.update_ui()
-
         self.tick += 1
-        
+
+    def snapshot_channels(self) -> dict:
+        """Row counts and float32 render buffers as built by each update_ssbo"""
+        return {
+            "PlayerData"            : (self.players.drawn_count, self.players._buffer),
+            "EnemyData"             : (self.enemies.drawn_count, self.enemies._buffer),
+            "PlayerProjectileData"  : (self.player_projectiles.drawn_count, self.player_projectiles._buffer),
+            "EnemyProjectileData"   : (self.enemy_projectiles.drawn_count, self.enemy_projectiles._buffer),
+            "portalData"            : (len(self.portal_manager.data), self.portal_manager.data),
+        }
+
+    def serve(self, port:int, tick_rate:int = SERVER_TICK_RATE, ticks:int | None = None):
+        """Runs the simulation headless at a fixed tick and streams snapshots until interrupted"""
+        self.snapshot_server = SnapshotServer(self.players, port)
+        print(f"Serving snapshots on udp://{self.snapshot_server.address[0]}:{self.snapshot_server.address[1]} at {tick_rate} Hz")
+        pacer = TickPacer(1 / tick_rate)
+        try:
+            while self.game_running and (ticks is None or self.tick < ticks):
+                self.snapshot_server.receive()
+                self.update(pacer.interval)
+                self.snapshot_server.broadcast(self.tick, self.snapshot_channels())
+                if not self.tick % (tick_rate * 5):
+                    for client, sizes in self.snapshot_server.report().items():
+                        print(f"tick {self.tick} {client}: {sizes['bytes']} bytes, {sizes['average']:.0f} bytes/tick average")
+                pacer.wait()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            self.snapshot_server.close()
+            self.end_game()
+
     def record_time(self, label, start_time):
         elapsed_time = (time.perf_counter() - start_time) * 1000
         self.profiler_data[label] = elapsed_time
 
+    def record_metrics(self, tick_ms:float):
+        """Feeds the recorder this tick's measured duration, stage timings and counts"""
+        managers = {
+            "enemies"               : self.enemies,
+            "player_projectiles"    : self.player_projectiles,
+            "enemy_projectiles"     : self.enemy_projectiles,
+        }
+        gauges = {("entities", (("manager", name),)): m.active_count for name, m in managers.items()}
+        gauges[("render_scale", ())] = self.offscreen.scale if self.offscreen is not None else 1.0
+        counters = {("ssbo_bytes_uploaded_total", ()): self.render_state.bytes_pushed}
+        for name, m in managers.items():
+            counters[("spawned_total", (("manager", name),))] = m.spawned
+            counters[("despawned_total", (("manager", name),))] = m.despawned
+        self.metrics.observe_frame(
+            tick_ms,
+            {**self.profiler_data, **self.enemies.profiler_data},
+            gauges,
+            counters,
+        )
+
+    def ssbo_byte_report(self) -> dict:
+        """Upload size per frame of each sprite buffer at full capacity, in both wire formats"""
+        return byte_report({
+            "PlayerData"            : ("drawable", self.players.max_entities),
+            "EnemyData"             : ("drawable", self.enemies.max_entities),
+            "PlayerProjectileData"  : ("projectile", self.player_projectiles.max_entities),
+            "EnemyProjectileData"   : ("projectile", self.enemy_projectiles.max_entities),
+        })
+
     def update_info_display(self):
         prof = self.profiler_data.copy()
         prof.update(self.enemies.profiler_data)
+        # stats of the first player
+        first = self.players.data[self.players.active_indices[0]] if self.players.active_count else np.zeros(self.players.data.shape[1])
         player = {
-            "X" :                       self.player.x,
-            "Y" :                       self.player.y,
-            "X Vel":                    self.player.x_velocity,
-            "Y Vel":                    self.player.y_velocity,
-            "Total Vel":                self.player.total_velocity,
-            "Projectile Count":         np.count_nonzero(self.player_projectiles.used_mask),
-            "Enemy Count":              np.count_nonzero(self.enemies.used_mask),
-            "Enemy Projectile Count":   np.count_nonzero(self.enemy_projectiles.used_mask),
+            "X" :                       first[0],
+            "Y" :                       first[1],
+            "X Vel":                    first[8],
+            "Y Vel":                    first[9],
+            "Total Vel":                first[10],
+            "Player Count":             self.players.active_count,
+            "Projectile Count":         self.player_projectiles.active_count,
+            "Enemy Count":              self.enemies.active_count,
+            "Enemies Simulated":        self.enemies.simulated,
+            "Enemy Projectile Count":   self.enemy_projectiles.active_count,
+            "Particle Count":           self.particles.count,
+            "Occupied Triggers":        int(np.count_nonzero(self.buttons.data[self.buttons.active_indices, 3])),
+            "Render Scale":             self.offscreen.scale if self.offscreen is not None else 1.0,
+            "Static Layer Bakes":       self.static_bakes,
+            "Frames Dropped":           self.frames.dropped,
         }
         player_text = "Player Info:\n" + "\n".join(
             [f"{key}: {value:.2f}" for key, value in player.items()]
@@ -405,13 +877,29 @@ class Game:
         profiler_text = "Profiler Data (ms):\n" + "\n".join(
             [f"{key}: {value:.2f}" for key, value in prof.items()]
         )
+        if self.allocation_tracker.enabled:
+            profiler_text += "\n\nAllocations per tick (KB / blocks):\n" + "\n".join(
+                [f"{key}: {stats['bytes']/1024:.1f} / {stats['blocks']:.0f}" for key, stats in self.allocation_tracker.per_tick().items()]
+            )
         self.info_display.text = player_text + "\n\n" + profiler_text
 
     def end_game(self):
         self.game_running = False
         self.paused = False
+        if self.simulation is not None:
+            self.simulation.stop()
+        self.stage_scheduler.shutdown()
+        self.gc_policy.disable()
+        if self.metrics_server is not None:
+            self.metrics_server.stop()
+        if self.remote is not None:
+            self.remote.close()
+        self.particles.destroy()
+        if self.shared is not None:
+            self.shared.close()
+            self.shared = None
         for e in self.game_entities:
-            e.destroy()
+            ursina.destroy(e)
         for ui in self.ui_elements.values():
             ui.disable()
 
@@ -427,11 +915,17 @@ class Game:
     def spawn_creature(self, creature:object, config:dict={}):
         self.enemies.spawn(creature, ursina.Vec2(config.get("x"), config.get("y")))
 
-ursina.window.vsync = False
-game = Game()
-update = game.update
-ursina.window.exit_button.enabled = True
-ursina.window.center_on_screen()
-ursina.camera.orthographic = True
-ursina.camera.fov = 10
-game.app.run()
\ No newline at end of file
+if __name__ == "__main__":
+    if SERVER_PORT:
+        game = Game(window_type="none")
+        game.serve(SERVER_PORT)
+    else:
+        ursina.window.vsync = False
+        game = Game()
+        update = game.update
+        input = game.input
+        ursina.window.exit_button.enabled = True
+        ursina.window.center_on_screen()
+        ursina.camera.orthographic = True
+        ursina.camera.fov = 10
+        game.app.run()
\ No newline at end of file
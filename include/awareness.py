@@ -0,0 +1,111 @@
+import numpy as np
+
+class AwarenessField:
+    """
+    Enemy awareness and follow ranges baked into a low resolution coverage
+    grid on the CPU, so the overlay shader is one texture lookup per pixel.
+    Circles are rasterized as row spans: each circle only writes a +1 / -1
+    pair per row of its bounding box into a difference grid and a cumulative
+    sum along x fills them in, red counts awareness and green follow ranges.
+    The grid is only rebaked once an enemy has moved or changed range by more
+    than `threshold` world units, the set of active enemies changed, or the
+    view drifted more than `slack` world units, the border the grid keeps
+    around it, from where the grid was last centered.
+    """
+    def __init__(self, origin:tuple, size:tuple, cell_size:float = 0.25, threshold:float = 0.25, slack:float = 0.0):
+        self.origin = np.asarray(origin, dtype=np.float64)
+        self.cell_size = cell_size
+        self.threshold = threshold
+        self.slack = slack
+        self.width = int(np.ceil((size[0] + 2 * slack) / cell_size))
+        self.height = int(np.ceil((size[1] + 2 * slack) / cell_size))
+        self.size = np.array((self.width, self.height)) * cell_size
+        self.origin -= slack
+        # bottom row first, matching texture memory
+        self.coverage = np.zeros((self.height, self.width, 2), dtype=np.uint8)
+        self._spans = np.zeros((2, self.height, self.width + 1), dtype=np.int32)
+        self._baked = np.zeros((0, 4))
+        self._baked_generation = -1
+        self.bakes = 0
+        self.dirty = False
+        self.texture = None
+
+    def update(self, enemies, center:np.ndarray | None = None) -> bool:
+        """Rebakes from the enemy columns 0:2 and 20:22 when they or the view drifted, True if it did"""
+        moved = center is not None and self.recenter(center)
+        active = enemies.active_indices
+        circles = enemies.data[active][:, [0, 1, 20, 21]]
+        if not moved and enemies.generation == self._baked_generation and len(circles) == len(self._baked):
+            if not len(circles) or np.abs(circles - self._baked).max() <= self.threshold:
+                return False
+        self.bake(circles[:, 0:2], circles[:, 2:4] / 2)
+        self._baked = circles
+        self._baked_generation = enemies.generation
+        return True
+
+    def recenter(self, center:np.ndarray) -> bool:
+        """Moves the grid, snapped to whole cells, over a view that left its slack"""
+        offset = np.asarray(center) - (self.origin + self.size / 2)
+        if np.all(np.abs(offset) <= self.slack):
+            return False
+        self.origin += np.round(offset / self.cell_size) * self.cell_size
+        return True
+
+    def bake(self, centers:np.ndarray, radii:np.ndarray) -> None:
+        """Counts the (N, 2) circle radii covering each cell center, one layer per radius column"""
+        self._spans[:] = 0
+        for layer in range(radii.shape[1]):
+            self._rasterize(self._spans[layer], centers, radii[:, layer])
+        np.cumsum(self._spans[..., :-1], axis=2, out=self._spans[..., :-1])
+        np.minimum(self._spans[..., :-1], 255, out=self._spans[..., :-1])
+        self.coverage[...] = np.moveaxis(self._spans[..., :-1], 0, -1)
+        self.bakes += 1
+        self.dirty = True
+
+    def _rasterize(self, spans:np.ndarray, centers:np.ndarray, radii:np.ndarray) -> None:
+        cells = (centers - self.origin) / self.cell_size - 0.5
+        reach = radii / self.cell_size
+        rows_start = np.maximum(np.ceil(cells[:, 1] - reach), 0).astype(np.intp)
+        rows_end = np.minimum(np.floor(cells[:, 1] + reach), self.height - 1).astype(np.intp)
+        counts = np.maximum(rows_end - rows_start + 1, 0)
+        total = int(counts.sum())
+        if not total:
+            return
+        circle = np.repeat(np.arange(len(counts)), counts)
+        rows = rows_start[circle] + np.arange(total) - np.repeat(np.cumsum(counts) - counts, counts)
+        dy = rows - cells[circle, 1]
+        half = np.sqrt(np.maximum(reach[circle] ** 2 - dy ** 2, 0))
+        start = np.maximum(np.ceil(cells[circle, 0] - half), 0).astype(np.intp)
+        end = np.minimum(np.floor(cells[circle, 0] + half), self.width - 1).astype(np.intp) + 1
+        keep = start < end
+        rows, start, end = rows[keep], start[keep], end[keep]
+        stride = self.width + 1
+        flat = spans.reshape(-1)
+        flat += np.bincount(rows * stride + start, minlength=flat.size).astype(np.int32)
+        flat -= np.bincount(rows * stride + end, minlength=flat.size).astype(np.int32)
+
+    def create_texture(self):
+        from panda3d.core import SamplerState, Texture
+        self.texture = Texture("awareness_field")
+        self.texture.setup_2d_texture(self.width, self.height, Texture.T_unsigned_byte, Texture.F_rgba8)
+        self.texture.set_minfilter(SamplerState.FT_linear)
+        self.texture.set_magfilter(SamplerState.FT_linear)
+        self.texture.set_wrap_u(SamplerState.WM_clamp)
+        self.texture.set_wrap_v(SamplerState.WM_clamp)
+        self.texture.set_ram_image(np.zeros((self.height, self.width, 4), dtype=np.uint8).tobytes())
+        self.dirty = True
+        return self.texture
+
+    def upload(self, coverage:np.ndarray | None = None) -> bool:
+        """Copies a new bake, or a `coverage` copied off one, into the texture, rows are BGRA so red and green sit at 2 and 1"""
+        if self.texture is None:
+            return False
+        if coverage is None:
+            if not self.dirty:
+                return False
+            coverage = self.coverage
+            self.dirty = False
+        image = np.asarray(memoryview(self.texture.modify_ram_image())).reshape(self.height, self.width, 4)
+        image[..., 2] = coverage[..., 0]
+        image[..., 1] = coverage[..., 1]
+        return True
@@ -1,48 +1,147 @@
-import time
 import ursina
 import numpy as np
 from panda3d.core import ShaderBuffer, GeomEnums
+from .colliders import CircleColliderStore
+from . import shared
+from .render_state import swap_staged
+
+# trigger kinds, plates are pressed by bodies, zones notice everything inside them
+PLATE = 0
+ZONE = 1
 
 class ButtonManager:
-    def __init__(self, game, name:str, max_entities: int = 32):
+    """
+    Circular trigger volumes tested every tick against the players, enemies
+    and projectiles in one collider query. Occupancy is kept as a packed
+    bitset per trigger over the slots of every source, so enter, exit and
+    stay fall out of bitwise diffs with the previous tick and come back as
+    (N, 3) arrays of trigger, source index and source slot.
+
+    Columns: 0:2 position, 2 radius, 3 occupied, 4:8 color, 8 kind,
+    9 source bitmask, 10 occupant count, 11 spawn time
+    """
+    def __init__(self, game, name:str, sources:list, max_entities: int = 512):
         self.game = game
         self.name = name
         self.max_entities = max_entities
-        self.entities = {}
-        self.open_indicies = list(range(max_entities))
-        self.used_mask = np.zeros(max_entities, dtype=bool)
-        self.data = np.zeros((max_entities, 13), dtype=np.float32)
+        self.used_mask = shared.zeros(game, f"{name}.used_mask", max_entities, bool)
+        self.data = shared.zeros(game, f"{name}.data", (max_entities, 12), np.float32)
         self._buffer = np.zeros((max_entities, 8), dtype=np.float32)
+        self._staging = np.zeros_like(self._buffer)
+        self._uploaded_count = -1
+
+        # managers whose active rows can occupy a trigger, in bit order
+        self.sources = list(sources)
+        capacities = [source.max_entities for source in self.sources]
+        self.source_offsets = np.concatenate(([0], np.cumsum(capacities)))
+        bits = int(self.source_offsets[-1])
+        self.occupancy = np.zeros((max_entities, -(-bits // 8)), dtype=np.uint8)
+        self._previous = np.zeros_like(self.occupancy)
+        self.entered = np.zeros((0, 3), dtype=np.intp)
+        self.exited = np.zeros((0, 3), dtype=np.intp)
+        self.staying = np.zeros((0, 3), dtype=np.intp)
+
+        self.active_count = 0
+        self.generation = 0
+        self._active_indices = np.zeros(0, dtype=np.intp)
+        self._active_generation = 0
+        self.colliders = CircleColliderStore(self.data, lambda: self.active_indices)
         self.ssbo = None
+        self.ssbo_generation = 0
+        self.drawn_count = 0
         self.update_ssbo()
 
+    @property
+    def active_indices(self) -> np.ndarray:
+        """Sorted indices of used slots, rebuilt at most once per generation"""
+        if self._active_generation != self.generation:
+            self._active_indices = np.flatnonzero(self.used_mask)
+            self._active_generation = self.generation
+        return self._active_indices
+
+    def spawn(self, position:tuple, radius:float, kind:int = PLATE, sources:int | None = None, color:ursina.Vec4 = ursina.color.yellow) -> int | None:
+        """
+        Adds a trigger, `sources` is a bitmask over self.sources and defaults
+        to the first two (players and enemies) for plates and to all for zones
+        """
+        if self.active_count >= self.max_entities:
+            return None
+        if sources is None:
+            sources = 0b11 if kind == PLATE else (1 << len(self.sources)) - 1
+        id_ = int(np.argmax(~self.used_mask))
+        self.used_mask[id_] = True
+        self.active_count += 1
+        self.generation += 1
+        self.data[id_] = (*position, radius, 0, *color, kind, sources, 0, self.game.sim_time)
+        self.occupancy[id_] = 0
+        self._previous[id_] = 0
+        return id_
+
+    def despawn(self, id_:int) -> bool:
+        if not self.used_mask[id_]:
+            return False
+        self.used_mask[id_] = False
+        self.occupancy[id_] = 0
+        self.active_count -= 1
+        self.generation += 1
+        return True
+
+    def state_arrays(self) -> list:
+        return [self.data, self.used_mask, self.occupancy]
+
+    def state_restored(self) -> None:
+        self.active_count = int(np.count_nonzero(self.used_mask))
+        self._previous[:] = self.occupancy
+        self.generation += 1
+
     def update_ssbo(self):
-        active_data = self.data[self.used_mask]
-        self._buffer[:len(active_data)] = active_data[:, :8]
-        self.ssbo = ShaderBuffer(f"{self.name}ProjectileData", self._buffer.tobytes(), GeomEnums.UH_static)
+        active_data = self.data[self.game.visible_rows(self.data, self.active_indices, radius_scale=1.0)]
+        self.drawn_count = len(active_data)
+        self._staging[:len(active_data)] = active_data[:, :8]
+        if not swap_staged(self, len(active_data)):
+            return
+        self.ssbo = ShaderBuffer(f"{self.name}Data", self._buffer.tobytes(), GeomEnums.UH_static)
 
     def update(self, dt):
-        if not np.any(self.used_mask):
-            return self.update_ssbo()
+        # copied in place, StateRing holds on to the occupancy array itself
+        self._previous[:] = self.occupancy
+        self.occupancy[:] = 0
+        if self.active_count:
+            self.occupy()
+        self.entered = self._pairs(self.occupancy & ~self._previous)
+        self.exited = self._pairs(self._previous & ~self.occupancy)
+        self.staying = self._pairs(self.occupancy & self._previous)
         self.update_ssbo()
 
-    def check_collisions(self, position: ursina.vec2, scale: float) -> list[int]:
-        if not np.any(self.used_mask):
-            return []
-
-        # Extract indices of used elements
-        used_indices = np.where(self.used_mask)[0]
-        
-        # Subset the data based on the mask
-        subset_data = self.data[self.used_mask]
+    def occupy(self) -> None:
+        """Sets the occupancy bit of every source row inside every trigger it may press"""
+        slots, positions, radii, bits = [], [], [], []
+        for i, source in enumerate(self.sources):
+            active = source.active_indices
+            slots.append(active + self.source_offsets[i])
+            positions.append(source.data[active, 0:2])
+            radii.append(source.data[active, 2] / 2)
+            bits.append(np.full(len(active), 1 << i))
+        slots, bits = np.concatenate(slots), np.concatenate(bits)
+        offsets, triggers = self.colliders.query(np.concatenate(positions), np.concatenate(radii))
 
-        # Calculate distances
-        dx, dy = subset_data[:, 0] - position[0], subset_data[:, 1] - position[1]
-        dist_squared = dx**2 + dy**2
-        collision_dist_squared = ((scale / 2) + subset_data[:, 2])**2
+        occupants = np.repeat(np.arange(len(slots)), np.diff(offsets))
+        allowed = (self.data[triggers, 9].astype(np.int64) & bits[occupants]) != 0
+        triggers, slots = triggers[allowed], slots[occupants[allowed]]
+        np.bitwise_or.at(self.occupancy, (triggers, slots >> 3), (0x80 >> (slots & 7)).astype(np.uint8))
 
-        # Create the collision mask
-        collision_mask = dist_squared <= collision_dist_squared
+        counts = np.bincount(triggers, minlength=self.max_entities)
+        active = self.active_indices
+        self.data[active, 10] = counts[active]
+        self.data[active, 3] = counts[active] > 0
 
-        # Map subset indices back to full indices
-        return used_indices[collision_mask].tolist()
\ No newline at end of file
+    def _pairs(self, bitset:np.ndarray) -> np.ndarray:
+        """(trigger, source, slot) rows of every set bit, only nonzero bytes are unpacked"""
+        triggers, columns = np.nonzero(bitset)
+        if not len(triggers):
+            return np.zeros((0, 3), dtype=np.intp)
+        bits = np.unpackbits(bitset[triggers, columns][:, None], axis=1)
+        rows, bit = np.nonzero(bits)
+        global_slots = columns[rows] * 8 + bit
+        sources = np.searchsorted(self.source_offsets, global_slots, side="right") - 1
+        return np.stack((triggers[rows], sources, global_slots - self.source_offsets[sources]), axis=1)
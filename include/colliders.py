@@ -0,0 +1,79 @@
+import numpy as np
+from .physics import swept_circle_toi
+
+class CircleColliderStore:
+    """
+    Circle colliders over the used rows of a manager's data array, positions
+    in columns 0:2 and radii in `radius_column`. Given the manager's previous
+    positions the colliders are swept over their last step instead.
+
+    Queries run a sort and sweep broadphase along x followed by an exact
+    narrowphase, and return CSR arrays: the data rows hit by query circle i
+    are indices[offsets[i]:offsets[i + 1]].
+    """
+    def __init__(self, data:np.ndarray, rows, radius_column:int = 2, margin:float = 0.0, previous:np.ndarray | None = None):
+        self.data = data
+        # callable returning the data rows currently in use
+        self.rows = rows
+        self.radius_column = radius_column
+        # extra distance added to every collider radius
+        self.margin = margin
+        self.previous = previous
+        # narrowphase pair tests of the last query
+        self.candidates = 0
+
+    def query(self, positions:np.ndarray, radii, first_only:bool = False) -> tuple[np.ndarray, np.ndarray]:
+        """
+        Colliders touching each query circle. With `first_only` every collider
+        is only reported for the query circle its sweep reaches first.
+        """
+        positions = np.asarray(positions, dtype=np.float64).reshape(-1, 2)
+        count = len(positions)
+        radii = np.broadcast_to(np.asarray(radii, dtype=np.float64), (count,))
+        rows = self.rows()
+        if not len(rows) or not count:
+            self.candidates = 0
+            return np.zeros(count + 1, dtype=np.intp), np.zeros(0, dtype=np.intp)
+
+        ends = self.data[rows, 0:2].astype(np.float64)
+        starts = self.previous[rows].astype(np.float64) if self.previous is not None else ends
+        collider_radii = self.data[rows, self.radius_column].astype(np.float64) + self.margin
+
+        # x extent of every collider over its step, sorted by the left edge
+        lo = np.minimum(starts[:, 0], ends[:, 0]) - collider_radii
+        hi = np.maximum(starts[:, 0], ends[:, 0]) + collider_radii
+        widest = float(np.max(hi - lo))
+        order = np.argsort(lo, kind="stable")
+        lo = lo[order]
+
+        # candidates start left of the query by at most the widest extent
+        first = np.searchsorted(lo, positions[:, 0] - radii - widest, side="left")
+        last = np.searchsorted(lo, positions[:, 0] + radii, side="right")
+        counts = last - first
+        total = int(counts.sum())
+        self.candidates = total
+        queries = np.repeat(np.arange(count), counts)
+        within = np.arange(total) - np.repeat(np.cumsum(counts) - counts, counts)
+        candidates = order[np.repeat(first, counts) + within]
+
+        if self.previous is None:
+            delta = ends[candidates] - positions[queries]
+            reach = collider_radii[candidates] + radii[queries]
+            toi = np.where(np.sum(delta * delta, axis=1) <= reach * reach, 0.0, np.inf)
+        else:
+            toi = swept_circle_toi(
+                starts[candidates], ends[candidates], collider_radii[candidates],
+                positions[queries], radii[queries],
+            )
+        hit = np.flatnonzero(np.isfinite(toi))
+
+        if first_only and len(hit):
+            # earliest impact per collider, ties go to the earlier query
+            by_collider = hit[np.lexsort((queries[hit], toi[hit], candidates[hit]))]
+            keep = np.ones(len(by_collider), dtype=bool)
+            keep[1:] = candidates[by_collider[1:]] != candidates[by_collider[:-1]]
+            hit = np.sort(by_collider[keep])
+
+        offsets = np.zeros(count + 1, dtype=np.intp)
+        np.cumsum(np.bincount(queries[hit], minlength=count), out=offsets[1:])
+        return offsets, rows[candidates[hit]]
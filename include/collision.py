@@ -0,0 +1,111 @@
+import numpy as np
+
+class CollisionField:
+    """
+    Static signed distance field baked from room walls.
+    Distances are positive in open space and negative inside walls,
+    normals point away from the nearest wall surface.
+    """
+    def __init__(self, walls: list, cell_size: float = 0.5, padding: float = 0.0, bounds: tuple | None = None):
+        # walls are (position, scale) pairs of axis aligned boxes, same as the wall entities
+        self.walls = np.array([(*pos[:2], *scale[:2]) for pos, scale in walls], dtype=np.float64).reshape(-1, 4)
+        self.cell_size = cell_size
+        if bounds is None:
+            half = self.walls[:, 2:4] / 2
+            bounds = (
+                *(self.walls[:, 0:2] - half).min(axis=0) - padding,
+                *(self.walls[:, 0:2] + half).max(axis=0) + padding,
+            )
+        self.bounds = np.array(bounds, dtype=np.float64)
+        self.width = max(2, int(np.ceil((self.bounds[2] - self.bounds[0]) / cell_size)))
+        self.height = max(2, int(np.ceil((self.bounds[3] - self.bounds[1]) / cell_size)))
+        self.distance = np.zeros((self.height, self.width), dtype=np.float32)
+        self.normals = np.zeros((self.height, self.width, 2), dtype=np.float32)
+        self.bake()
+
+    @property
+    def cell_centers(self) -> np.ndarray:
+        xs = self.bounds[0] + (np.arange(self.width) + 0.5) * self.cell_size
+        ys = self.bounds[1] + (np.arange(self.height) + 0.5) * self.cell_size
+        return np.stack(np.meshgrid(xs, ys), axis=-1)
+
+    def bake(self) -> None:
+        """Evaluates the exact box distance of every wall at every cell, keeps the nearest"""
+        centers = self.cell_centers.reshape(-1, 2)
+        if not len(self.walls):
+            self.distance[:] = np.inf
+            self.normals[:] = 0
+            return
+
+        offsets = centers[:, None, :] - self.walls[None, :, 0:2]
+        signs = np.where(offsets < 0, -1.0, 1.0)
+        q = np.abs(offsets) - self.walls[None, :, 2:4] / 2
+        outside = np.maximum(q, 0)
+        outside_len = np.linalg.norm(outside, axis=-1)
+        inside_len = np.minimum(q.max(axis=-1), 0)
+        dists = outside_len + inside_len
+
+        # gradient of the box distance, outside points away from the closest point,
+        # inside points out through the nearest face
+        grads = np.where(
+            (outside_len > 0)[..., None],
+            outside / (outside_len[..., None] + 1e-9),
+            np.eye(2)[np.argmax(q, axis=-1)],
+        ) * signs
+
+        nearest = np.argmin(dists, axis=1)
+        rows = np.arange(len(centers))
+        self.distance[:] = dists[rows, nearest].reshape(self.height, self.width)
+        self.normals[:] = grads[rows, nearest].reshape(self.height, self.width, 2)
+
+    def sample(self, positions: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+        """Bilinear lookup of distance and normal for an (N, 2) array of positions"""
+        positions = np.asarray(positions, dtype=np.float64).reshape(-1, 2)
+        gx = (positions[:, 0] - self.bounds[0]) / self.cell_size - 0.5
+        gy = (positions[:, 1] - self.bounds[1]) / self.cell_size - 0.5
+        x0 = np.clip(np.floor(gx).astype(np.intp), 0, self.width - 2)
+        y0 = np.clip(np.floor(gy).astype(np.intp), 0, self.height - 2)
+        fx = np.clip(gx - x0, 0, 1)[:, None]
+        fy = np.clip(gy - y0, 0, 1)[:, None]
+
+        d, n = self.distance, self.normals
+        top = d[y0, x0] * (1 - fx[:, 0]) + d[y0, x0 + 1] * fx[:, 0]
+        bottom = d[y0 + 1, x0] * (1 - fx[:, 0]) + d[y0 + 1, x0 + 1] * fx[:, 0]
+        distance = top * (1 - fy[:, 0]) + bottom * fy[:, 0]
+
+        top = n[y0, x0] * (1 - fx) + n[y0, x0 + 1] * fx
+        bottom = n[y0 + 1, x0] * (1 - fx) + n[y0 + 1, x0 + 1] * fx
+        normals = top * (1 - fy) + bottom * fy
+        normals /= np.linalg.norm(normals, axis=1, keepdims=True) + 1e-9
+
+        # anything past the edge of the grid is treated as being further inside
+        # and is pushed back towards the grid
+        overshoot = np.maximum(self.bounds[0:2] - positions, 0) - np.maximum(positions - self.bounds[2:4], 0)
+        overshoot_len = np.linalg.norm(overshoot, axis=1)
+        outside = overshoot_len > 0
+        if np.any(outside):
+            distance[outside] -= overshoot_len[outside]
+            normals[outside] = overshoot[outside] / overshoot_len[outside, None]
+        return distance, normals
+
+    def resolve(self, positions: np.ndarray, radii: np.ndarray | float, velocities: np.ndarray | None = None) -> np.ndarray:
+        """
+        Pushes circles out of walls in place and removes velocity into the wall.
+        Returns the mask of circles that were touching a wall.
+        """
+        distance, normals = self.sample(positions)
+        penetration = radii - distance
+        hit = penetration > 0
+        if not np.any(hit):
+            return hit
+        positions[hit] += normals[hit] * penetration[hit, None]
+        if velocities is not None:
+            into = np.sum(velocities * normals, axis=1)
+            into_mask = hit & (into < 0)
+            velocities[into_mask] -= normals[into_mask] * into[into_mask, None]
+        return hit
+
+    def contains(self, positions: np.ndarray, radii: np.ndarray | float = 0) -> np.ndarray:
+        """Mask of circles overlapping a wall"""
+        distance, _ = self.sample(positions)
+        return distance < radii
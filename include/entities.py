@@ -2,6 +2,11 @@ import time
 import numpy as np
 import ursina
 from panda3d.core import GeomEnums, ShaderBuffer
+from .colliders import CircleColliderStore
+from . import shared
+from .kernels import lod_rows, steer_enemies, overlap_push, move_enemies, push_out, enemy_shots
+from .packing import pack_drawables, PACKED_DRAWABLE_UINTS
+from .render_state import swap_staged
 
 class _PhysicsEntity:
     """Abstract Physics Entity, do not instantiate directly"""
@@ -64,169 +69,188 @@ class FloatingFollower(_BaseEnemy):
         
     def update(self):
         pass
+def enemy_row(type_, type_index:int, position, now:float, velocity=(0, 0), acceleration=(0, 0)) -> tuple:
+    """Data row of a freshly spawned enemy of `type_`"""
+    return (
+        *position,
+        type_._scale,
+        type_index,
+        *type_._color,
+        *velocity,
+        *acceleration,
+        now,
+        type_._base_acc,
+        type_._movement_decay,
+        0, # dt banked while skipped by the LOD levels
+        type_._max_health,
+        type_._max_shield,
+        type_._max_health,
+        type_._max_shield,
+        type_._awareness_range,
+        type_._max_follow_range,
+        type_._attack_cooldown,
+        now + type_._attack_cooldown,
+        type_._projectile_range,
+        type_._projectile_scale,
+        type_._projectile_decay,
+        *type_._projectile_color,
+        type_._projectile_speed,
+        0,
+    )
+
 class EnemyManager:
-    def __init__(self, game, name:str, max_entities: int = 255, arena_size: ursina.Vec2 = ursina.Vec2(23, 13)):
+    def __init__(self, game, name:str, max_entities: int = 255):
         self.game = game
         self.name = name
-        self.bounds = arena_size
         self.max_entities = max_entities
         self.entities = {}
 
         self.open_indicies = list(range(max_entities))
-        self.used_mask = np.zeros(max_entities, dtype=bool)  # Boolean mask for used indices
+        self.used_mask = shared.zeros(game, f"{name}.used_mask", max_entities, bool)  # Boolean mask for used indices
         self.types = [FloatingFollower]
 
-        self.data = np.zeros((max_entities, 33), dtype=np.float64)
+        self.data = shared.zeros(game, f"{name}.data", (max_entities, 33), np.float64)
         self._buffer = np.zeros((max_entities, 12), dtype=np.float32)
+        # rows are packed here first and only swapped in when they differ from the upload
+        self._staging = np.zeros_like(self._buffer)
+        self._packed = np.zeros((max_entities, PACKED_DRAWABLE_UINTS), dtype=np.uint32)
+
+        # bookkeeping kept up to date on spawn / despawn instead of rescanning the mask
+        self.active_count = 0
+        self.generation = 0
+        self.spawned = 0
+        self.despawned = 0
+        self._active_indices = np.zeros(0, dtype=np.intp)
+        self._active_generation = 0
+
+        # column 2 holds the diameter, so as a radius it over-reaches, overlaps are checked exactly after
+        self.colliders = CircleColliderStore(self.data, lambda: self.active_indices)
+
+        # (distance as a multiple of follow range, update interval in ticks), nearest first
+        self.lod_levels = [(np.inf, 1)]
+        self.lod_counts = np.zeros(1, dtype=np.intp)
+        # ticks run so far, kept in an array so state snapshots capture which slots run next
+        self._lod_clock = np.zeros(1, dtype=np.int64)
+        # enemies run through the pipeline on the last tick
+        self.simulated = 0
 
         self.profiler_data = {}
         self.ssbo = None
+        self.ssbo_generation = 0
+        self._uploaded_count = -1
+        # enemies packed into the SSBO, the ones inside the view
+        self.drawn_count = 0
         self.update_ssbo()
 
+    @property
+    def active_indices(self) -> np.ndarray:
+        """Sorted indices of used slots, rebuilt at most once per generation"""
+        if self._active_generation != self.generation:
+            self._active_indices = np.flatnonzero(self.used_mask)
+            self._active_generation = self.generation
+        return self._active_indices
+
+    @property
+    def lod_tick(self) -> int:
+        return int(self._lod_clock[0])
+
+    def state_arrays(self) -> list:
+        return [self.data, self.used_mask, self._lod_clock]
+
+    def state_restored(self) -> None:
+        """Rebuilds the free list and entity handles from the restored mask"""
+        used = np.flatnonzero(self.used_mask)
+        self.active_count = len(used)
+        self.open_indicies = np.flatnonzero(~self.used_mask)[::-1].tolist()
+        entities = {}
+        for id_ in used.tolist():
+            type_ = self.types[int(self.data[id_, 3])]
+            ent = self.entities.get(id_)
+            entities[id_] = ent if type(ent) is type_ else type_(self, id_)
+        self.entities = entities
+        self.generation += 1
+        self._uploaded_count = -1
+
     def update_ssbo(self):
-        used_indices_len = np.count_nonzero(self.used_mask)
-        self._buffer[:used_indices_len, 0:8] = self.data[self.used_mask, 0:8]
-        self._buffer[:used_indices_len, 8:12] = self.data[self.used_mask, 16:20]
-        self.ssbo = ShaderBuffer(f"{self.name}DrawableData", self._buffer.tobytes(), GeomEnums.UH_static)
+        active = self.game.visible_rows(self.data, self.active_indices)
+        used_indices_len = self.drawn_count = len(active)
+        self._staging[:used_indices_len, 0:8] = self.data[active, 0:8]
+        self._staging[:used_indices_len, 8:12] = self.data[active, 16:20]
+        if not swap_staged(self, used_indices_len):
+            return
+        if self.game.compact_ssbo:
+            pack_drawables(self._buffer[:used_indices_len], out=self._packed[:used_indices_len])
+            self.ssbo = ShaderBuffer(f"{self.name}DrawableData", self._packed.tobytes(), GeomEnums.UH_static)
+        else:
+            self.ssbo = ShaderBuffer(f"{self.name}DrawableData", self._buffer.tobytes(), GeomEnums.UH_static)
 
     def update(self, dt: float):
-        if not np.any(self.used_mask):
+        if not self.active_count:
             return self.update_ssbo()
 
-        player = self.game.player
+        players = self.game.players
         start_time0 = time.perf_counter()
 
-        # get subset of data based on the used_mask
-        used_data_subset = self.data[self.used_mask]
-        self.record_time('ENEMIES - Filter Used', start_time0)
+        # every enemy chases the closest player, skipped enemies bank their dt
+        active = self.active_indices
+        if players.active_count:
+            targets = players.nearest(self.data[active, 0:2])
+            distance = np.linalg.norm(players.data[targets, 0:2] - self.data[active, 0:2], axis=1)
+        else:
+            targets = None
+            distance = np.full(len(active), np.inf)
+        due, levels, step = lod_rows(self.data, active, distance, self.lod_levels, self.lod_tick, dt)
+        rows = active[due]
+        self.lod_counts = np.bincount(levels, minlength=len(self.lod_levels))
+        self._lod_clock[0] += 1
+        self.simulated = len(rows)
+        self.record_time('ENEMIES - LOD', start_time0)
 
         start_time = time.perf_counter()
-        dx = player.x - used_data_subset[:, 0]
-        dy = player.y - used_data_subset[:, 1]
-        distance = np.sqrt(dx**2 + dy**2)
-        rng = np.where(used_data_subset[:, 32].astype(bool), used_data_subset[:, 21], used_data_subset[:, 20])
-        valid_mask = distance <= (player.scale / 3 + rng / 2)
-        self.record_time('ENEMIES - Filter Distances', start_time)
-
-        # process out of range entities based on mask
-        start_time = time.perf_counter()
-        out_of_range_mask = ~valid_mask
-        used_data_subset[out_of_range_mask, 32] = 0.0  
-        used_data_subset[out_of_range_mask, 10:12] = (0, 0)
-        self.record_time('ENEMIES - Reset Out-Ranges', start_time)
-
-        # update entities within valid range
-        start_time = time.perf_counter()
-        if np.any(valid_mask):
-            used_data_subset[valid_mask, 32] = 1.0
-            valid_positions = used_data_subset[valid_mask, 0:2]
-            dx, dy = player.x - valid_positions[:, 0], player.y - valid_positions[:, 1]
-            angles = np.arctan2(dx, dy)
-            accels = np.column_stack((np.sin(angles), np.cos(angles))) * used_data_subset[valid_mask, 13:14]
-            used_data_subset[valid_mask, 10:12] = accels
-            velocities = used_data_subset[valid_mask, 10:12] 
-            used_data_subset[valid_mask, 8:10] += accels * ursina.time.dt
-            self.data[self.used_mask] = used_data_subset
-        self.record_time('ENEMIES - Set In-Ranges', start_time)
-
-        self.data[self.used_mask, 9] -= self.game.gravity
+        if targets is not None:
+            targets = targets[due]
+            target_positions = players.data[targets, 0:2]
+            target_scales = players.data[targets, 2]
+        else:
+            target_positions = self.data[rows, 0:2]
+            target_scales = np.zeros(len(rows))
+        visible_mask = steer_enemies(
+            self.data, rows, step, distance[due], target_positions, target_scales,
+            self.game.line_of_sight.visible,
+            lambda positions, targets, steered: self.game.flow_field.sample(positions, targets),
+        )
+        self.data[active, 9] -= self.game.gravity
+        self.record_time('ENEMIES - Steering', start_time)
 
         start_time = time.perf_counter()
-        self.resolve_overlaps()
+        self.resolve_overlaps(rows, step)
         self.record_time('ENEMIES - Resolve Overlaps', start_time)
 
-        # apply movement
         start_time = time.perf_counter()
-        self.data[self.used_mask, 8:10] *= (1 - self.data[self.used_mask, 14:15] * ursina.time.dt)
-
-        half_scales = self.data[:, 2:3][self.used_mask] / 2
-        min_bounds = -np.array(self.bounds) * 1.5 + half_scales
-        max_bounds = np.array(self.bounds) * 1.5 - half_scales
-        positions = self.data[:, 0:2][self.used_mask]
-        velocities = self.data[:, 8:10][self.used_mask]
-
-        too_low = positions < min_bounds
-        positions[too_low], velocities[too_low] = min_bounds[too_low], 0
-        too_high = positions > max_bounds
-        positions[too_high], velocities[too_high] = max_bounds[too_high], 0
-
-        self.data[self.used_mask, 0:2], self.data[self.used_mask, 8:10] = positions, velocities
-        self.data[self.used_mask, 0:2] += self.data[self.used_mask, 8:10] * ursina.time.dt
+        move_enemies(self.data, rows, step, self.game.collision)
         self.record_time('ENEMIES - Apply Movement', start_time)
 
-        # get aggrod
-        start_time = time.perf_counter()
-        now = np.float32(time.time() - self.game.start)
-        fire_times = used_data_subset[:, 23:24]
-        to_fire_mask = (fire_times.flatten() < now) & (used_data_subset[:, 32] == 1.0)
-
-        self.record_time('ENEMIES - Handle Fire Times', start_time)
-        used_data_subset = self.data[self.used_mask]
+        # every shot due since the enemy last updated, at its own cooldown
         start_time = time.perf_counter()
-
-        # spawn projectiles 
-        if (count := np.count_nonzero(to_fire_mask)):
-            to_fire = np.where(to_fire_mask)[0]
-            buffer = np.zeros((count, 13), dtype=np.float32)
-
-            buffer[:, 0:2] = used_data_subset[:, 0:2][to_fire]
-            buffer[:, 2:3] = used_data_subset[:, 25:26][to_fire]
-            buffer[:, 3:4] = now
-            buffer[:, 4:8] = used_data_subset[:, 27:31][to_fire]
-
-            dx = player.x - used_data_subset[:, 0][to_fire]
-            dy = player.y - used_data_subset[:, 1][to_fire]
-            angles = np.arctan2(dx, dy)
-
-            buffer[:, 8] = 2 * np.sin(angles) * used_data_subset[:, 31][to_fire] + used_data_subset[:, 8][to_fire] / 288
-            buffer[:, 9] = 2 * np.cos(angles) * used_data_subset[:, 31][to_fire] + used_data_subset[:, 9][to_fire] / 288
-            buffer[:, 10:11] = used_data_subset[:, 24:25][to_fire]
-            buffer[:, 11:12] = used_data_subset[:, 26:27][to_fire]
-            buffer[:, 12:13] = now
-
-            # update fire times
-            used_data_subset[:, 23:24][to_fire] = now + used_data_subset[:, 22:23][to_fire]
+        shooters = np.flatnonzero((self.data[rows, 32] == 1.0) & visible_mask)
+        _, buffer = enemy_shots(self.data, rows, shooters, self.game.sim_time, step, target_positions)
+        if len(buffer):
             self.game.enemy_projectiles.spawn_bulk(buffer)
-            
-        self.data[self.used_mask, :] = used_data_subset
         self.record_time('ENEMIES - Handle Fire', start_time)
 
         self.update_ssbo()
         self.record_time('ENEMIES - Full Update', start_time0)
 
-    def resolve_overlaps(self):
-        num_entities = np.count_nonzero(self.used_mask)
-        if num_entities < 2:
+    def resolve_overlaps(self, rows: np.ndarray, dt: np.ndarray):
+        """Pushes each of `rows` out of every other enemy, scaled by its own dt"""
+        if self.active_count < 2 or not len(rows):
             return
-        positions = self.data[self.used_mask, 0:2]
-        scales = self.data[self.used_mask, 2:3]
-        
-        min_distances = (scales + scales.T) / 2
-        diffs = positions[:, None] - positions[None, :]
-        dists = np.linalg.norm(diffs, axis=-1)
-        overlap_mask = (dists < min_distances) & ~np.eye(num_entities, dtype=bool)
-        overlap_amounts = np.maximum(min_distances - dists, 0) * overlap_mask
-        directions = diffs / (dists[..., None] + 1e-4)
-        overlap_amounts_directions = overlap_amounts[..., None] * directions
-        corrections = np.sum(overlap_amounts_directions, axis=1) - np.sum(overlap_amounts_directions, axis=0)
-        corrections *= 12 * ursina.time.dt
-        overlap_amounts_sum = np.sum(overlap_amounts)
-        if overlap_amounts_sum > 0:
-            correction_scale = overlap_amounts_sum / np.sum(overlap_amounts[overlap_amounts > 0])
-            corrections *= correction_scale
-        self.data[self.used_mask, 0:2] += corrections
+        offsets, others = self.colliders.query(self.data[rows, 0:2], self.data[rows, 2] / 2)
+        overlap_push(self.data, rows, offsets, others, dt)
 
-    def resolve_external_overlap(self, position, scale):
-        positions = self.data[self.used_mask, 0:2]
-        scales = self.data[self.used_mask, 2:3].flatten()
-        diffs = positions - position
-        dists = np.linalg.norm(diffs, axis=-1)
-        min_distances = (scales + scale) / 1.5
-        overlap_mask = (dists < min_distances) & (dists > 0)
-        overlap_amounts = np.maximum(min_distances - dists, 0) * overlap_mask
-        directions = diffs / (dists[:, None] + 1e-4)
-        corrections = overlap_amounts[:, None] * directions / 2
-        self.data[self.used_mask, 0:2] += corrections
+    def resolve_external_overlap(self, positions, scales):
+        """Pushes enemies out of an (N, 2) array of outside circles, e.g. the players"""
+        push_out(self.data, self.active_indices, positions, scales)
 
     def record_time(self, label, start_time):
         elapsed_time = (time.perf_counter() - start_time) * 1000
@@ -238,34 +262,12 @@ class EnemyManager:
             raise ValueError("Tried to spawn unindexed entity")
         id_ = self.open_indicies.pop()
         self.used_mask[id_] = True  # Set the mask for the new entity
+        self.active_count += 1
+        self.spawned += 1
+        self.generation += 1
         ent = type_(self, id_)
-        now = np.float32(time.time() - self.game.start)
-        self.data[id_] = (
-            *(position * 3),
-            type_._scale,
-            self.types.index(type_),
-            *type_._color,
-            *velocity,
-            *acceleration,
-            now,
-            type_._base_acc,
-            type_._movement_decay,
-            now,
-            type_._max_health,
-            type_._max_shield,
-            type_._max_health,
-            type_._max_shield,
-            type_._awareness_range,
-            type_._max_follow_range,
-            type_._attack_cooldown,
-            now + type_._attack_cooldown,
-            type_._projectile_range,
-            type_._projectile_scale,
-            type_._projectile_decay,
-            *type_._projectile_color,
-            type_._projectile_speed,
-            0,
-        )
+        now = np.float32(self.game.sim_time)
+        self.data[id_] = enemy_row(type_, self.types.index(type_), position * 3, now, velocity, acceleration)
         self.entities[id_] = ent
         return ent
 
@@ -275,9 +277,19 @@ class EnemyManager:
         self.entities.pop(id_)
         self.used_mask[id_] = False
         self.open_indicies.append(id_)
+        self.active_count -= 1
+        self.despawned += 1
+        self.generation += 1
+        return True
 
     def despawn_multiple(self, ids: list) -> None:
+        ids = [id_ for id_ in np.unique(ids).tolist() if self.used_mask[id_]]
+        if not ids:
+            return
         for id_ in ids:
             self.entities.pop(id_)
-            self.used_indicies.remove(id_)
-        self.open_indicies.extend(ids)
\ No newline at end of file
+        self.used_mask[ids] = False
+        self.open_indicies.extend(ids)
+        self.active_count -= len(ids)
+        self.despawned += len(ids)
+        self.generation += 1
\ No newline at end of file
@@ -0,0 +1,135 @@
+import time
+import atexit
+import threading
+import numpy as np
+
+class RenderFrame:
+    """Everything the render thread draws for one completed simulation tick"""
+    def __init__(self, particle_capacity:int, awareness_shape:tuple | None = None):
+        self.tick = -1
+        self.view_center = np.zeros(2)
+        # name -> (ssbo, key), a ShaderBuffer never changes once update_ssbo
+        # built it, so the frame keeps a reference instead of a copy
+        self.buffers = {}
+        # count uniform -> rows drawn from its buffer
+        self.counts = {}
+        # vertex rows as ParticleSystem.pack writes them
+        self.particles = np.zeros((particle_capacity, 8), dtype=np.float32)
+        self.particle_count = 0
+        self.awareness = None if awareness_shape is None else np.zeros(awareness_shape, dtype=np.uint8)
+        self.awareness_origin = np.zeros(2)
+        self.awareness_bake = -1
+
+class FrameBuffers:
+    """
+    Triple buffered hand-off of completed frames from the simulation to the
+    renderer. The simulation fills `writing`, publish() swaps it with the
+    middle slot and flags that fresh, latest() swaps a fresh middle slot with
+    the one the renderer holds. Each side only ever touches its own slot and
+    a swap is two index stores under the lock, so a slow tick leaves the
+    renderer presenting the last frame and a slow render only means frames
+    are overwritten unseen, counted in `dropped`.
+    """
+    def __init__(self, factory):
+        self.frames = [factory() for _ in range(3)]
+        self.back, self.middle, self.front = 0, 1, 2
+        self.fresh = False
+        self.published = 0
+        self.presented = 0
+        self.dropped = 0
+        self._lock = threading.Lock()
+
+    @property
+    def writing(self) -> RenderFrame:
+        return self.frames[self.back]
+
+    def publish(self) -> None:
+        with self._lock:
+            if self.fresh:
+                self.dropped += 1
+            self.back, self.middle = self.middle, self.back
+            self.fresh = True
+            self.published += 1
+
+    def latest(self) -> RenderFrame | None:
+        """The newest published frame, None when nothing was published since the last call"""
+        with self._lock:
+            if not self.fresh:
+                return None
+            self.front, self.middle = self.middle, self.front
+            self.fresh = False
+            self.presented += 1
+            return self.frames[self.front]
+
+class TickPacer:
+    """
+    Keeps a fixed tick on schedule. wait() sleeps until the next tick is
+    due, behind schedule it returns at once so the missed ticks run back to
+    back. Past `max_catch_up` ticks behind the backlog is dropped rather than
+    bursted, counted in `dropped`, and the simulation clock falls behind
+    the wall clock as a whole, movement and timers alike.
+    """
+    def __init__(self, interval:float, max_catch_up:int = 5):
+        self.interval = interval
+        self.max_catch_up = max_catch_up
+        self.late = 0
+        self.dropped = 0
+        self._next = time.perf_counter()
+
+    def reset(self) -> None:
+        self._next = time.perf_counter()
+
+    def wait(self) -> None:
+        self._next += self.interval
+        delay = self._next - time.perf_counter()
+        if delay > 0:
+            time.sleep(delay)
+            return
+        self.late += 1
+        if -delay > self.max_catch_up * self.interval:
+            self.dropped += int(-delay / self.interval)
+            self._next = time.perf_counter()
+
+class SimulationThread:
+    """
+    Runs `step(dt)` at a fixed tick on its own thread. Each tick holds
+    `lock`, which the render thread takes for the rare work that touches
+    live simulation state, key handlers and the UI. Ticks always step by the
+    fixed interval, a late thread catches up as TickPacer allows.
+    """
+    def __init__(self, step, tick_rate:int, lock):
+        self.step = step
+        self.interval = 1 / tick_rate
+        self.lock = lock
+        self.ticks = 0
+        self.pacer = TickPacer(self.interval)
+        self._running = False
+        self._thread = None
+        # Game.end_game stops the thread, this covers an interpreter exit without it
+        atexit.register(self.stop)
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self) -> None:
+        if self.running:
+            return
+        self._running = True
+        self._thread = threading.Thread(target=self._run, name="simulation", daemon=True)
+        self._thread.start()
+
+    def _run(self) -> None:
+        self.pacer.reset()
+        while self._running:
+            with self.lock:
+                self.step(self.interval)
+            self.ticks += 1
+            self.pacer.wait()
+
+    def stop(self, timeout:float | None = None) -> None:
+        """Lets the tick in flight finish, then ends the thread"""
+        self._running = False
+        if self._thread is not None and self._thread is not threading.current_thread():
+            self._thread.join(timeout)
+        self._thread = None
@@ -0,0 +1,257 @@
+"""
+Row kernels of the simulation, shared by the managers and BatchedArena.
+Each one works on rows of a manager style data array: a manager passes its
+active slots, BatchedArena the flat rows of every arena at once. Anything
+that differs between arenas, the time or the target of a row, comes in per
+row, and queries against other stores are run by the caller.
+"""
+import math
+import numpy as np
+
+DIAG_MOVE_MULTIPLIER = math.sqrt(0.5)
+
+# projectile direction for each face direction
+FIRE_DIRECTIONS = np.array([[0, -1], [0, 1], [-1, 0], [1, 0]], dtype=np.float64)
+
+# most shots one shooter fires in a tick, the rest of a long hitch is dropped
+SHOT_BURST_LIMIT = 16
+
+def due_shots(next_shot:np.ndarray, now, dt, interval, limit:int = SHOT_BURST_LIMIT) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Every shot due in the tick ending at `now` for shooters whose next shot
+    is at `next_shot`. Shots run at `interval` from the later of the next
+    shot and the tick start, so the rate holds above the frame rate and a
+    shooter that was idle starts at once instead of firing its backlog.
+    Returns each shot's shooter index and time, and the shooters' new next shot.
+    """
+    interval = np.broadcast_to(interval, next_shot.shape)
+    start = np.maximum(next_shot, np.asarray(now) - dt)
+    due = np.where(start <= now, np.floor((now - start) / interval) + 1, 0).astype(np.intp)
+    following = np.where(due > 0, start + due * interval, next_shot)
+    # only the latest `limit` shots of a burst are kept
+    counts = np.minimum(due, limit)
+    owners = np.repeat(np.arange(len(due)), counts)
+    steps = np.arange(len(owners)) - np.repeat(np.cumsum(counts) - counts, counts) + (due - counts)[owners]
+    return owners, start[owners] + steps * interval[owners], following
+
+def per_row(value, rows:np.ndarray) -> np.ndarray:
+    """A scalar or one value per row as one value per row"""
+    return np.broadcast_to(np.asarray(value, dtype=np.float64), rows.shape)
+
+def move_players(data:np.ndarray, rows:np.ndarray, move:np.ndarray, tuning, dt:float) -> None:
+    """
+    Accelerates `rows` by their (-1 / 0 / 1 per axis) `move` input and moves
+    them by their velocity. `tuning` is anything with PlayerManager's
+    base_acceleration, max_velocity, min_velocity and decay_rate.
+    """
+    moving = move != 0
+    multiplier = np.where(np.all(moving, axis=1), DIAG_MOVE_MULTIPLIER, 1.0)
+
+    velocity = data[rows, 8:10]
+    velocity += tuning.base_acceleration * multiplier[:, None] * move
+    np.clip(velocity, -tuning.max_velocity, tuning.max_velocity, out=velocity)
+
+    speed = np.sqrt(np.sum(velocity * velocity, axis=1))
+    too_fast = speed > tuning.max_velocity
+    velocity[too_fast] *= (tuning.max_velocity / speed[too_fast])[:, None]
+    velocity[(speed < tuning.min_velocity) & ~np.any(moving, axis=1)] = 0
+    velocity *= 1 - tuning.decay_rate
+
+    data[rows, 8:10] = velocity
+    data[rows, 10] = np.sqrt(np.sum(velocity * velocity, axis=1))
+    data[rows, 0:2] += velocity * dt
+
+def player_shots(data:np.ndarray, held:np.ndarray, rows:np.ndarray, fire:np.ndarray, now, dt:float, tuning) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Turns `rows` to face their most recently pressed fire key and builds
+    every shot due since the last tick. `held` is the fire input of the
+    last tick for all of data's rows, `tuning` anything with PlayerManager's
+    projectile settings. Returns the row that fired each shot and the
+    projectile rows to spawn.
+    """
+    pressed = fire & ~held[rows]
+    turned = np.any(pressed, axis=1)
+    data[rows[turned], 3] = np.argmax(pressed[turned], axis=1)
+    held[rows] = fire
+
+    shooting = np.flatnonzero(np.any(fire, axis=1))
+    ids, now = rows[shooting], per_row(now, rows)[shooting]
+    owners, times, data[ids, 11] = due_shots(data[ids, 11], now, dt, 1.0 / tuning.fire_rate)
+    ids, now = ids[owners], now[owners]
+
+    buffer = np.zeros((len(ids), 13), dtype=np.float32)
+    directions = FIRE_DIRECTIONS[data[ids, 3].astype(np.intp)]
+    # shots from earlier in the tick have flown away from the player since
+    buffer[:, 0:2] = data[ids, 0:2] + directions * tuning.base_projectile_speed * (now - times)[:, None]
+    buffer[:, 2] = tuning.projectile_scale
+    buffer[:, 3] = times
+    buffer[:, 4:8] = tuning.projectile_color
+    buffer[:, 8:10] = directions * tuning.base_projectile_speed + data[ids, 8:10]
+    buffer[:, 10] = tuning.range
+    buffer[:, 11] = tuning.projectile_decay_rate
+    buffer[:, 12] = times
+    return ids, buffer
+
+def move_projectiles(data:np.ndarray, previous:np.ndarray, rows:np.ndarray, dt:float, now, collision) -> np.ndarray:
+    """
+    Decays and moves projectile `rows`, keeping where they started in
+    `previous` for swept queries. Returns which of them hit a wall or
+    outlived their range by `now`.
+    """
+    data[rows, 8:10] *= 1 - data[rows, 11][:, None]
+    previous[rows] = data[rows, 0:2]
+    data[rows, 0:2] += data[rows, 8:10] * dt
+    return collision.contains(data[rows, 0:2]) | (data[rows, 3] + data[rows, 10] < now)
+
+def lod_rows(data:np.ndarray, active:np.ndarray, distance:np.ndarray, lod_levels:list, tick:int, dt:float) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Banks `dt` on every active enemy and picks the ones simulated this tick.
+    Each is put in the first level whose distance, as a multiple of its
+    current follow range, it is within, aggroed enemies always go in the
+    first. A level with interval k runs a row every k-th tick, staggered by
+    row so each tick gets an even share. Returns which of `active` are due,
+    the level of every active enemy and the dt each due one banked.
+    """
+    data[active, 15] += dt
+    aggro = data[active, 32] > 0
+    reach = np.where(aggro, data[active, 21], data[active, 20]) / 2
+    levels = np.zeros(len(active), dtype=np.intp)
+    for factor, _ in lod_levels[:-1]:
+        levels += distance > reach * factor
+    levels[aggro] = 0
+    intervals = np.array([interval for _, interval in lod_levels], dtype=np.intp)[levels]
+    due = (tick + active) % intervals == 0
+    rows = active[due]
+    step = data[rows, 15].copy()
+    data[rows, 15] = 0
+    return due, levels, step
+
+def steer_enemies(data:np.ndarray, rows:np.ndarray, step:np.ndarray, distance:np.ndarray,
+                  target_positions:np.ndarray, target_scales:np.ndarray, visible, flow) -> np.ndarray:
+    """
+    Aggroes the enemy `rows` whose target is in range and in sight and
+    accelerates them along the flow field for their `step`, the rest lose
+    aggro and stop accelerating. Only enemies in range need rays, awareness
+    is gained on clear sight and kept while within follow range.
+    `visible(rows, positions, targets)` casts the rays and
+    `flow(positions, targets, steered)` samples the field for the rows in
+    the `steered` mask. Returns which rows can see their target.
+    """
+    aggro = data[rows, 32] > 0
+    reach = np.where(aggro, data[rows, 21], data[rows, 20])
+    in_range = distance <= target_scales / 3 + reach / 2
+    seen = np.zeros(len(rows), dtype=bool)
+    if np.any(in_range):
+        seen[in_range] = visible(rows[in_range], data[rows[in_range], 0:2], target_positions[in_range])
+    valid = in_range & (aggro | seen)
+
+    idle = rows[~valid]
+    data[idle, 32] = 0
+    data[idle, 10:12] = 0
+    if np.any(valid):
+        steered = rows[valid]
+        data[steered, 32] = 1
+        accels = flow(data[steered, 0:2], target_positions[valid], valid) * data[steered, 13:14]
+        data[steered, 10:12] = accels
+        data[steered, 8:10] += accels * step[valid, None]
+    return seen
+
+def overlap_push(data:np.ndarray, rows:np.ndarray, offsets:np.ndarray, others:np.ndarray, step:np.ndarray) -> None:
+    """
+    Pushes each of `rows` out of the circles `others` of the same array a
+    collider query found for it, scaled by its own step. Column 2 holds the
+    diameter so the query over-reaches, overlaps are checked exactly here.
+    """
+    owners = np.repeat(np.arange(len(rows)), np.diff(offsets))
+    distinct = rows[owners] != others
+    owners, others = owners[distinct], others[distinct]
+
+    diffs = data[rows[owners], 0:2] - data[others, 0:2]
+    dists = np.linalg.norm(diffs, axis=-1)
+    overlap_amounts = np.maximum((data[rows[owners], 2] + data[others, 2]) / 2 - dists, 0)
+    corrections = np.zeros((len(rows), 2))
+    np.add.at(corrections, owners, overlap_amounts[:, None] * diffs / (dists[:, None] + 1e-4))
+    # every pair pushes both ways, hence twice the one sided sum
+    data[rows, 0:2] += 2 * corrections * 12 * step[:, None]
+
+def resolve_walls(data:np.ndarray, rows:np.ndarray, collision) -> None:
+    """Pushes circle `rows` out of the walls and removes their velocity into them"""
+    positions = data[rows, 0:2]
+    velocities = data[rows, 8:10]
+    if np.any(collision.resolve(positions, data[rows, 2] / 2, velocities)):
+        data[rows, 0:2] = positions
+        data[rows, 8:10] = velocities
+
+def move_enemies(data:np.ndarray, rows:np.ndarray, step:np.ndarray, collision) -> None:
+    """Decays, collides and moves enemy `rows` by their own step"""
+    data[rows, 8:10] *= 1 - data[rows, 14:15] * step[:, None]
+    resolve_walls(data, rows, collision)
+    data[rows, 0:2] += data[rows, 8:10] * step[:, None]
+
+def push_out(data:np.ndarray, rows:np.ndarray, positions:np.ndarray, scales:np.ndarray, present=True) -> None:
+    """
+    Pushes `rows` out of outside circles, e.g. the players. `positions` and
+    `scales` are (M, 2) and (M,) circles shared by every row, or (len(rows),
+    M, ...) per row with `present` masking the unused ones.
+    """
+    diffs = data[rows, None, 0:2] - np.asarray(positions, dtype=np.float64)
+    dists = np.linalg.norm(diffs, axis=-1)
+    min_distances = (data[rows, 2, None] + np.asarray(scales, dtype=np.float64)) / 1.5
+    overlap_mask = (dists < min_distances) & (dists > 0) & present
+    overlap_amounts = np.maximum(min_distances - dists, 0) * overlap_mask
+    directions = diffs / (dists[..., None] + 1e-4)
+    data[rows, 0:2] += np.sum(overlap_amounts[..., None] * directions, axis=1) / 2
+
+def enemy_shots(data:np.ndarray, rows:np.ndarray, shooters:np.ndarray, now, step:np.ndarray,
+                target_positions:np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Every shot due since the enemy `rows` at positions `shooters` last
+    updated, at their own cooldown, aimed at their targets. Returns the
+    position in `rows` of the enemy behind each shot and the projectile rows.
+    """
+    ids, now = rows[shooters], per_row(now, rows)[shooters]
+    owners, times, data[ids, 23] = due_shots(data[ids, 23], now, step[shooters], data[ids, 22])
+    fired, ids, now = shooters[owners], ids[owners], now[owners]
+
+    shooter_data = data[ids]
+    buffer = np.zeros((len(ids), 13), dtype=np.float32)
+    buffer[:, 2] = shooter_data[:, 25]
+    buffer[:, 3] = times
+    buffer[:, 4:8] = shooter_data[:, 27:31]
+    delta = target_positions[fired] - shooter_data[:, 0:2]
+    angles = np.arctan2(delta[:, 0], delta[:, 1])
+    buffer[:, 8] = 2 * np.sin(angles) * shooter_data[:, 31] + shooter_data[:, 8] / 288
+    buffer[:, 9] = 2 * np.cos(angles) * shooter_data[:, 31] + shooter_data[:, 9] / 288
+    buffer[:, 10] = shooter_data[:, 24]
+    buffer[:, 11] = shooter_data[:, 26]
+    buffer[:, 12] = times
+    # shots from earlier in the update have flown away from the enemy since
+    buffer[:, 0:2] = shooter_data[:, 0:2] + (buffer[:, 8:10] - shooter_data[:, 8:10]) * (now - times)[:, None]
+    return fired, buffer
+
+def apply_damage(data:np.ndarray, rows:np.ndarray, damage:np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Takes `damage` off each of `rows`, shields soak it first and health only
+    takes it once they are down. Returns the damage each row took and the
+    rows left without health.
+    """
+    shielded = data[rows, 19] > 0
+    dealt = np.minimum(np.where(shielded, data[rows, 19], data[rows, 18]), damage)
+    data[rows, 19] -= np.where(shielded, dealt, 0)
+    data[rows, 18] -= np.where(shielded, 0, dealt)
+    return dealt, rows[(damage > 0) & (data[rows, 18] <= 0)]
+
+def teleport(data:np.ndarray, rows:np.ndarray, offsets:np.ndarray, portals:np.ndarray, portal_data:np.ndarray,
+             pairs:int, now, cooldown:float) -> None:
+    """
+    Sends each of `rows` that a portal query hit to the other end of the
+    first portal it touches and holds it there for `cooldown`. Portal rows
+    come in blocks of 2 * `pairs`, pair i at rows i and i + pairs of a block.
+    """
+    touching = np.diff(offsets) > 0
+    primary = portals[offsets[:-1][touching]]
+    block = primary % (2 * pairs)
+    paired = primary - block + np.where(block >= pairs, block - pairs, block + pairs)
+    moved = rows[touching]
+    data[moved, 0:2] = portal_data[paired, 0:2]
+    data[moved, 12] = per_row(now, rows)[touching] + cooldown
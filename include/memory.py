@@ -0,0 +1,122 @@
+import gc
+import time
+import tracemalloc
+
+class AllocationTracker:
+    """
+    Instrumentation mode attributing allocations to update stages.
+    Around each stage tracemalloc snapshots are diffed for the net bytes and
+    blocks the stage left behind, and the traced peak gives its transient
+    allocations. Snapshots are process wide, so stages must run serially.
+    """
+    def __init__(self, frames:int = 1):
+        self.frames = frames
+        self.enabled = False
+        # stage -> [net bytes, net blocks, peak bytes, calls]
+        self.stages = {}
+        self._filters = [
+            tracemalloc.Filter(False, tracemalloc.__file__),
+            tracemalloc.Filter(False, __file__),
+        ]
+        self._before = None
+        self._start_memory = 0
+
+    def start(self) -> None:
+        if not tracemalloc.is_tracing():
+            tracemalloc.start(self.frames)
+        self.enabled = True
+
+    def stop(self) -> None:
+        self.enabled = False
+        tracemalloc.stop()
+
+    def reset(self) -> None:
+        self.stages.clear()
+
+    def before_stage(self, name:str) -> None:
+        if not self.enabled:
+            return
+        self._before = tracemalloc.take_snapshot().filter_traces(self._filters)
+        tracemalloc.reset_peak()
+        self._start_memory = tracemalloc.get_traced_memory()[0]
+
+    def after_stage(self, name:str) -> None:
+        if not self.enabled or self._before is None:
+            return
+        peak = tracemalloc.get_traced_memory()[1] - self._start_memory
+        after = tracemalloc.take_snapshot().filter_traces(self._filters)
+        stats = after.compare_to(self._before, "lineno")
+        entry = self.stages.setdefault(name, [0, 0, 0, 0])
+        entry[0] += sum(stat.size_diff for stat in stats if stat.size_diff > 0)
+        entry[1] += sum(stat.count_diff for stat in stats if stat.count_diff > 0)
+        entry[2] = max(entry[2], peak)
+        entry[3] += 1
+        self._before = None
+
+    def per_tick(self) -> dict:
+        """Average net bytes and blocks, and the worst peak, per call of each stage"""
+        return {
+            name: {"bytes": b / calls, "blocks": blocks / calls, "peak": peak}
+            for name, (b, blocks, peak, calls) in self.stages.items() if calls
+        }
+
+    def over_budget(self, budgets:dict, default:float | None = None) -> dict:
+        """Stages whose average net bytes per tick exceed their budget"""
+        over = {}
+        for name, stats in self.per_tick().items():
+            budget = budgets.get(name, default)
+            if budget is not None and stats["bytes"] > budget:
+                over[name] = stats["bytes"]
+        return over
+
+class GCPolicy:
+    """
+    Keeps the cyclic collector out of the frame. Long lived objects are
+    frozen after the game starts, automatic collection is disabled, and young
+    generations are collected at the end of frames that have idle time left.
+    """
+    def __init__(self, frame_budget_ms:float = 1000 / 60, idle_fraction:float = 0.75, force_factor:int = 10):
+        self.frame_budget_ms = frame_budget_ms
+        self.idle_fraction = idle_fraction
+        # collect regardless of budget once garbage piles past this many thresholds
+        self.force_factor = force_factor
+        self.collections = [0, 0, 0]
+        self.collected = 0
+        self.last_collect_ms = 0.0
+        self.enabled = False
+
+    def freeze(self) -> None:
+        """Moves everything alive now to the permanent generation"""
+        gc.collect()
+        gc.freeze()
+
+    def enable(self) -> None:
+        gc.disable()
+        self.enabled = True
+
+    def disable(self) -> None:
+        gc.enable()
+        self.enabled = False
+
+    def end_frame(self, frame_ms:float) -> int:
+        """Runs an incremental collection if the frame left idle time, returns the generation or -1"""
+        if not self.enabled:
+            return -1
+        threshold = gc.get_threshold()
+        counts = gc.get_count()
+        idle = frame_ms < self.frame_budget_ms * self.idle_fraction
+        forced = counts[0] > threshold[0] * self.force_factor
+        if not (forced or (idle and counts[0] > threshold[0])):
+            return -1
+
+        # escalate like the automatic collector would, one generation at a time
+        generation = 0
+        if counts[1] > threshold[1]:
+            generation = 1
+            if counts[2] > threshold[2] and idle:
+                generation = 2
+        start_time = time.perf_counter()
+        self.collected += gc.collect(generation)
+        self.last_collect_ms = (time.perf_counter() - start_time) * 1000
+        self.collections[generation] += 1
+        return generation
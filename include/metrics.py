@@ -0,0 +1,137 @@
+import time
+import threading
+from bisect import bisect_left
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import numpy as np
+
+STAGE_BUCKETS_MS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 25.0, 50.0, 100.0)
+FRAME_QUANTILES = (0.5, 0.9, 0.99)
+
+class MetricsSnapshot:
+    """Immutable copy of the recorder state, safe to read from any thread"""
+    __slots__ = ["timestamp", "frames", "buckets", "histograms", "frame_times", "gauges", "counters"]
+    def __init__(self, timestamp, frames, buckets, histograms, frame_times, gauges, counters):
+        self.timestamp = timestamp
+        self.frames = frames
+        self.buckets = buckets
+        self.histograms = histograms
+        self.frame_times = frame_times
+        self.gauges = gauges
+        self.counters = counters
+
+class MetricsRecorder:
+    """
+    Frame telemetry updated once per simulation tick with its measured
+    duration and the latest stage timings, the render thread's Present
+    included. Every `publish_interval` frames a new snapshot replaces the
+    old one with a single reference swap, so readers never take a lock and
+    never block the frame.
+    """
+    def __init__(self, buckets:tuple = STAGE_BUCKETS_MS, window:int = 1024, publish_interval:int = 10):
+        self.buckets = tuple(buckets)
+        self.publish_interval = publish_interval
+        self.frames = 0
+        # stage -> [bucket counts, sum, count]
+        self._histograms = {}
+        self._frame_times = np.zeros(window, dtype=np.float64)
+        self._gauges = {}
+        self._counters = {}
+        self.snapshot = None
+        self.publish()
+
+    def observe_frame(self, frame_ms:float, stage_timings:dict, gauges:dict, counters:dict) -> None:
+        for name, ms in stage_timings.items():
+            histogram = self._histograms.get(name)
+            if histogram is None:
+                histogram = self._histograms[name] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            histogram[0][bisect_left(self.buckets, ms)] += 1
+            histogram[1] += ms
+            histogram[2] += 1
+        self._frame_times[self.frames % len(self._frame_times)] = frame_ms
+        self.frames += 1
+        self._gauges = gauges
+        self._counters = counters
+        if not self.frames % self.publish_interval:
+            self.publish()
+
+    def publish(self) -> None:
+        filled = min(self.frames, len(self._frame_times))
+        self.snapshot = MetricsSnapshot(
+            time.time(),
+            self.frames,
+            self.buckets,
+            {name: (tuple(h[0]), h[1], h[2]) for name, h in self._histograms.items()},
+            self._frame_times[:filled].copy(),
+            dict(self._gauges),
+            dict(self._counters),
+        )
+
+def _labels(labels:dict) -> str:
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{k}="{v}"' for k, v in labels.items()) + "}"
+
+def render_prometheus(snapshot:MetricsSnapshot, prefix:str = "wizardtime") -> str:
+    """Prometheus text exposition of a snapshot, quantiles are computed here off the frame thread"""
+    lines = [
+        f"# TYPE {prefix}_frames_total counter",
+        f"{prefix}_frames_total {snapshot.frames}",
+        f"# TYPE {prefix}_frame_time_ms summary",
+    ]
+    if len(snapshot.frame_times):
+        for q, value in zip(FRAME_QUANTILES, np.quantile(snapshot.frame_times, FRAME_QUANTILES)):
+            lines.append(f'{prefix}_frame_time_ms{{quantile="{q}"}} {value:.6f}')
+    lines.append(f"{prefix}_frame_time_ms_sum {float(np.sum(snapshot.frame_times)):.6f}")
+    lines.append(f"{prefix}_frame_time_ms_count {len(snapshot.frame_times)}")
+
+    lines.append(f"# TYPE {prefix}_stage_time_ms histogram")
+    for name, (counts, total, count) in snapshot.histograms.items():
+        cumulative = 0
+        for le, bucket_count in zip((*snapshot.buckets, "+Inf"), counts):
+            cumulative += bucket_count
+            lines.append(f'{prefix}_stage_time_ms_bucket{{stage="{name}",le="{le}"}} {cumulative}')
+        lines.append(f'{prefix}_stage_time_ms_sum{{stage="{name}"}} {total:.6f}')
+        lines.append(f'{prefix}_stage_time_ms_count{{stage="{name}"}} {count}')
+
+    # gauges and counters are keyed by (metric name, labels tuple)
+    for kind, values in (("gauge", snapshot.gauges), ("counter", snapshot.counters)):
+        declared = set()
+        for (name, labels), value in sorted(values.items()):
+            if name not in declared:
+                lines.append(f"# TYPE {prefix}_{name} {kind}")
+                declared.add(name)
+            lines.append(f"{prefix}_{name}{_labels(dict(labels))} {value}")
+    return "\n".join(lines) + "\n"
+
+class MetricsServer:
+    """Serves the latest snapshot over local HTTP from a daemon thread"""
+    def __init__(self, recorder:MetricsRecorder, port:int = 9464, host:str = "127.0.0.1"):
+        self.recorder = recorder
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(handler):
+                if handler.path.split("?")[0] not in ("/", "/metrics"):
+                    handler.send_error(404)
+                    return
+                body = render_prometheus(recorder.snapshot).encode()
+                handler.send_response(200)
+                handler.send_header("Content-Type", "text/plain; version=0.0.4")
+                handler.send_header("Content-Length", str(len(body)))
+                handler.end_headers()
+                handler.wfile.write(body)
+
+            def log_message(handler, *args):
+                pass
+
+        self.server = ThreadingHTTPServer((host, port), Handler)
+        self.server.daemon_threads = True
+        self.thread = threading.Thread(target=self.server.serve_forever, name="metrics", daemon=True)
+        self.thread.start()
+
+    @property
+    def address(self) -> tuple:
+        return self.server.server_address
+
+    def stop(self) -> None:
+        self.server.shutdown()
+        self.server.server_close()
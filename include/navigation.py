@@ -0,0 +1,118 @@
+import numpy as np
+
+# neighbour offsets as (dx, dy), orthogonal first so ties prefer straight moves
+NEIGHBOR_OFFSETS = np.array([
+    (1, 0), (-1, 0), (0, 1), (0, -1),
+    (1, 1), (-1, 1), (1, -1), (-1, -1),
+], dtype=np.intp)
+NEIGHBOR_COSTS = np.linalg.norm(NEIGHBOR_OFFSETS, axis=1)
+
+class FlowField:
+    """
+    Shared pathing field for every chasing entity.
+    Distances to the target cells are relaxed over a navigation grid built
+    from the room collision field, and each cell stores the direction of
+    steepest descent. Recomputed only when the target cells change.
+    """
+    def __init__(self, collision, cell_size: float = 1.0, clearance: float = 1.0):
+        self.collision = collision
+        self.cell_size = cell_size
+        self.clearance = clearance
+        self.bounds = collision.bounds
+        self.width = max(1, int(np.ceil((self.bounds[2] - self.bounds[0]) / cell_size)))
+        self.height = max(1, int(np.ceil((self.bounds[3] - self.bounds[1]) / cell_size)))
+
+        self.walkable = np.zeros(self.width * self.height, dtype=bool)
+        self._neighbors = np.full((self.width * self.height, len(NEIGHBOR_OFFSETS)), -1, dtype=np.intp)
+        self.distance = np.full(self.width * self.height, np.inf, dtype=np.float64)
+        self.flow = np.zeros((self.width * self.height, 2), dtype=np.float64)
+        self._sources = np.zeros(0, dtype=np.intp)
+        self.recomputes = 0
+        self.build()
+
+    def build(self) -> None:
+        """Derives the walkable grid and neighbour table from the collision field"""
+        xs = self.bounds[0] + (np.arange(self.width) + 0.5) * self.cell_size
+        ys = self.bounds[1] + (np.arange(self.height) + 0.5) * self.cell_size
+        centers = np.stack(np.meshgrid(xs, ys), axis=-1).reshape(-1, 2)
+        distance, _ = self.collision.sample(centers)
+        self.walkable[:] = distance > self.clearance
+
+        cx, cy = np.meshgrid(np.arange(self.width), np.arange(self.height))
+        cx, cy = cx.ravel(), cy.ravel()
+        nx = cx[:, None] + NEIGHBOR_OFFSETS[None, :, 0]
+        ny = cy[:, None] + NEIGHBOR_OFFSETS[None, :, 1]
+        inside = (nx >= 0) & (nx < self.width) & (ny >= 0) & (ny < self.height)
+        neighbors = np.where(inside, ny * self.width + nx, 0)
+        valid = inside & self.walkable[neighbors]
+
+        # diagonal moves may not cut the corner of a blocked cell
+        for i, (dx, dy) in enumerate(NEIGHBOR_OFFSETS):
+            if dx and dy:
+                valid[:, i] &= valid[:, NEIGHBOR_OFFSETS.tolist().index([dx, 0])]
+                valid[:, i] &= valid[:, NEIGHBOR_OFFSETS.tolist().index([0, dy])]
+        self._neighbors[:] = np.where(valid, neighbors, -1)
+        self._sources = np.zeros(0, dtype=np.intp)
+
+    def cell_indices(self, positions: np.ndarray) -> np.ndarray:
+        positions = np.asarray(positions, dtype=np.float64).reshape(-1, 2)
+        cx = np.clip(((positions[:, 0] - self.bounds[0]) / self.cell_size).astype(np.intp), 0, self.width - 1)
+        cy = np.clip(((positions[:, 1] - self.bounds[1]) / self.cell_size).astype(np.intp), 0, self.height - 1)
+        return cy * self.width + cx
+
+    def update(self, targets: np.ndarray) -> bool:
+        """Recomputes the field if any target changed cell, returns True if it did"""
+        sources = np.unique(self.cell_indices(targets))
+        if np.array_equal(sources, self._sources):
+            return False
+        self._sources = sources
+        self.recompute()
+        return True
+
+    def recompute(self) -> None:
+        self.distance[:] = np.inf
+        self.relax(self._sources)
+        self.descend(slice(None))
+        self.recomputes += 1
+
+    def relax(self, frontier: np.ndarray) -> None:
+        """Label-correcting relaxation from the sources, one vectorized wavefront per step"""
+        dist = self.distance
+        dist[frontier] = 0
+        while frontier.size:
+            neighbors = self._neighbors[frontier]
+            candidates = dist[frontier][:, None] + NEIGHBOR_COSTS[None, :]
+            valid = neighbors >= 0
+            neighbors, candidates = neighbors[valid], candidates[valid]
+            better = candidates < dist[neighbors]
+            if not np.any(better):
+                break
+            neighbors, candidates = neighbors[better], candidates[better]
+            np.minimum.at(dist, neighbors, candidates)
+            frontier = np.unique(neighbors)
+
+    def descend(self, cells) -> None:
+        """Points each of `cells` at the neighbour that descends the most"""
+        dist = self.distance[cells]
+        neighbors = self._neighbors[cells]
+        neighbor_dist = np.where(neighbors >= 0, self.distance[neighbors], np.inf) + NEIGHBOR_COSTS[None, :]
+        best = np.argmin(neighbor_dist, axis=1)
+        descends = neighbor_dist[np.arange(len(best)), best] <= dist
+        offsets = NEIGHBOR_OFFSETS[best] / NEIGHBOR_COSTS[best, None]
+        self.flow[cells] = np.where((descends & np.isfinite(dist))[:, None], offsets, 0)
+
+    def sample(self, positions: np.ndarray, targets: np.ndarray) -> np.ndarray:
+        """
+        Unit steering vectors for an (N, 2) array of positions.
+        Targets may be a single position or one per row, entities that are
+        next to their target or off the field steer straight at it.
+        """
+        positions = np.asarray(positions, dtype=np.float64).reshape(-1, 2)
+        cells = self.cell_indices(positions)
+        directions = self.flow[cells]
+
+        direct = np.asarray(targets, dtype=np.float64) - positions
+        direct /= np.linalg.norm(direct, axis=-1, keepdims=True) + 1e-9
+        straight = (self.distance[cells] <= NEIGHBOR_COSTS[-1]) | ~np.any(directions, axis=1)
+        directions[straight] = direct[straight]
+        return directions
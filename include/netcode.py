@@ -0,0 +1,244 @@
+import time
+import zlib
+import socket
+import struct
+from collections import OrderedDict
+import numpy as np
+from panda3d.core import ShaderBuffer, GeomEnums
+from .packing import pack_drawables, pack_projectiles, PACKED_DRAWABLE_UINTS, PACKED_PROJECTILE_UINTS
+
+# quantization step of every column of the render buffers
+DRAWABLE_STEPS = np.array([1/256] * 4 + [1/255] * 4 + [1/64] * 4)
+PROJECTILE_STEPS = np.array([1/256] * 3 + [1/1024] + [1/255] * 4)
+PORTAL_STEPS = PROJECTILE_STEPS
+
+# channel name -> (capacity, quantization steps, compact packing kind)
+CHANNELS = OrderedDict([
+    ("PlayerData",              (64,  DRAWABLE_STEPS,   "drawable")),
+    ("EnemyData",               (255, DRAWABLE_STEPS,   "drawable")),
+    ("PlayerProjectileData",    (255, PROJECTILE_STEPS, "projectile")),
+    ("EnemyProjectileData",     (255, PROJECTILE_STEPS, "projectile")),
+    ("portalData",              (32,  PORTAL_STEPS,     None)),
+])
+
+SNAPSHOT_MAGIC = b"WTS1"
+INPUT_MAGIC = b"WTC1"
+# magic, tick, base tick, then one row count per channel
+SNAPSHOT_HEADER = struct.Struct("<4sII" + "H" * len(CHANNELS))
+# magic, acked tick, move x, move y, fire key bits
+INPUT_PACKET = struct.Struct("<4sIbbB")
+NO_TICK = 0xFFFFFFFF
+MAX_DATAGRAM = 65507
+
+def quantize(channels:dict) -> tuple[dict, dict]:
+    """
+    Full capacity int32 arrays of the render buffers with rows past each
+    count zeroed, so deltas between snapshots are zero wherever nothing moved.
+    `channels` maps channel name -> (count, float rows).
+    """
+    counts, arrays = {}, {}
+    for name, (capacity, steps, _) in CHANNELS.items():
+        count, rows = channels[name]
+        out = np.zeros((capacity, len(steps)), dtype=np.int32)
+        out[:count] = np.rint(np.asarray(rows[:count], dtype=np.float64) / steps)
+        counts[name], arrays[name] = count, out
+    return counts, arrays
+
+def dequantize(name:str, quantized:np.ndarray) -> np.ndarray:
+    return (quantized * CHANNELS[name][1]).astype(np.float32)
+
+def encode_snapshot(tick:int, counts:dict, arrays:dict, base:dict | None = None, base_tick:int = NO_TICK) -> bytes:
+    """Delta against `base` when given, then zlib, runs of unchanged values compress away"""
+    payload = b"".join(
+        (arrays[name] - base[name] if base is not None else arrays[name]).tobytes()
+        for name in CHANNELS
+    )
+    header = SNAPSHOT_HEADER.pack(SNAPSHOT_MAGIC, tick, base_tick, *(counts[name] for name in CHANNELS))
+    return header + zlib.compress(payload, 1)
+
+def decode_snapshot(packet:bytes, bases:dict) -> tuple[int, dict, dict] | None:
+    """Returns (tick, counts, arrays), None if the packet is foreign or its base is unknown"""
+    if len(packet) < SNAPSHOT_HEADER.size:
+        return None
+    magic, tick, base_tick, *counts = SNAPSHOT_HEADER.unpack_from(packet)
+    if magic != SNAPSHOT_MAGIC:
+        return None
+    base = None
+    if base_tick != NO_TICK:
+        base = bases.get(base_tick)
+        if base is None:
+            return None
+    payload = np.frombuffer(zlib.decompress(packet[SNAPSHOT_HEADER.size:]), dtype=np.int32)
+    arrays, at = {}, 0
+    for name, (capacity, steps, _) in CHANNELS.items():
+        size = capacity * len(steps)
+        array = payload[at:at + size].reshape(capacity, len(steps))
+        arrays[name] = array + base[name] if base is not None else array.copy()
+        at += size
+    return tick, dict(zip(CHANNELS, counts)), arrays
+
+class ClientState:
+    __slots__ = ["address", "slot", "acked", "last_seen", "bytes_last", "bytes_total", "packets"]
+    def __init__(self, address, slot:int):
+        self.address = address
+        self.slot = slot
+        self.acked = NO_TICK
+        self.last_seen = time.perf_counter()
+        self.bytes_last = 0
+        self.bytes_total = 0
+        self.packets = 0
+
+class SnapshotServer:
+    """
+    Authoritative side. Keeps the last `history` quantized snapshots, sends
+    every client a delta against the newest tick it acked (or a full snapshot
+    when that tick is gone), and applies the input bits clients send back to
+    the player slot each of them owns.
+    """
+    def __init__(self, players, port:int, host:str = "127.0.0.1", history:int = 64, timeout:float = 5.0):
+        self.players = players
+        self.sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self.sock.bind((host, port))
+        self.sock.setblocking(False)
+        self.history = history
+        self.timeout = timeout
+        self.snapshots = OrderedDict()
+        self.clients = {}
+
+    @property
+    def address(self) -> tuple:
+        return self.sock.getsockname()
+
+    def receive(self) -> None:
+        """Drains input packets, new addresses get a player slot"""
+        while True:
+            try:
+                packet, address = self.sock.recvfrom(64)
+            except (BlockingIOError, ConnectionResetError):
+                break
+            if len(packet) != INPUT_PACKET.size:
+                continue
+            magic, acked, move_x, move_y, fire = INPUT_PACKET.unpack(packet)
+            if magic != INPUT_MAGIC:
+                continue
+            client = self.clients.get(address)
+            if client is None:
+                slot = self.players.spawn()
+                if slot is None:
+                    continue
+                client = self.clients[address] = ClientState(address, slot)
+            if acked != NO_TICK and (client.acked == NO_TICK or acked > client.acked):
+                client.acked = acked
+            client.last_seen = time.perf_counter()
+            self.players.move_input[client.slot] = (move_x, move_y)
+            self.players.fire_input[client.slot] = [bool(fire & (1 << i)) for i in range(4)]
+
+        now = time.perf_counter()
+        for address, client in list(self.clients.items()):
+            if now - client.last_seen > self.timeout:
+                self.players.despawn(client.slot)
+                del self.clients[address]
+
+    def broadcast(self, tick:int, channels:dict) -> None:
+        counts, arrays = quantize(channels)
+        self.snapshots[tick] = arrays
+        while len(self.snapshots) > self.history:
+            self.snapshots.popitem(last=False)
+        full = None
+        for client in self.clients.values():
+            base = self.snapshots.get(client.acked)
+            if base is not None:
+                packet = encode_snapshot(tick, counts, arrays, base, client.acked)
+            else:
+                if full is None:
+                    full = encode_snapshot(tick, counts, arrays)
+                packet = full
+            if len(packet) > MAX_DATAGRAM:
+                print(f"Snapshot {tick} is {len(packet)} bytes, too large for one datagram")
+                continue
+            try:
+                self.sock.sendto(packet, client.address)
+            except OSError:
+                continue
+            client.bytes_last = len(packet)
+            client.bytes_total += len(packet)
+            client.packets += 1
+
+    def report(self) -> dict:
+        """Bytes of the last snapshot and the average per tick, per client"""
+        return {
+            f"{c.address[0]}:{c.address[1]}": {"bytes": c.bytes_last, "average": c.bytes_total / max(1, c.packets)}
+            for c in self.clients.values()
+        }
+
+    def close(self) -> None:
+        self.sock.close()
+
+class SnapshotClient:
+    """Rendering side, decodes snapshots into float32 render buffers and acks them with its input"""
+    def __init__(self, address:tuple, history:int = 64):
+        self.address = address
+        self.sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self.sock.setblocking(False)
+        self.history = history
+        self.snapshots = OrderedDict()
+        self.tick = NO_TICK
+        self.counts = {name: 0 for name in CHANNELS}
+        self.bytes_received = 0
+
+    def send_input(self, move:tuple = (0, 0), fire:tuple = (False,) * 4) -> None:
+        bits = sum(1 << i for i, held in enumerate(fire) if held)
+        self.sock.sendto(INPUT_PACKET.pack(INPUT_MAGIC, self.tick, int(move[0]), int(move[1]), bits), self.address)
+
+    def receive(self) -> dict | None:
+        """Newest decodable snapshot as channel name -> (count, float32 rows), None if nothing new"""
+        newest = None
+        while True:
+            try:
+                packet, _ = self.sock.recvfrom(MAX_DATAGRAM)
+            except (BlockingIOError, ConnectionResetError):
+                break
+            self.bytes_received += len(packet)
+            decoded = decode_snapshot(packet, self.snapshots)
+            if decoded is None:
+                continue
+            tick, counts, arrays = decoded
+            self.snapshots[tick] = arrays
+            while len(self.snapshots) > self.history:
+                self.snapshots.popitem(last=False)
+            if self.tick == NO_TICK or tick > self.tick:
+                self.tick, self.counts, newest = tick, counts, arrays
+        if newest is None:
+            return None
+        return {name: (self.counts[name], dequantize(name, newest[name])) for name in CHANNELS}
+
+    def close(self) -> None:
+        self.sock.close()
+
+class RemoteBuffer:
+    """Stands in for a manager as the owner of a canvas SSBO, filled from snapshots"""
+    def __init__(self, name:str, compact:bool = False):
+        self.name = name
+        capacity, steps, self.kind = CHANNELS[name]
+        self.compact = compact and self.kind is not None
+        self.active_count = 0
+        self._buffer = np.zeros((capacity, len(steps)), dtype=np.float32)
+        uints = PACKED_DRAWABLE_UINTS if self.kind == "drawable" else PACKED_PROJECTILE_UINTS
+        self._packed = np.zeros((capacity, uints), dtype=np.uint32)
+        self.ssbo = None
+        self.ssbo_generation = 0
+        self.load(0, self._buffer)
+
+    def load(self, count:int, rows:np.ndarray) -> None:
+        # unchanged channels keep their generation, so nothing is re-bound or rebaked
+        if self.ssbo is not None and count == self.active_count and np.array_equal(self._buffer, rows):
+            return
+        self._buffer[:] = rows
+        self.active_count = count
+        self.ssbo_generation += 1
+        if self.compact:
+            pack = pack_drawables if self.kind == "drawable" else pack_projectiles
+            pack(self._buffer[:count], out=self._packed[:count])
+            self.ssbo = ShaderBuffer(self.name, self._packed.tobytes(), GeomEnums.UH_static)
+        else:
+            self.ssbo = ShaderBuffer(self.name, self._buffer.tobytes(), GeomEnums.UH_static)
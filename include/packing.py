@@ -0,0 +1,108 @@
+"""
+Compact SSBO wire format, unpacked by canvas.frag when COMPACT_SSBO is defined.
+
+Drawables shrink from 12 floats (48 bytes) to 4 uints (16 bytes):
+    half2 position, half2 (scale, type), rgba8 color, unorm16 (health, shield) ratios
+Projectiles shrink from 8 floats (32 bytes) to 3 uints (12 bytes):
+    half2 position, half scale, rgba8 color
+The absolute spawn time is left out, float16 loses whole seconds of it after
+half an hour of play and the shader never reads it.
+"""
+
+import numpy as np
+
+DRAWABLE_FLOATS = 12
+PROJECTILE_FLOATS = 8
+PACKED_DRAWABLE_UINTS = 4
+PACKED_PROJECTILE_UINTS = 3
+
+def pack_half2(a: np.ndarray, b: np.ndarray) -> np.ndarray:
+    """Matches GLSL packHalf2x16, `a` in the low bits"""
+    low = np.asarray(a, dtype=np.float16).view(np.uint16).astype(np.uint32)
+    high = np.asarray(b, dtype=np.float16).view(np.uint16).astype(np.uint32)
+    return low | (high << 16)
+
+def unpack_half2(packed: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    packed = np.asarray(packed, dtype=np.uint32)
+    low = (packed & 0xFFFF).astype(np.uint16).view(np.float16).astype(np.float32)
+    high = (packed >> 16).astype(np.uint16).view(np.float16).astype(np.float32)
+    return low, high
+
+def pack_unorm4x8(rgba: np.ndarray) -> np.ndarray:
+    """Matches GLSL packUnorm4x8, red in the low byte"""
+    channels = np.round(np.clip(rgba, 0, 1) * 255).astype(np.uint32)
+    return channels[:, 0] | (channels[:, 1] << 8) | (channels[:, 2] << 16) | (channels[:, 3] << 24)
+
+def unpack_unorm4x8(packed: np.ndarray) -> np.ndarray:
+    packed = np.asarray(packed, dtype=np.uint32)
+    shifts = np.array([0, 8, 16, 24], dtype=np.uint32)
+    return ((packed[:, None] >> shifts) & 0xFF).astype(np.float32) / 255
+
+def pack_unorm2x16(a: np.ndarray, b: np.ndarray) -> np.ndarray:
+    """Matches GLSL packUnorm2x16, `a` in the low bits"""
+    low = np.round(np.clip(a, 0, 1) * 65535).astype(np.uint32)
+    high = np.round(np.clip(b, 0, 1) * 65535).astype(np.uint32)
+    return low | (high << 16)
+
+def unpack_unorm2x16(packed: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    packed = np.asarray(packed, dtype=np.uint32)
+    return (packed & 0xFFFF).astype(np.float32) / 65535, (packed >> 16).astype(np.float32) / 65535
+
+def pack_drawables(rows: np.ndarray, out: np.ndarray | None = None) -> np.ndarray:
+    """Packs (N, 12) drawable rows in the float layout into (N, 4) uints"""
+    if out is None:
+        out = np.zeros((len(rows), PACKED_DRAWABLE_UINTS), dtype=np.uint32)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        health = np.where(rows[:, 8] > 0, rows[:, 10] / rows[:, 8], 0)
+        shield = np.where(rows[:, 9] > 0, rows[:, 11] / rows[:, 9], 0)
+    out[:, 0] = pack_half2(rows[:, 0], rows[:, 1])
+    out[:, 1] = pack_half2(rows[:, 2], rows[:, 3])
+    out[:, 2] = pack_unorm4x8(rows[:, 4:8])
+    out[:, 3] = pack_unorm2x16(health, shield)
+    return out
+
+def unpack_drawables(packed: np.ndarray) -> np.ndarray:
+    """Inverse of pack_drawables, health and shield come back as ratios of 1"""
+    rows = np.zeros((len(packed), DRAWABLE_FLOATS), dtype=np.float32)
+    rows[:, 0], rows[:, 1] = unpack_half2(packed[:, 0])
+    rows[:, 2], rows[:, 3] = unpack_half2(packed[:, 1])
+    rows[:, 4:8] = unpack_unorm4x8(packed[:, 2])
+    rows[:, 8:10] = 1
+    rows[:, 10], rows[:, 11] = unpack_unorm2x16(packed[:, 3])
+    return rows
+
+def pack_projectiles(rows: np.ndarray, out: np.ndarray | None = None) -> np.ndarray:
+    """Packs (N, 8) projectile rows in the float layout into (N, 3) uints"""
+    if out is None:
+        out = np.zeros((len(rows), PACKED_PROJECTILE_UINTS), dtype=np.uint32)
+    out[:, 0] = pack_half2(rows[:, 0], rows[:, 1])
+    out[:, 1] = pack_half2(rows[:, 2], 0)
+    out[:, 2] = pack_unorm4x8(rows[:, 4:8])
+    return out
+
+def unpack_projectiles(packed: np.ndarray) -> np.ndarray:
+    """Inverse of pack_projectiles, the spawn time comes back as 0"""
+    rows = np.zeros((len(packed), PROJECTILE_FLOATS), dtype=np.float32)
+    rows[:, 0], rows[:, 1] = unpack_half2(packed[:, 0])
+    rows[:, 2] = unpack_half2(packed[:, 1])[0]
+    rows[:, 4:8] = unpack_unorm4x8(packed[:, 2])
+    return rows
+
+def byte_report(buffers: dict) -> dict:
+    """
+    Per buffer upload size for both formats, `buffers` maps a name to
+    ("drawable" | "projectile", row count).
+    """
+    sizes = {
+        "drawable": (DRAWABLE_FLOATS * 4, PACKED_DRAWABLE_UINTS * 4),
+        "projectile": (PROJECTILE_FLOATS * 4, PACKED_PROJECTILE_UINTS * 4),
+    }
+    report = {}
+    for name, (kind, count) in buffers.items():
+        full, compact = sizes[kind]
+        report[name] = {"rows": count, "float_bytes": full * count, "compact_bytes": compact * count}
+    report["total"] = {
+        key: sum(entry[key] for entry in report.values())
+        for key in ("rows", "float_bytes", "compact_bytes")
+    }
+    return report
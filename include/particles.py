@@ -0,0 +1,134 @@
+import numpy as np
+from panda3d.core import (
+    Geom, GeomNode, GeomPoints, GeomEnums, GeomVertexArrayFormat, GeomVertexData,
+    GeomVertexFormat, InternalName, NodePath, OmniBoundingVolume, ShaderAttrib,
+    TransparencyAttrib,
+)
+
+class ParticleSystem:
+    """
+    Short lived hit and death particles in a struct of arrays store.
+    Live particles are packed at the front of every array in emission order,
+    so the oldest sit first: emitting past capacity drops them like a ring
+    buffer, and expiry compacts the survivors with one index per array.
+    Integration and fade are one vectorized pass, and drawing is a single
+    point primitive over a vertex buffer filled straight from the store.
+    """
+    def __init__(self, capacity:int = 20000, seed:int | None = None):
+        self.capacity = capacity
+        self.count = 0
+        self.positions = np.zeros((capacity, 2), dtype=np.float32)
+        self.velocities = np.zeros((capacity, 2), dtype=np.float32)
+        self.colors = np.zeros((capacity, 4), dtype=np.float32)
+        self.sizes = np.zeros(capacity, dtype=np.float32)
+        self.ages = np.zeros(capacity, dtype=np.float32)
+        self.lifetimes = np.ones(capacity, dtype=np.float32)
+        self.drags = np.zeros(capacity, dtype=np.float32)
+        self._fields = [self.positions, self.velocities, self.colors, self.sizes, self.ages, self.lifetimes, self.drags]
+        self._rng = np.random.default_rng(seed)
+        self.emitted = 0
+        self.dropped = 0
+
+        self.node = None
+        self._vertex_data = None
+        self._points = None
+
+    def emit(self, positions:np.ndarray, color, count:int = 8, speed:float = 12.0, lifetime:float = 0.5, size:float = 0.5, drag:float = 4.0) -> None:
+        """Bursts of `count` particles flying out of each of an (N, 2) array of positions"""
+        positions = np.asarray(positions, dtype=np.float32).reshape(-1, 2)
+        total = len(positions) * count
+        if not total:
+            return
+        if total > self.capacity:
+            positions, total = positions[-(self.capacity // count):], self.capacity // count * count
+        overflow = self.count + total - self.capacity
+        if overflow > 0:
+            self._keep(np.arange(overflow, self.count))
+            self.dropped += overflow
+
+        new = slice(self.count, self.count + total)
+        angles = self._rng.uniform(0, 2 * np.pi, total)
+        speeds = speed * self._rng.uniform(0.3, 1.0, total)
+        self.positions[new] = np.repeat(positions, count, axis=0)
+        self.velocities[new, 0] = np.cos(angles) * speeds
+        self.velocities[new, 1] = np.sin(angles) * speeds
+        self.colors[new] = np.broadcast_to(np.asarray(color, dtype=np.float32), (total, 4)) if np.ndim(color) < 2 else np.repeat(color, count, axis=0)
+        self.sizes[new] = size * self._rng.uniform(0.5, 1.0, total)
+        self.ages[new] = 0
+        self.lifetimes[new] = lifetime * self._rng.uniform(0.6, 1.0, total)
+        self.drags[new] = drag
+        self.count += total
+        self.emitted += total
+
+    def _keep(self, rows:np.ndarray) -> None:
+        """Moves `rows` to the front of every field in order, everything else is freed"""
+        kept = len(rows)
+        for field in self._fields:
+            field[:kept] = field[rows]
+        self.count = kept
+
+    def update(self, dt:float) -> None:
+        count = self.count
+        if not count:
+            return
+        live = slice(0, count)
+        self.ages[live] += dt
+        self.velocities[live] *= np.maximum(0, 1 - self.drags[live, None] * dt)
+        self.positions[live] += self.velocities[live] * dt
+        expired = self.ages[live] >= self.lifetimes[live]
+        if np.any(expired):
+            self._keep(np.flatnonzero(~expired))
+
+    def attach(self, shader, parent:NodePath, sort:int = 100) -> None:
+        """Builds the point primitive drawn over the canvas with `shader`"""
+        array = GeomVertexArrayFormat()
+        # x, y, size, fade
+        array.add_column(InternalName.get_vertex(), 4, Geom.NT_float32, Geom.C_point)
+        array.add_column(InternalName.get_color(), 4, Geom.NT_float32, Geom.C_color)
+        vertex_format = GeomVertexFormat.register_format(GeomVertexFormat(array))
+        self._vertex_data = GeomVertexData("particles", vertex_format, GeomEnums.UH_stream)
+        self._vertex_data.unclean_set_num_rows(self.capacity)
+        self._points = GeomPoints(GeomEnums.UH_stream)
+        geom = Geom(self._vertex_data)
+        geom.add_primitive(self._points)
+        node = GeomNode("particles")
+        node.add_geom(geom)
+        # positions are placed in the vertex shader, nothing here can be culled
+        node.set_bounds(OmniBoundingVolume())
+        node.set_final(True)
+
+        self.node = parent.attach_new_node(node)
+        self.node.set_shader(shader)
+        self.node.set_attrib(self.node.get_attrib(ShaderAttrib).set_flag(ShaderAttrib.F_shader_point_size, True))
+        self.node.set_transparency(TransparencyAttrib.M_alpha)
+        self.node.set_depth_test(False)
+        self.node.set_depth_write(False)
+        self.node.set_bin("fixed", sort)
+
+    def pack(self, rows:np.ndarray) -> int:
+        """Writes the live particles as vertex rows of position, size, fade and color, returns how many"""
+        count = self.count
+        rows[:count, 0:2] = self.positions[:count]
+        rows[:count, 2] = self.sizes[:count]
+        rows[:count, 3] = 1 - self.ages[:count] / self.lifetimes[:count]
+        rows[:count, 4:8] = self.colors[:count]
+        return count
+
+    def draw(self, rows:np.ndarray | None = None, count:int = 0) -> None:
+        """Copies the live particles, or `count` rows packed earlier, into the vertex buffer, one draw call for all of them"""
+        if self.node is None:
+            return
+        vertices = np.asarray(memoryview(self._vertex_data.modify_array(0))).view(np.float32).reshape(self.capacity, 8)
+        if rows is None:
+            count = self.pack(vertices)
+        else:
+            vertices[:count] = rows[:count]
+        self._points.clear_vertices()
+        if count:
+            self._points.add_consecutive_vertices(0, count)
+
+    def destroy(self) -> None:
+        if self.node is not None:
+            self.node.remove_node()
+            self.node = None
+        self.count = 0
@@ -1,16 +1,4 @@
-import math
-
-def get_vector_between_entities(e1, e2) -> tuple[int, int]:
-    dx = e1.x - e2.x
-    dy = e1.y - e2.y
-    angle = math.atan2(dx, dy)
-    return (math.sin(angle), math.cos(angle))
-
-def cap_velocity(x_vel, y_vel, max_vel):
-    angle = math.atan2(y_vel, x_vel)
-    new_x_vel = math.cos(angle) * max_vel
-    new_y_vel = math.sin(angle) * max_vel
-    return new_x_vel, new_y_vel
+import numpy as np
 
 def detect_circle_collision(projectile, entity, overlap:float=0.0):
     dx = projectile.x - entity.x
@@ -18,3 +6,26 @@ def detect_circle_collision(projectile, entity, overlap:float=0.0):
     distance = (dx**2 + dy**2)**0.5
     return distance <= (projectile.scale/3 + entity.scale[0]/2) * (1.0 - overlap * ((projectile.scale/3)/(entity.scale[0]/2)))
 
+
+def swept_circle_toi(starts, ends, radii, centers, target_radii) -> np.ndarray:
+    """
+    Time of impact in [0, 1] of circles moving from `starts` to `ends`
+    against static circles, 0 if they already overlap and inf where they miss.
+    Arguments broadcast against each other, positions along the last axis.
+    """
+    starts, ends = np.asarray(starts, dtype=np.float64), np.asarray(ends, dtype=np.float64)
+    d = ends - starts
+    f = starts - np.asarray(centers, dtype=np.float64)
+    combined = np.asarray(target_radii, dtype=np.float64) + np.asarray(radii, dtype=np.float64)
+
+    a = np.sum(d * d, axis=-1)
+    b = 2 * np.sum(f * d, axis=-1)
+    c = np.sum(f * f, axis=-1) - combined ** 2
+    disc = b * b - 4 * a * c
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        t = (-b - np.sqrt(np.maximum(disc, 0))) / (2 * a)
+    hit = (disc >= 0) & (a > 0) & (t >= 0) & (t <= 1)
+    toi = np.where(hit, t, np.inf)
+    # circles already overlapping at the start of the sweep hit immediately
+    return np.where(c <= 0, 0.0, toi)
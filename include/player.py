@@ -1,194 +1,224 @@
 import ursina
-import time
-import math
 import numpy as np
 from panda3d.core import ShaderBuffer, GeomEnums
-from .physics import cap_velocity
-
-
-DIAG_MOVE_MULTIPLIER = math.sqrt(0.5)
-
-MOVEMENT_KEYS = [
-    ("s", "w"),
-    ("a", "d")
+from . import shared
+from .kernels import move_players, player_shots
+from .packing import pack_drawables, PACKED_DRAWABLE_UINTS
+from .render_state import swap_staged
+
+
+RNG_HALF_MASK = (1 << 64) - 1
+
+# per player keyboard bindings, movement as (negative, positive) pairs for y then x
+# and fire keys in face direction order: down, up, left, right
+INPUT_MAPS = [
+    {
+        "move": [("s", "w"), ("a", "d")],
+        "fire": ["down arrow", "up arrow", "left arrow", "right arrow"],
+    },
+    {
+        "move": [("k", "i"), ("j", "l")],
+        "fire": ["g", "t", "f", "h"],
+    },
 ]
 
-FIRE_KEYS = [
-    ("down arrow", "up arrow"),
-    ("left arrow", "right arrow")
-]
-FIRE_KEYS_UNPACKED = [
-    *FIRE_KEYS[0],
-    *FIRE_KEYS[1]
-]
-
-class Player():
-    def __init__(self, game, **kwargs):
-        # super().__init__(collider=None)
+class PlayerManager:
+    """
+    Players stored in the same array layout as the enemies so the drawable
+    upload, portals and collision queries treat them alike. Each slot is
+    driven by a keyboard input map, by drive_bots, or by whatever writes its
+    move_input / fire_input rows (e.g. a network client), and movement and
+    firing run on all of them at once.
+
+    Columns: 0:2 position, 2 scale, 3 face direction, 4:8 color,
+    8:10 velocity, 10 total velocity, 11 next shot, 12 portal time,
+    16:20 max health, max shield, health, shield
+    """
+    def __init__(self, game, max_entities:int = 64):
         self.game = game
-        self.x = 0
-        self.y = 0
-        self.z = 0
-
-        self.origin_y = 0
-        self.scale = 3
-        self.color = ursina.color.white
-
-        self.max_health = 100
-        self.max_shield = 100
-        self.health = 100
-        self.shield = 100
-
+        self.name = "Player"
+        self.max_entities = max_entities
+        self.used_mask = shared.zeros(game, "Player.used_mask", max_entities, bool)
+        self.data = shared.zeros(game, "Player.data", (max_entities, 20), np.float64)
+        self.input_maps = [None] * max_entities
+        # -1 / 0 / 1 per axis (x, y) and held fire keys, bots write these directly
+        self.move_input = np.zeros((max_entities, 2), dtype=np.float64)
+        self.fire_input = np.zeros((max_entities, 4), dtype=bool)
+        # newest (slots, move, fire) keyboard sample, taken by sample_input
+        self._input_sample = None
+        self._fire_held = np.zeros((max_entities, 4), dtype=bool)
+        self.bots = np.zeros(max_entities, dtype=bool)
+        self._bot_turns = np.zeros(max_entities, dtype=np.float64)
+        self._rng = np.random.default_rng()
+        # PCG64 state of the bot generator as (state, inc) in 64 bit halves, has_uint32, uinteger
+        self._rng_state = np.zeros(6, dtype=np.uint64)
+
+        # shared tuning, the sliders write these
         self.base_acceleration = 10
         self.max_velocity = 20
         self.min_velocity = 0.08
         self.decay_rate = 0.04
-
-        self.teleport_cooldown = 2.5 
-        self.next_teleport = time.time()
-
-        self.portal_cooldown = 2.5 
-        self.next_portal = time.time()
-
+        self.portal_cooldown = 2.5
         self.range = 2
         self.fire_rate = 22
         self.projectile_decay_rate = 0.01
         self.projectile_speed_multiplier = 1
         self.base_projectile_speed = 40
-        self.next_shot = time.time()
-        self.held_keys = []
-
-        self.x_velocity = 0
-        self.moving_x = False
-        self.y_velocity = 0
-        self.moving_y = False
-        self.total_velocity = 0
-        self.fired_projectiles = []
-
-        self.face_direction = 0
-
-        # Buffer for shader data
-        self._buffer = np.zeros((1, 12), dtype=np.float32)
+        self.projectile_scale = 1.75
+        self.projectile_color = (0, 0, 1, 1)
+
+        self.active_count = 0
+        self.generation = 0
+        self._active_indices = np.zeros(0, dtype=np.intp)
+        self._active_generation = 0
+
+        self._buffer = np.zeros((max_entities, 12), dtype=np.float32)
+        self._staging = np.zeros_like(self._buffer)
+        self._packed = np.zeros((max_entities, PACKED_DRAWABLE_UINTS), dtype=np.uint32)
+        self._uploaded_count = -1
+        self.ssbo = None
+        self.ssbo_generation = 0
+        self.drawn_count = 0
+        self.update_ssbo()
 
-        # self.eyes = [
-        #     ursina.Entity(model='circle', scale=.1, parent=self, color=ursina.color.black, x=0, y=0, z=-1, origin_y=-2, origin_x=2),
-        #     ursina.Entity(model='circle', scale=.1, parent=self, color=ursina.color.black, x=0, y=0, z=-1, origin_y=-2, origin_x=-2)
-        # ]
+    @property
+    def active_indices(self) -> np.ndarray:
+        """Sorted indices of used slots, rebuilt at most once per generation"""
+        if self._active_generation != self.generation:
+            self._active_indices = np.flatnonzero(self.used_mask)
+            self._active_generation = self.generation
+        return self._active_indices
 
-        # self.hand = ursina.Entity(model='quad', scale=.35, texture="ball.png", color=ursina.color.green, x=0, y=0, z=-0.95, origin_y=-1)
-        # self.hand.alpha = 0.5
+    @property
+    def positions(self) -> np.ndarray:
+        return self.data[self.active_indices, 0:2]
 
-        # self.ignore_list = [self, self.hand]
-        
-        for key, value in kwargs.items():
-            setattr(self, key, value)
+    @property
+    def scales(self) -> np.ndarray:
+        return self.data[self.active_indices, 2]
+
+    def spawn(self, position:tuple = (0, 0), input_map:dict | None = None, bot:bool = False, color:ursina.Vec4 = ursina.color.white, scale:float = 3, max_health:float = 100, max_shield:float = 100) -> int | None:
+        """Adds a player driven by `input_map`, by drive_bots if `bot`, else by external input"""
+        if self.active_count >= self.max_entities:
+            return None
+        id_ = int(np.argmax(~self.used_mask))
+        self.used_mask[id_] = True
+        self.active_count += 1
+        self.generation += 1
+        self.input_maps[id_] = input_map
+        self.bots[id_] = bot
+        self.move_input[id_] = 0
+        self.fire_input[id_] = False
+        self._fire_held[id_] = False
+        self.data[id_] = 0
+        self.data[id_, 0:4] = (*position, scale, 0)
+        self.data[id_, 4:8] = tuple(color)
+        self.data[id_, 16:20] = (max_health, max_shield, max_health, max_shield)
+        return id_
+
+    def despawn(self, id_:int) -> bool:
+        if not self.used_mask[id_]:
+            return False
+        self.used_mask[id_] = False
+        self.input_maps[id_] = None
+        self.bots[id_] = False
+        self.active_count -= 1
+        self.generation += 1
+        return True
+
+    def state_arrays(self) -> list:
+        """Input maps are bindings to local keys, they are not part of the state"""
+        return [self.data, self.used_mask, self.move_input, self.fire_input, self._fire_held, self.bots, self._bot_turns, self._rng_state]
+
+    def state_saving(self) -> None:
+        """Copies the bot generator's state into its array, so replays make the same bot choices"""
+        state = self._rng.bit_generator.state
+        pcg = state["state"]
+        self._rng_state[:] = (pcg["state"] >> 64, pcg["state"] & RNG_HALF_MASK, pcg["inc"] >> 64, pcg["inc"] & RNG_HALF_MASK, state["has_uint32"], state["uinteger"])
+
+    def state_restored(self) -> None:
+        self.active_count = int(np.count_nonzero(self.used_mask))
+        state = self._rng.bit_generator.state
+        high_state, low_state, high_inc, low_inc, has_uint32, uinteger = (int(value) for value in self._rng_state)
+        state["state"] = {"state": high_state << 64 | low_state, "inc": high_inc << 64 | low_inc}
+        state["has_uint32"], state["uinteger"] = has_uint32, uinteger
+        self._rng.bit_generator.state = state
+        for id_ in np.flatnonzero(~self.used_mask).tolist():
+            self.input_maps[id_] = None
+        self.generation += 1
 
-        self.ssbo = None 
-        self.update_ssbo()
-    
     def update_ssbo(self):
-        self._buffer[:] = (
-            self.x,
-            self.y,
-            self.scale,
-            self.face_direction,
-            *self.color,
-            self.max_health,
-            self.max_shield,
-            self.health,
-            self.shield
-        )
-        self.ssbo = ShaderBuffer("PlayerData", self._buffer.tobytes(), GeomEnums.UH_static)
+        active = self.game.visible_rows(self.data, self.active_indices)
+        count = self.drawn_count = len(active)
+        self._staging[:count, 0:8] = self.data[active, 0:8]
+        self._staging[:count, 8:12] = self.data[active, 16:20]
+        if not swap_staged(self, count):
+            return
+        if self.game.compact_ssbo:
+            pack_drawables(self._buffer[:count], out=self._packed[:count])
+            self.ssbo = ShaderBuffer("PlayerData", self._packed.tobytes(), GeomEnums.UH_static)
+        else:
+            self.ssbo = ShaderBuffer("PlayerData", self._buffer.tobytes(), GeomEnums.UH_static)
+
+    def sample_input(self) -> None:
+        """
+        Samples the keyboard for every player with an input map, on the thread
+        that owns the window. The sample is swapped in whole, read_input on the
+        simulation side picks up the newest one and never sees half of it.
+        """
+        held = ursina.held_keys
+        ids = [id_ for id_ in np.flatnonzero(self.used_mask).tolist() if self.input_maps[id_] is not None]
+        move = np.zeros((len(ids), 2), dtype=np.float64)
+        fire = np.zeros((len(ids), 4), dtype=bool)
+        for row, id_ in enumerate(ids):
+            input_map = self.input_maps[id_]
+            (down, up), (left, right) = input_map["move"]
+            # the positive key wins when both of a pair are held
+            move[row, 1] = 1 if held[up] else (-1 if held[down] else 0)
+            move[row, 0] = 1 if held[right] else (-1 if held[left] else 0)
+            fire[row] = [bool(held[k]) for k in input_map["fire"]]
+        self._input_sample = (np.array(ids, dtype=np.intp), move, fire)
+
+    def read_input(self) -> None:
+        """Applies the newest keyboard sample to the players it was taken for"""
+        sample = self._input_sample
+        if sample is None:
+            return
+        ids, move, fire = sample
+        # slots despawned or handed to another driver since the sample keep their input
+        mapped = np.array([self.input_maps[id_] is not None for id_ in ids.tolist()], dtype=bool)
+        self.move_input[ids[mapped]] = move[mapped]
+        self.fire_input[ids[mapped]] = fire[mapped]
+
+    def drive_bots(self, now:float, turn_interval:float = 0.75) -> None:
+        """Random walk and fire input for bot players, for load tests"""
+        active = self.active_indices
+        bots = active[self.bots[active]]
+        turning = bots[self._bot_turns[bots] < now]
+        if not len(turning):
+            return
+        self.move_input[turning] = self._rng.integers(-1, 2, size=(len(turning), 2))
+        self.fire_input[turning] = False
+        self.fire_input[turning, self._rng.integers(0, 4, size=len(turning))] = True
+        self._bot_turns[turning] = now + turn_interval * self._rng.uniform(0.5, 1.5, size=len(turning))
 
-    @property
-    def position2d(self):
-        return ursina.Vec2(self.x, self.y)
-
-    def handle_movement(self, dt):
-        self.moving_y = any(ursina.held_keys[k] for k in MOVEMENT_KEYS[0])
-        self.moving_x = any(ursina.held_keys[k] for k in MOVEMENT_KEYS[1])
-
-        move_multiplier = DIAG_MOVE_MULTIPLIER if self.moving_x and self.moving_y else 1
-
-        y_acc = (
-            self.base_acceleration
-            * move_multiplier
-            * int(self.moving_y)
-            * (1 if ursina.held_keys[MOVEMENT_KEYS[0][1]] else -1)
-        )
-        x_acc = (
-            self.base_acceleration
-            * move_multiplier
-            * int(self.moving_x)
-            * (1 if ursina.held_keys[MOVEMENT_KEYS[1][1]] else -1)
-        )
-
-        # Set eye position
-        # angle=math.atan2(x_acc, y_acc)
-        # for e in self.eyes:
-        #     e.rotation_z = angle*180/math.pi
-
-        self.y_velocity = max(-self.max_velocity, min(self.max_velocity, self.y_velocity + y_acc))
-        self.x_velocity = max(-self.max_velocity, min(self.max_velocity, self.x_velocity + x_acc))
-
-        total_vel = math.sqrt(
-            self.y_velocity * self.y_velocity
-            + self.x_velocity * self.x_velocity
-        )
-
-        if total_vel > self.max_velocity:
-            self.x_velocity, self.y_velocity = cap_velocity(self.x_velocity, self.y_velocity, self.max_velocity)
-
-        if total_vel < self.min_velocity and not (self.moving_x or self.moving_y): 
-            self.x_velocity = 0
-            self.y_velocity = 0
-            
-        self.x_velocity = self.x_velocity * (1-self.decay_rate)
-        self.y_velocity = self.y_velocity * (1-self.decay_rate)
-
-        self.total_velocity = math.sqrt(
-            self.y_velocity * self.y_velocity
-            + self.x_velocity * self.x_velocity
-        )
-
-        self.x += self.x_velocity * ursina.time.dt
-        self.y += self.y_velocity * ursina.time.dt
-
-    def handle_projectile(self):
-        shooting_y = any(ursina.held_keys[k] for k in FIRE_KEYS[0])
-        shooting_x = any(ursina.held_keys[k] for k in FIRE_KEYS[1])
-        if not (shooting_x or shooting_y):
+    def handle_movement(self, dt:float) -> None:
+        if not self.active_count:
+            return
+        active = self.active_indices
+        move_players(self.data, active, self.move_input[active], self, dt)
+
+    def handle_projectile(self, now:float, dt:float) -> None:
+        if not self.active_count:
             return
-        pressed_keys = [
-            *[k for k in FIRE_KEYS[0] if ursina.held_keys[k]],
-            *[k for k in FIRE_KEYS[1] if ursina.held_keys[k]],
-        ]
-        new_held_keys = [k for k in pressed_keys if not k in self.held_keys]
-        if new_held_keys:
-            new_held_key = new_held_keys[0]
-            self.face_direction = FIRE_KEYS_UNPACKED.index(new_held_key)
-        self.held_keys = new_held_keys
-        # angle=math.atan2(*[[0,-1], [0,1], [-1,0], [1,0]][self.face_direction])
-        
-        # self.hand.rotation_z = angle*180/math.pi
-        now = time.time()
-        if self.next_shot < now:
-            self.fire_projectile()
-            self.next_shot = now + (1.0 / self.fire_rate)
-    
-    def fire_projectile(self):
-        options = [[0,-1], [0,1], [-1,0], [1,0]]
-        x_vel, y_vel = options[self.face_direction]
-        vel = (
-                x_vel * self.base_projectile_speed + self.x_velocity,
-                y_vel * self.base_projectile_speed + self.y_velocity,
-            )
-        self.game.player_projectiles.spawn(
-            position=(self.x, self.y),
-            velocity=vel,
-            _range = self.range,
-            decay = self.projectile_decay_rate, 
-        )
-
-    def update(self):
-        pass
\ No newline at end of file
+        active = self.active_indices
+        # every shot due since the last tick, however many that is
+        _, buffer = player_shots(self.data, self._fire_held, active, self.fire_input[active], now, dt, self)
+        if len(buffer):
+            self.game.player_projectiles.spawn_bulk(buffer)
+
+    def nearest(self, positions:np.ndarray) -> np.ndarray:
+        """Slot of the closest player to each of an (N, 2) array of positions"""
+        active = self.active_indices
+        diffs = np.asarray(positions, dtype=np.float64)[:, None, :] - self.data[active, 0:2][None, :, :]
+        return active[np.argmin(np.sum(diffs * diffs, axis=-1), axis=1)]
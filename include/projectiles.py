@@ -1,47 +1,78 @@
-import time
 import ursina
 import numpy as np
 from panda3d.core import ShaderBuffer, GeomEnums
+from .colliders import CircleColliderStore
+from . import shared
+from .packing import pack_projectiles, PACKED_PROJECTILE_UINTS
+from .render_state import swap_staged
+from .kernels import move_projectiles
 
 class ProjectileManager:
-    def __init__(self, game, name:str, max_entities: int = 255, arena_size: ursina.Vec2 = ursina.Vec2(23, 13)):
+    def __init__(self, game, name:str, max_entities: int = 255):
         self.game = game
         self.name = name
-        self.bounds = arena_size
-        self.half_width, self.half_height = self.bounds[0] / 2, self.bounds[1] / 2
         self.max_entities = max_entities
         self.entities = {}
         self.open_indicies = list(range(max_entities))
-        self.used_mask = np.zeros(max_entities, dtype=bool)
-        self.data = np.zeros((max_entities, 13), dtype=np.float32)
+        self.used_mask = shared.zeros(game, f"{name}Projectiles.used_mask", max_entities, bool)
+        self.data = shared.zeros(game, f"{name}Projectiles.data", (max_entities, 13), np.float32)
+        # positions at the start of the last step, collisions sweep from here
+        self.previous = np.zeros((max_entities, 2), dtype=np.float32)
         self._buffer = np.zeros((max_entities, 8), dtype=np.float32)
+        self._staging = np.zeros_like(self._buffer)
+        self._packed = np.zeros((max_entities, PACKED_PROJECTILE_UINTS), dtype=np.uint32)
+        self._uploaded_count = -1
+
+        # bookkeeping kept up to date on spawn / despawn instead of rescanning the mask
+        self.active_count = 0
+        self.generation = 0
+        self.spawned = 0
+        self.despawned = 0
+        self._active_indices = np.zeros(0, dtype=np.intp)
+        self._active_generation = 0
+
+        # projectiles are swept from their previous position when queried
+        self.colliders = CircleColliderStore(self.data, lambda: self.active_indices, previous=self.previous)
+
         self.ssbo = None
+        self.ssbo_generation = 0
+        self.drawn_count = 0
         self.update_ssbo()
 
+    @property
+    def active_indices(self) -> np.ndarray:
+        """Sorted indices of used slots, rebuilt at most once per generation"""
+        if self._active_generation != self.generation:
+            self._active_indices = np.flatnonzero(self.used_mask)
+            self._active_generation = self.generation
+        return self._active_indices
+
+    def state_arrays(self) -> list:
+        return [self.data, self.used_mask, self.previous]
+
+    def state_restored(self) -> None:
+        self.active_count = int(np.count_nonzero(self.used_mask))
+        self.generation += 1
+
     def update_ssbo(self):
-        active_data = self.data[self.used_mask]
-        self._buffer[:len(active_data)] = active_data[:, :8]
-        self.ssbo = ShaderBuffer(f"{self.name}ProjectileData", self._buffer.tobytes(), GeomEnums.UH_static)
+        active_data = self.data[self.game.visible_rows(self.data, self.active_indices)]
+        self.drawn_count = len(active_data)
+        self._staging[:len(active_data)] = active_data[:, :8]
+        if not swap_staged(self, len(active_data)):
+            return
+        if self.game.compact_ssbo:
+            pack_projectiles(self._buffer[:len(active_data)], out=self._packed[:len(active_data)])
+            self.ssbo = ShaderBuffer(f"{self.name}ProjectileData", self._packed.tobytes(), GeomEnums.UH_static)
+        else:
+            self.ssbo = ShaderBuffer(f"{self.name}ProjectileData", self._buffer.tobytes(), GeomEnums.UH_static)
 
     def update(self, dt):
-        if not np.any(self.used_mask):
+        if not self.active_count:
             return
 
-        mask = self.used_mask
-        half_width, half_height = self.half_width, self.half_height
-        self.data[mask, 8:10] *= 1 - self.data[mask, 11][:, np.newaxis]
-        self.data[mask, 0:2] += self.data[mask, 8:10] * ursina.time.dt
-
-        out_of_bounds_mask = (np.abs(self.data[mask, 0]) > half_width * 3) | (np.abs(self.data[mask, 1]) > half_height * 3)
-        to_despawn_out_of_bounds = np.where(out_of_bounds_mask)[0]
-        if to_despawn_out_of_bounds.size:
-            self.despawn_multiple(to_despawn_out_of_bounds)
-
-        time_elapsed = time.time() - self.game.start
-        expired_mask = (self.data[:, 3] + self.data[:, 10] < time_elapsed)
-        to_despawn_expired = np.where(expired_mask)[0]
-        if to_despawn_expired.size:
-            self.despawn_multiple(to_despawn_expired)
+        active = self.active_indices
+        expired = move_projectiles(self.data, self.previous, active, dt, self.game.sim_time, self.game.collision)
+        self.despawn_multiple(active[expired])
 
         self.update_ssbo()
 
@@ -51,13 +82,17 @@ class ProjectileManager:
               scale: float = 1.75,
               decay: float = 0.01,
               color: ursina.Vec4 = ursina.Vec4(0, 0, 1, 1)) -> int | None:
-        if not np.any(~self.used_mask):
+        if self.active_count >= self.max_entities:
             return None
         _id = np.argmax(~self.used_mask)
         self.used_mask[_id] = True
+        self.active_count += 1
+        self.spawned += 1
+        self.generation += 1
 
-        now = time.time() - self.game.start
+        now = self.game.sim_time
         self.data[_id] = (*position, scale, now, *color, *velocity, _range, decay, now)
+        self.previous[_id] = position
         return _id
 
     def spawn_bulk(self, buffer: np.ndarray) -> None:
@@ -67,44 +102,27 @@ class ProjectileManager:
             return print("Spawning too many entities")
 
         self.used_mask[available_slots[:buflen]] = True
+        self.active_count += buflen
+        self.spawned += buflen
+        self.generation += 1
         self.data[available_slots[:buflen]] = buffer
+        self.previous[available_slots[:buflen]] = buffer[:, 0:2]
 
     def despawn(self, _id: int) -> bool:
         if self.used_mask[_id]:
             self.used_mask[_id] = False
+            self.active_count -= 1
+            self.despawned += 1
+            self.generation += 1
             return True
         return False
 
     def despawn_multiple(self, ids: list) -> None:
         if len(ids):
-            self.used_mask[ids] = False
-
-    def check_collisions(self, position: ursina.vec2, scale: float) -> list[int]:
-        if not np.any(self.used_mask):
-            return []
-
-        used_indices = np.where(self.used_mask)[0]
-        subset_data = self.data[self.used_mask]
-        dx, dy = subset_data[:, 0] - position[0], subset_data[:, 1] - position[1]
-        dist_squared = dx**2 + dy**2
-        collision_dist_squared = ((scale / 2) + subset_data[:, 2])**2
-        collision_mask = dist_squared <= collision_dist_squared
-        return used_indices[collision_mask].tolist()
-
-
-    def check_collisions_multiple(self, positions: np.ndarray, scales: np.ndarray) -> list[list[int]]:
-        if not np.any(self.used_mask):
-            return [[] for _ in range(len(positions))]
-
-        subset_data = self.data[self.used_mask]
-        subset_positions = subset_data[:, :2]
-        subset_radii = subset_data[:, 2]
-
-        pos_diff = subset_positions - positions[:, np.newaxis, :]
-        dist_squared = np.sum(pos_diff ** 2, axis=-1)
-        collision_dist_squared = ((scales[:, np.newaxis] / 2) + subset_radii[np.newaxis, :]) ** 2
-
-        collision_mask = dist_squared <= collision_dist_squared
-        collision_indices = [np.where(mask)[0].tolist() for mask in collision_mask]
-    
-        return collision_indices
+            ids = np.unique(ids)
+            removed = np.count_nonzero(self.used_mask[ids])
+            if removed:
+                self.used_mask[ids] = False
+                self.active_count -= removed
+                self.despawned += removed
+                self.generation += 1
@@ -0,0 +1,60 @@
+import numpy as np
+
+class RenderState:
+    """
+    Shader inputs of one node, only pushed to the driver when they change.
+    Buffers are tracked by the owner's ssbo_generation so an unchanged SSBO
+    is never re-bound.
+    """
+    def __init__(self, node):
+        self.node = node
+        self._values = {}
+        self._buffers = {}
+        self.pushes = 0
+        self.skipped = 0
+        self.bytes_pushed = 0
+
+    def set_input(self, name:str, value) -> bool:
+        if name in self._values and self._values[name] == value:
+            self.skipped += 1
+            return False
+        self._values[name] = value
+        self.node.set_shader_input(name, value)
+        self.pushes += 1
+        return True
+
+    def set_buffer(self, name:str, owner) -> bool:
+        return self.set_ssbo(name, owner.ssbo, buffer_key(owner))
+
+    def set_ssbo(self, name:str, ssbo, key:tuple) -> bool:
+        """Binds `ssbo` unless the buffer last bound under `name` had the same key"""
+        if self._buffers.get(name) == key:
+            self.skipped += 1
+            return False
+        self._buffers[name] = key
+        self.node.set_shader_input(name, ssbo)
+        self.pushes += 1
+        self.bytes_pushed += ssbo.data_size_bytes
+        return True
+
+    def invalidate(self) -> None:
+        """Forces every input to be pushed again, e.g. after the node changes"""
+        self._values.clear()
+        self._buffers.clear()
+
+def buffer_key(owner) -> tuple:
+    """Identifies the SSBO an owner holds right now, it changes with every rebuild"""
+    return (id(owner), owner.ssbo_generation)
+
+def swap_staged(owner, count:int) -> bool:
+    """
+    Makes the `count` rows an owner packed into `_staging` its `_buffer` and
+    bumps ssbo_generation, False when they match the last upload so the
+    caller keeps its SSBO and nothing is re-bound.
+    """
+    if count == owner._uploaded_count and np.array_equal(owner._staging[:count], owner._buffer[:count]):
+        return False
+    owner._buffer, owner._staging = owner._staging, owner._buffer
+    owner._uploaded_count = count
+    owner.ssbo_generation += 1
+    return True
@@ -0,0 +1,114 @@
+import numpy as np
+
+class ResolutionController:
+    """
+    Picks the canvas render scale from the frame time history. The scale
+    moves in fixed steps, down when a high percentile of recent frames is
+    over budget and up when it leaves enough headroom. After every change the
+    history is cleared so the next decision only sees frames at the new scale.
+    Pure numpy, feed it synthetic frame times to exercise it without a GPU.
+    """
+    def __init__(
+            self,
+            budget_ms:float = 1000 / 60,
+            min_scale:float = 0.25,
+            max_scale:float = 1.0,
+            step:float = 0.25,
+            window:int = 30,
+            percentile:float = 90,
+            headroom:float = 0.7,
+            scale:float = 1.0,
+        ):
+        self.budget_ms = budget_ms
+        self.step = step
+        self.scales = np.round(np.arange(min_scale, max_scale + step / 2, step), 6)
+        self.window = window
+        self.percentile = percentile
+        # step up only when the percentile is below this fraction of the budget
+        self.headroom = headroom
+        self.index = int(np.abs(self.scales - scale).argmin())
+        self.history = np.zeros(window, dtype=np.float32)
+        self.filled = 0
+        self.changes = 0
+
+    @property
+    def scale(self) -> float:
+        return float(self.scales[self.index])
+
+    def reset(self) -> None:
+        self.filled = 0
+
+    def observe(self, frame_ms:float) -> float | None:
+        """Records a frame time, returns the new scale when it changes"""
+        self.history[self.filled % self.window] = frame_ms
+        self.filled += 1
+        if self.filled < self.window:
+            return None
+        measured = float(np.percentile(self.history, self.percentile))
+        if measured > self.budget_ms and self.index > 0:
+            self.index -= 1
+        elif measured < self.budget_ms * self.headroom and self.index < len(self.scales) - 1:
+            self.index += 1
+        else:
+            return None
+        self.reset()
+        self.changes += 1
+        return self.scale
+
+class OffscreenCanvas:
+    """
+    Fullscreen card rendered into an offscreen texture buffer by its own
+    camera. The buffer is allocated once at window size and the render scale
+    only shrinks the display region, the texture is then drawn on a quad in
+    the main scene with a matching texture scale so it upscales to the window.
+    """
+    def __init__(self, window_size:tuple, name:str = "canvas", sort:int = -10):
+        from panda3d.core import CardMaker, NodePath, OrthographicLens, Texture
+        self.window_size = (int(window_size[0]), int(window_size[1]))
+        self.buffer = base.win.make_texture_buffer(name, *self.window_size)
+        self.buffer.set_sort(sort)
+        self.buffer.set_clear_color_active(True)
+        self.buffer.set_clear_color((0, 0, 0, 1))
+        self.texture = self.buffer.get_texture()
+        self.texture.set_minfilter(Texture.FT_linear)
+        self.texture.set_magfilter(Texture.FT_linear)
+        self.texture.set_wrap_u(Texture.WM_clamp)
+        self.texture.set_wrap_v(Texture.WM_clamp)
+
+        self.root = NodePath(f"{name}_root")
+        self.root.set_depth_test(False)
+        self.root.set_depth_write(False)
+        cards = CardMaker(name)
+        cards.set_frame_fullscreen_quad()
+        self.card = self.root.attach_new_node(cards.generate())
+
+        lens = OrthographicLens()
+        lens.set_film_size(2, 2)
+        lens.set_near_far(-10, 10)
+        self.camera = base.make_camera(self.buffer, lens=lens, scene=self.root, camName=f"{name}_camera")
+        self.camera.reparent_to(self.root)
+        self.region = self.camera.node().get_display_region(0)
+        self.scale = 1.0
+
+    def set_scale(self, scale:float) -> tuple[int, int]:
+        """Renders into the lower left `scale` of the buffer, returns the render size in pixels"""
+        self.scale = scale
+        size = (max(1, round(self.window_size[0] * scale)), max(1, round(self.window_size[1] * scale)))
+        self.region.set_dimensions(0, size[0] / self.window_size[0], 0, size[1] / self.window_size[1])
+        return size
+
+    def render_once(self) -> None:
+        """Renders the next frame into the buffer and then leaves it inactive, for content that rarely changes"""
+        self.buffer.set_one_shot(True)
+        self.buffer.set_active(True)
+
+    @property
+    def texture_scale(self) -> tuple[float, float]:
+        """UV extent of the rendered area, including any power of two padding of the buffer"""
+        left, right, bottom, top = self.region.get_dimensions()
+        padding = self.texture.get_tex_scale()
+        return (right * padding[0], top * padding[1])
+
+    def destroy(self) -> None:
+        base.graphicsEngine.remove_window(self.buffer)
+        self.root.remove_node()
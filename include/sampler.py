@@ -0,0 +1,128 @@
+import os
+import sys
+import time
+import threading
+from collections import Counter
+
+class SamplingProfiler:
+    """
+    Statistical profiler for the frame loop. A background thread samples the
+    stacks of the main thread and the stage pool at a fixed rate, tags each
+    sample with the stage that thread is running, and writes folded stacks
+    for flamegraph tools plus a per-stage top functions summary.
+    """
+    def __init__(self, stages:dict, rate_hz:float = 250, output_dir:str = "profiles", thread_prefix:str | tuple = "stage", roots:tuple = ()):
+        # thread id -> name of the stage it is currently running
+        self.stages = stages
+        # stacks are cut above these code objects, e.g. the scheduler's stage runner
+        self.roots = frozenset(roots)
+        self.rate_hz = rate_hz
+        self.output_dir = output_dir
+        self.thread_prefix = thread_prefix
+        self.samples = Counter()
+        self.sample_count = 0
+        self.last_output = None
+        self._labels = {}
+        self._thread = None
+        self._main_thread_id = threading.main_thread().ident
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self, duration:float = 5.0) -> bool:
+        """Samples for `duration` seconds then writes the results, False if already running"""
+        if self.running:
+            return False
+        self.samples = Counter()
+        self.sample_count = 0
+        self._thread = threading.Thread(target=self._run, args=(duration,), name="sampler", daemon=True)
+        self._thread.start()
+        return True
+
+    def _target_threads(self) -> list[int]:
+        return [self._main_thread_id] + [
+            t.ident for t in threading.enumerate()
+            if t.name.startswith(self.thread_prefix) and t.ident is not None
+        ]
+
+    def _label(self, code) -> str:
+        label = self._labels.get(code)
+        if label is None:
+            label = self._labels[code] = f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+        return label
+
+    def _run(self, duration:float) -> None:
+        interval = 1 / self.rate_hz
+        end = time.perf_counter() + duration
+        next_sample = time.perf_counter()
+        own_id = threading.get_ident()
+        while next_sample < end:
+            frames = sys._current_frames()
+            for thread_id in self._target_threads():
+                frame = frames.get(thread_id)
+                if frame is None or thread_id == own_id:
+                    continue
+                stack = []
+                while frame is not None and frame.f_code not in self.roots:
+                    stack.append(self._label(frame.f_code))
+                    frame = frame.f_back
+                stage = self.stages.get(thread_id)
+                if stage is None:
+                    # pool threads with nothing to run are just waiting on the queue
+                    if thread_id != self._main_thread_id:
+                        continue
+                    stage = "outside stages"
+                self.samples[(stage, tuple(reversed(stack)))] += 1
+                self.sample_count += 1
+            del frames
+            next_sample += interval
+            time.sleep(max(0.0, next_sample - time.perf_counter()))
+        self.last_output = self.write()
+
+    def folded(self) -> list[str]:
+        """One `stage;outer;...;inner count` line per unique stack"""
+        return [
+            ";".join((stage.replace(";", ","), *stack)) + f" {count}"
+            for (stage, stack), count in self.samples.most_common()
+        ]
+
+    def summary(self, top:int = 10) -> dict:
+        """Per stage sample counts with the top functions by self and inclusive samples"""
+        stages = {}
+        for (stage, stack), count in self.samples.items():
+            entry = stages.setdefault(stage, {"samples": 0, "self": Counter(), "total": Counter()})
+            entry["samples"] += count
+            if stack:
+                entry["self"][stack[-1]] += count
+            for label in set(stack):
+                entry["total"][label] += count
+        return {
+            stage: {
+                "samples": entry["samples"],
+                "self": entry["self"].most_common(top),
+                "total": entry["total"].most_common(top),
+            }
+            for stage, entry in sorted(stages.items(), key=lambda item: -item[1]["samples"])
+        }
+
+    def write(self) -> tuple[str, str]:
+        os.makedirs(self.output_dir, exist_ok=True)
+        stamp = time.strftime("%Y%m%d-%H%M%S")
+        folded_path = os.path.join(self.output_dir, f"profile-{stamp}.folded")
+        summary_path = os.path.join(self.output_dir, f"profile-{stamp}.txt")
+        with open(folded_path, "w") as f:
+            f.write("\n".join(self.folded()) + "\n")
+        with open(summary_path, "w") as f:
+            f.write(f"{self.sample_count} samples at {self.rate_hz} Hz\n")
+            for stage, entry in self.summary().items():
+                share = entry["samples"] / max(1, self.sample_count) * 100
+                f.write(f"\n{stage}: {entry['samples']} samples ({share:.1f}%)\n")
+                f.write("  self:\n")
+                for label, count in entry["self"]:
+                    f.write(f"    {count:6d}  {label}\n")
+                f.write("  total:\n")
+                for label, count in entry["total"]:
+                    f.write(f"    {count:6d}  {label}\n")
+        print(f"Wrote {folded_path} and {summary_path}")
+        return folded_path, summary_path
@@ -0,0 +1,157 @@
+import time
+import threading
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+class Stage:
+    """One step of the frame update with the state it reads and writes"""
+    __slots__ = ["name", "func", "reads", "writes"]
+    def __init__(self, name:str, func, reads:tuple=(), writes:tuple=()):
+        self.name = name
+        self.func = func
+        self.reads = frozenset(reads)
+        self.writes = frozenset(writes)
+
+    def conflicts(self, other:"Stage") -> bool:
+        return bool(
+            self.writes & (other.reads | other.writes)
+            or self.reads & other.writes
+        )
+
+class StageScheduler:
+    """
+    Runs stages in declaration order, except that stages with no read/write
+    conflict between them are dispatched to a persistent thread pool together.
+    The dependency graph is built once, with workers <= 1 everything runs
+    inline on the calling thread.
+    """
+    def __init__(self, stages:list[Stage], workers:int = 4):
+        self.stages = list(stages)
+        self.dependencies = [
+            tuple(i for i in range(j) if self.stages[i].conflicts(stage))
+            for j, stage in enumerate(self.stages)
+        ]
+        self.dependents = [[] for _ in self.stages]
+        for j, deps in enumerate(self.dependencies):
+            for i in deps:
+                self.dependents[i].append(j)
+        self.workers = workers
+        self.pool = ThreadPoolExecutor(workers, thread_name_prefix="stage") if workers > 1 else None
+        # objects with before_stage(name) / after_stage(name), e.g. instrumentation
+        self.hooks = []
+        # forces inline execution while hooks need stages to run one at a time
+        self.serial = False
+
+        self.timings = {stage.name: 0.0 for stage in self.stages}
+        self.critical_path = []
+        self.critical_path_time = 0.0
+        self.wall_time = 0.0
+        self._durations = [0.0] * len(self.stages)
+        # stage each thread is currently running, for profilers
+        self.current_stages = {}
+
+    def _run_stage(self, index:int, args:tuple) -> None:
+        stage = self.stages[index]
+        thread_id = threading.get_ident()
+        self.current_stages[thread_id] = stage.name
+        for hook in self.hooks:
+            hook.before_stage(stage.name)
+        start_time = time.perf_counter()
+        try:
+            stage.func(*args)
+        finally:
+            self._durations[index] = time.perf_counter() - start_time
+            for hook in self.hooks:
+                hook.after_stage(stage.name)
+            self.current_stages.pop(thread_id, None)
+
+    def run(self, *args) -> None:
+        start_time = time.perf_counter()
+        if self.pool is None or self.serial:
+            for i in range(len(self.stages)):
+                self._run_stage(i, args)
+        else:
+            self._run_parallel(args)
+        self.wall_time = time.perf_counter() - start_time
+        self._record()
+
+    def _run_parallel(self, args:tuple) -> None:
+        remaining = [len(deps) for deps in self.dependencies]
+        ready = [i for i, count in enumerate(remaining) if not count]
+        running = {}
+        errors = {}
+
+        def complete(index:int) -> None:
+            for j in self.dependents[index]:
+                remaining[j] -= 1
+                if not remaining[j]:
+                    ready.append(j)
+
+        while ready or running:
+            # a failed stage leaves its state half updated, like the serial path
+            # nothing starts after it, the stages already running are drained
+            if errors:
+                ready.clear()
+            # dispatch in declaration order
+            ready.sort()
+            inline = []
+            for index in ready:
+                try:
+                    running[self.pool.submit(self._run_stage, index, args)] = index
+                except RuntimeError:
+                    # the pool refuses work once the interpreter shuts down, which comes
+                    # before atexit stops the simulation thread, its last ticks run inline
+                    inline.append(index)
+            ready.clear()
+            for index in inline:
+                if errors:
+                    break
+                try:
+                    self._run_stage(index, args)
+                except Exception as e:
+                    errors[index] = e
+                else:
+                    complete(index)
+            if ready or not running:
+                continue
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in sorted(done, key=running.get):
+                index = running.pop(future)
+                if future.exception() is not None:
+                    errors[index] = future.exception()
+                elif not errors:
+                    complete(index)
+
+        if errors:
+            raise errors[min(errors)]
+
+    def _record(self) -> None:
+        """Stage times in ms and the longest dependency chain through them"""
+        finish = [0.0] * len(self.stages)
+        previous = [-1] * len(self.stages)
+        for j, deps in enumerate(self.dependencies):
+            if deps:
+                previous[j] = max(deps, key=finish.__getitem__)
+                finish[j] = finish[previous[j]]
+            finish[j] += self._durations[j]
+            self.timings[self.stages[j].name] = self._durations[j] * 1000
+
+        last = max(range(len(finish)), key=finish.__getitem__) if finish else -1
+        self.critical_path_time = finish[last] * 1000 if finish else 0.0
+        path = []
+        while last >= 0:
+            path.append(self.stages[last].name)
+            last = previous[last]
+        self.critical_path = path[::-1]
+
+    @property
+    def summary(self) -> dict:
+        return {
+            "Stages Wall": self.wall_time * 1000,
+            "Stages Sum": sum(self._durations) * 1000,
+            "Critical Path": self.critical_path_time,
+        }
+
+    def shutdown(self) -> None:
+        if self.pool is not None:
+            self.pool.shutdown(wait=True)
+            self.pool = None
@@ -16,12 +16,23 @@ class ShaderCollection:
         print(f"Found {len(self._shader_files)} shader components")
 
         for k, conf in config.items():
+            defines = conf.pop("defines", {})
             if conf.get("vertex"):
-                conf["vertex"] = self._shader_files[conf.get("vertex")]
+                conf["vertex"] = self.apply_defines(self._shader_files[conf.get("vertex")], defines)
             if conf.get("fragment"):
-                conf["fragment"] = self._shader_files[conf.get("fragment")]
+                conf["fragment"] = self.apply_defines(self._shader_files[conf.get("fragment")], defines)
             
             self.shaders[k] = ursina.Shader(
                 language=ursina.Shader.GLSL,
                 **conf
-            )
\ No newline at end of file
+            )
+
+    @staticmethod
+    def apply_defines(source:str, defines:dict) -> str:
+        """Inserts preprocessor defines after the #version line"""
+        if not defines:
+            return source
+        lines = source.split("\n")
+        at = next((i + 1 for i, line in enumerate(lines) if line.startswith("#version")), 0)
+        lines[at:at] = [f"#define {name} {value}" for name, value in defines.items()]
+        return "\n".join(lines)
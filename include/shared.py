@@ -0,0 +1,176 @@
+import json
+import atexit
+import time
+import struct
+import numpy as np
+from multiprocessing import shared_memory, resource_tracker
+
+HEADER_MAGIC = b"WTSHM001"
+# magic, sequence, tick, sim time, schema generation, schema length
+HEADER = struct.Struct("<8sQqdQQ")
+HEADER_BYTES = 64 * 1024
+PROFILER_SLOTS = 256
+
+class SharedArrays:
+    """
+    Simulation arrays allocated in named shared memory so other processes
+    can watch them live. Every array gets its own segment, a header segment
+    named `prefix` carries the schema as JSON, the tick, the sim time and a
+    seqlock: the sequence is odd while a frame is being written and even
+    once it is complete, so the game pays two integer stores per frame and
+    readers retry until they copy a frame with the same even value around it.
+    """
+    def __init__(self, prefix:str):
+        self.prefix = prefix
+        self.header = shared_memory.SharedMemory(name=prefix, create=True, size=HEADER_BYTES)
+        self.segments = {}
+        self.arrays = {}
+        self.schema = {}
+        self.schema_generation = 0
+        self.sequence = 0
+        self.profiler_keys = []
+        self.profiler = self.zeros("profiler", (PROFILER_SLOTS,), np.float64)
+        self._write_header(0, 0.0)
+        atexit.register(self.close)
+
+    def zeros(self, name:str, shape:tuple, dtype) -> np.ndarray:
+        dtype = np.dtype(dtype)
+        shape = (shape,) if isinstance(shape, int) else tuple(shape)
+        segment_name = f"{self.prefix}_{len(self.segments)}"
+        size = max(1, int(np.prod(shape)) * dtype.itemsize)
+        segment = shared_memory.SharedMemory(name=segment_name, create=True, size=size)
+        array = np.ndarray(shape, dtype=dtype, buffer=segment.buf)
+        array[...] = 0
+        self.segments[name] = segment
+        self.arrays[name] = array
+        self.schema[name] = {"segment": segment_name, "shape": list(shape), "dtype": dtype.str}
+        self._publish_schema()
+        return array
+
+    def _publish_schema(self) -> None:
+        self.schema_generation += 1
+        payload = json.dumps({"arrays": self.schema, "profiler": self.profiler_keys}).encode()
+        if HEADER.size + len(payload) > HEADER_BYTES:
+            raise ValueError("Shared state schema does not fit in the header")
+        self.header.buf[HEADER.size:HEADER.size + len(payload)] = payload
+        self._payload_length = len(payload)
+
+    def _write_header(self, tick:int, sim_time:float) -> None:
+        HEADER.pack_into(self.header.buf, 0, HEADER_MAGIC, self.sequence, tick, sim_time, self.schema_generation, self._payload_length)
+
+    def begin_frame(self) -> None:
+        self.sequence += 1
+        struct.pack_into("<Q", self.header.buf, 8, self.sequence)
+
+    def end_frame(self, tick:int, sim_time:float, profiler:dict | None = None) -> None:
+        if profiler:
+            keys = list(profiler)[:PROFILER_SLOTS]
+            if keys != self.profiler_keys:
+                self.profiler_keys = keys
+                self._publish_schema()
+            self.profiler[:len(self.profiler_keys)] = [profiler.get(key, 0.0) for key in self.profiler_keys]
+        self.sequence += 1
+        self._write_header(tick, sim_time)
+
+    def close(self) -> None:
+        """Unlinks every segment, the mappings stay valid for managers still holding arrays"""
+        if self.header is None:
+            return
+        self.arrays.clear()
+        self.profiler = None
+        for segment in list(self.segments.values()) + [self.header]:
+            segment.unlink()
+            try:
+                segment.close()
+            except BufferError:
+                # a live array still exports the buffer, it unmaps with the process
+                pass
+        self.segments.clear()
+        self.header = None
+
+class SharedArraysReader:
+    """
+    Read only attachment to a running game's SharedArrays. `views` are live
+    zero copy arrays that may change mid read, read() returns a consistent
+    copy of one completed frame.
+    """
+    def __init__(self, prefix:str):
+        self.prefix = prefix
+        self.header = self._open(prefix)
+        magic = bytes(self.header.buf[0:8])
+        if magic != HEADER_MAGIC:
+            self.header.close()
+            raise ValueError(f"{prefix} is not a shared game state")
+        self.segments = {}
+        self.views = {}
+        self.profiler_keys = []
+        self.schema_generation = 0
+        self._load_schema()
+
+    @staticmethod
+    def _open(name:str) -> shared_memory.SharedMemory:
+        segment = shared_memory.SharedMemory(name=name)
+        # attaching registers the segment with this process's tracker, which
+        # would unlink it on exit while the game still owns it
+        resource_tracker.unregister(segment._name, "shared_memory")
+        return segment
+
+    def _load_schema(self) -> None:
+        while True:
+            _, _, _, _, generation, length = HEADER.unpack_from(self.header.buf, 0)
+            payload = bytes(self.header.buf[HEADER.size:HEADER.size + length])
+            # the game may be rewriting the schema, only trust it if the generation held
+            if HEADER.unpack_from(self.header.buf, 0)[4] == generation:
+                try:
+                    schema = json.loads(payload)
+                    break
+                except ValueError:
+                    pass
+            time.sleep(0)
+        for name, spec in schema["arrays"].items():
+            if name not in self.segments:
+                self.segments[name] = self._open(spec["segment"])
+                view = np.ndarray(tuple(spec["shape"]), dtype=np.dtype(spec["dtype"]), buffer=self.segments[name].buf)
+                view.flags.writeable = False
+                self.views[name] = view
+        self.profiler_keys = schema["profiler"]
+        self.schema_generation = generation
+
+    def read(self, names:list | None = None, timeout:float = 1.0) -> tuple[int, float, dict, dict]:
+        """(tick, sim time, array copies, profiler values) of the newest completed frame"""
+        names = [name for name in self.views if name != "profiler"] if names is None else names
+        deadline = time.perf_counter() + timeout
+        while True:
+            sequence, tick, sim_time, generation = self._status()
+            if generation != self.schema_generation:
+                self._load_schema()
+                continue
+            if not sequence % 2:
+                arrays = {name: self.views[name].copy() for name in names}
+                profiler = self.views["profiler"][:len(self.profiler_keys)].copy()
+                if self._status()[0] == sequence:
+                    return tick, sim_time, arrays, dict(zip(self.profiler_keys, profiler.tolist()))
+            if time.perf_counter() > deadline:
+                raise TimeoutError("No complete frame within the timeout")
+            time.sleep(0)
+
+    def _status(self) -> tuple[int, int, float, int]:
+        _, sequence, tick, sim_time, generation, _ = HEADER.unpack_from(self.header.buf, 0)
+        return sequence, tick, sim_time, generation
+
+    def close(self) -> None:
+        self.views.clear()
+        for segment in list(self.segments.values()) + [self.header]:
+            segment.close()
+        self.segments.clear()
+
+def zeros(game, name:str, shape:tuple, dtype) -> np.ndarray:
+    """Backing array for a manager, in shared memory when the game publishes its state"""
+    shared = getattr(game, "shared", None)
+    if shared is None:
+        return np.zeros(shape, dtype=dtype)
+    return shared.zeros(name, shape, dtype)
+
+def attach(prefix:str) -> SharedArraysReader:
+    """Maps a game's shared state, e.g. attach("wizardtime").read()[2]["Enemy.data"]"""
+    return SharedArraysReader(prefix)
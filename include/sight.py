@@ -0,0 +1,100 @@
+import numpy as np
+
+class LineOfSight:
+    """
+    Batched line of sight over an occupancy grid built from room walls.
+    All rays are marched together with a vectorized grid DDA, results are
+    cached per slot and only re-traced when the origin or target changes cell.
+    """
+    def __init__(self, collision, capacity: int, cell_size: float = 1.0):
+        self.collision = collision
+        self.capacity = capacity
+        self.cell_size = cell_size
+        self.bounds = collision.bounds
+        self.width = max(1, int(np.ceil((self.bounds[2] - self.bounds[0]) / cell_size)))
+        self.height = max(1, int(np.ceil((self.bounds[3] - self.bounds[1]) / cell_size)))
+        self.blocked = np.zeros((self.height, self.width), dtype=bool)
+
+        self._origin_cells = np.full(capacity, -1, dtype=np.intp)
+        self._target_cells = np.full(capacity, -1, dtype=np.intp)
+        self._visible = np.zeros(capacity, dtype=bool)
+        self.traced = 0
+        self.build()
+
+    def build(self) -> None:
+        xs = self.bounds[0] + (np.arange(self.width) + 0.5) * self.cell_size
+        ys = self.bounds[1] + (np.arange(self.height) + 0.5) * self.cell_size
+        centers = np.stack(np.meshgrid(xs, ys), axis=-1).reshape(-1, 2)
+        distance, _ = self.collision.sample(centers)
+        self.blocked[:] = (distance < 0).reshape(self.height, self.width)
+        self.invalidate()
+
+    def invalidate(self) -> None:
+        self._origin_cells[:] = -1
+        self._target_cells[:] = -1
+
+    def _grid(self, positions: np.ndarray) -> np.ndarray:
+        return (np.asarray(positions, dtype=np.float64).reshape(-1, 2) - self.bounds[0:2]) / self.cell_size
+
+    def _cells(self, grid: np.ndarray) -> np.ndarray:
+        cx = np.clip(np.floor(grid[:, 0]).astype(np.intp), 0, self.width - 1)
+        cy = np.clip(np.floor(grid[:, 1]).astype(np.intp), 0, self.height - 1)
+        return cy * self.width + cx
+
+    def trace(self, origins: np.ndarray, targets: np.ndarray) -> np.ndarray:
+        """Uncached query, True where no blocked cell lies strictly between origin and target"""
+        origin = self._grid(origins)
+        target = np.broadcast_to(self._grid(targets), origin.shape)
+        count = len(origin)
+        visible = np.zeros(count, dtype=bool)
+        if not count:
+            return visible
+
+        ix = np.clip(np.floor(origin[:, 0]).astype(np.intp), 0, self.width - 1)
+        iy = np.clip(np.floor(origin[:, 1]).astype(np.intp), 0, self.height - 1)
+        tx = np.clip(np.floor(target[:, 0]).astype(np.intp), 0, self.width - 1)
+        ty = np.clip(np.floor(target[:, 1]).astype(np.intp), 0, self.height - 1)
+
+        direction = target - origin
+        step = np.where(direction < 0, -1, 1).astype(np.intp)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            delta = np.where(direction != 0, np.abs(1 / direction), np.inf)
+            boundary = np.floor(origin) + (step > 0)
+            t_max = np.where(direction != 0, (boundary - origin) / direction, np.inf)
+
+        # a ray can never take more steps than the manhattan distance between its cells
+        active = np.arange(count)
+        for _ in range(int(np.max(np.abs(tx - ix) + np.abs(ty - iy))) + 1):
+            reached = (ix[active] == tx[active]) & (iy[active] == ty[active])
+            visible[active[reached]] = True
+            active = active[~reached]
+            if not active.size:
+                break
+
+            step_x = t_max[active, 0] < t_max[active, 1]
+            moved_x, moved_y = active[step_x], active[~step_x]
+            ix[moved_x] += step[moved_x, 0]
+            t_max[moved_x, 0] += delta[moved_x, 0]
+            iy[moved_y] += step[moved_y, 1]
+            t_max[moved_y, 1] += delta[moved_y, 1]
+
+            outside = (ix[active] < 0) | (ix[active] >= self.width) | (iy[active] < 0) | (iy[active] >= self.height)
+            active = active[~outside]
+            target_cell = (ix[active] == tx[active]) & (iy[active] == ty[active])
+            hit = ~target_cell & self.blocked[iy[active], ix[active]]
+            active = active[~hit]
+        self.traced += count
+        return visible
+
+    def visible(self, slots: np.ndarray, origins: np.ndarray, targets: np.ndarray) -> np.ndarray:
+        """Cached query for entity slots, only rays whose cells moved are traced again"""
+        origin_cells = self._cells(self._grid(origins))
+        target_cells = np.broadcast_to(self._cells(self._grid(targets)), origin_cells.shape)
+        stale = (self._origin_cells[slots] != origin_cells) | (self._target_cells[slots] != target_cells)
+        if np.any(stale):
+            stale_slots = slots[stale]
+            targets = np.broadcast_to(np.asarray(targets, dtype=np.float64).reshape(-1, 2), (len(slots), 2))
+            self._visible[stale_slots] = self.trace(np.asarray(origins).reshape(-1, 2)[stale], targets[stale])
+            self._origin_cells[stale_slots] = origin_cells[stale]
+            self._target_cells[stale_slots] = target_cells[stale]
+        return self._visible[slots]
@@ -0,0 +1,82 @@
+import time
+import numpy as np
+
+class StateRing:
+    """
+    Preallocated ring of simulation snapshots for rollback and restarts.
+    Sources expose state_arrays(), the arrays that fully describe them, and
+    state_restored(), which rebuilds derived bookkeeping after a restore.
+    State that does not live in an array can be copied into one by an
+    optional state_saving(), called before every save.
+    Every slot holds a copy of each array inside one contiguous block, so
+    saving and restoring are one np.copyto per array with nothing pickled or
+    allocated. Sources must update their arrays in place, never rebind them.
+    """
+    def __init__(self, sources:list, slots:int = 8, align:int = 64):
+        self.sources = list(sources)
+        self.slots = slots
+        self.arrays = [array for source in self.sources for array in source.state_arrays()]
+        self._saving = [source.state_saving for source in self.sources if hasattr(source, "state_saving")]
+
+        offsets, size = [], 0
+        for array in self.arrays:
+            offsets.append(size)
+            size += -(-array.nbytes // align) * align
+        self.slot_bytes = size
+        self.block = np.zeros((slots, max(size, align)), dtype=np.uint8)
+        # views[slot][i] mirrors self.arrays[i] inside the block
+        self.views = [
+            [
+                self.block[slot, offset:offset + array.nbytes].view(array.dtype).reshape(array.shape)
+                for array, offset in zip(self.arrays, offsets)
+            ]
+            for slot in range(slots)
+        ]
+        self.ticks = np.full(slots, -1, dtype=np.int64)
+        self.head = 0
+
+    def save(self, tick:int) -> int:
+        """Copies the live state into the next slot, overwriting the oldest, returns the slot"""
+        slot = self.head
+        self.write(slot, tick)
+        self.head = (slot + 1) % self.slots
+        return slot
+
+    def write(self, slot:int, tick:int) -> None:
+        for saving in self._saving:
+            saving()
+        for view, array in zip(self.views[slot], self.arrays):
+            np.copyto(view, array)
+        self.ticks[slot] = tick
+
+    def find(self, tick:int) -> int | None:
+        slots = np.flatnonzero(self.ticks == tick)
+        return int(slots[0]) if len(slots) else None
+
+    def restore(self, slot:int) -> None:
+        if self.ticks[slot] < 0:
+            raise ValueError(f"State slot {slot} is empty")
+        for view, array in zip(self.views[slot], self.arrays):
+            np.copyto(array, view)
+        for source in self.sources:
+            source.state_restored()
+
+    def benchmark(self, repeats:int = 200) -> dict:
+        """Mean and worst save / restore times in ms, discards the oldest slot but leaves the live state as it was"""
+        slot = self.head
+        saves, restores = np.zeros(repeats), np.zeros(repeats)
+        for i in range(repeats):
+            start_time = time.perf_counter()
+            self.write(slot, 0)
+            saves[i] = time.perf_counter() - start_time
+            start_time = time.perf_counter()
+            self.restore(slot)
+            restores[i] = time.perf_counter() - start_time
+        self.ticks[slot] = -1
+        return {
+            "bytes": self.slot_bytes,
+            "save_ms": saves.mean() * 1000,
+            "save_max_ms": saves.max() * 1000,
+            "restore_ms": restores.mean() * 1000,
+            "restore_max_ms": restores.max() * 1000,
+        }
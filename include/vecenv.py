@@ -0,0 +1,358 @@
+import numpy as np
+from .collision import CollisionField
+from .colliders import CircleColliderStore
+from .navigation import FlowField, NEIGHBOR_COSTS
+from .sight import LineOfSight
+from .entities import FloatingFollower, enemy_row
+from . import kernels
+from .world import ROOM_WALLS, ROOM_PORTALS
+
+# columns handed to policies, players and enemies: position, scale, velocity, health, shield
+DRAWABLE_OBSERVATION = [0, 1, 2, 8, 9, 18, 19]
+# projectiles: position, scale, velocity
+PROJECTILE_OBSERVATION = [0, 1, 2, 8, 9]
+
+class BatchedFlowField(FlowField):
+    """
+    One flow field per arena over the shared navigation grid. The neighbour
+    table is tiled with a cell offset per arena, so the relaxation of every
+    arena runs as one wavefront and cell b * cells + c is cell c of arena b.
+    """
+    def __init__(self, collision, batch:int, cell_size:float = 1.0, clearance:float = 1.0):
+        self.batch = batch
+        FlowField.__init__(self, collision, cell_size, clearance)
+        cells = self.width * self.height
+        self.cells = cells
+        offsets = np.arange(batch)[:, None, None] * cells
+        self._neighbors = np.where(self._neighbors[None] >= 0, self._neighbors[None] + offsets, -1).reshape(batch * cells, -1)
+        self.distance = np.full(batch * cells, np.inf, dtype=np.float64)
+        self.flow = np.zeros((batch * cells, 2), dtype=np.float64)
+
+    def update(self, targets:np.ndarray, envs:np.ndarray) -> bool:
+        """Recomputes the fields of the arenas whose targets changed cell"""
+        sources = np.unique(self.cell_indices(targets) + np.asarray(envs) * self.cells)
+        if np.array_equal(sources, self._sources):
+            return False
+        changed = np.unique(np.setxor1d(sources, self._sources) // self.cells)
+        self._sources = sources
+        cells = (changed[:, None] * self.cells + np.arange(self.cells)).ravel()
+        self.distance[cells] = np.inf
+        self.relax(sources[np.isin(sources // self.cells, changed)])
+        self.descend(cells)
+        self.recomputes += 1
+        return True
+
+    def sample(self, positions:np.ndarray, targets:np.ndarray, envs:np.ndarray) -> np.ndarray:
+        positions = np.asarray(positions, dtype=np.float64).reshape(-1, 2)
+        cells = self.cell_indices(positions) + np.asarray(envs) * self.cells
+        directions = self.flow[cells]
+
+        direct = np.asarray(targets, dtype=np.float64) - positions
+        direct /= np.linalg.norm(direct, axis=-1, keepdims=True) + 1e-9
+        straight = (self.distance[cells] <= NEIGHBOR_COSTS[-1]) | ~np.any(directions, axis=1)
+        directions[straight] = direct[straight]
+        return directions
+
+class BatchedArena:
+    """
+    B independent copies of the starting room stepped together, for training
+    and evaluating bot policies without a window or one process per arena.
+
+    Players, enemies, projectiles and portals keep the column layouts of their
+    managers with a leading batch axis, e.g. enemies is (B, max_enemies, 33).
+    Every stage runs the managers' kernels once over the used rows of the
+    whole batch, in the game's stage order. Arenas share the room's collision,
+    sight and navigation grids and are kept apart by an x offset of `stride`
+    per arena in collider queries.
+
+    step() takes per player move (-1 / 0 / 1 per axis) and fire key arrays
+    shaped like PlayerManager.move_input / fire_input, advances every arena by
+    `dt` and returns (observation, reward, done). Reward is damage dealt minus
+    the damage of the enemy shots that hit, over 100, players take none as in
+    the game. Arenas are done when all enemies are dead or after `max_steps`,
+    and are reset before step returns.
+    """
+    def __init__(self, batch:int, players:int = 1, max_enemies:int = 255, max_projectiles:int = 255,
+                 walls:list = ROOM_WALLS, portals:list = ROOM_PORTALS, dt:float = 1 / 60,
+                 max_steps:int = 3600, seed:int | None = None):
+        self.batch = batch
+        self.max_players = players
+        self.max_enemies = max_enemies
+        self.max_projectiles = max_projectiles
+        self.dt = dt
+        self.max_steps = max_steps
+        self.rng = np.random.default_rng(seed)
+
+        # shared tuning, same names and defaults as PlayerManager
+        self.base_acceleration = 10
+        self.max_velocity = 20
+        self.min_velocity = 0.08
+        self.decay_rate = 0.04
+        self.portal_cooldown = 2.5
+        self.range = 2
+        self.fire_rate = 22
+        self.projectile_decay_rate = 0.01
+        self.base_projectile_speed = 40
+        self.projectile_scale = 1.75
+        self.projectile_color = (0, 0, 1, 1)
+        self.gravity = 0
+        # same as EnemyManager.lod_levels, one tick counter for the whole batch
+        self.lod_levels = [(np.inf, 1)]
+        self.lod_tick = 0
+        # damage per projectile hit
+        self.damage = 5
+
+        self.collision = CollisionField(walls)
+        self.flow_field = BatchedFlowField(self.collision, batch)
+        self.line_of_sight = LineOfSight(self.collision, batch * max_enemies)
+        bounds = self.collision.bounds
+        self.stride = 4 * float(max(bounds[2] - bounds[0], bounds[3] - bounds[1])) + 100
+
+        self.players = np.zeros((batch, players, 20), dtype=np.float64)
+        self.player_mask = np.zeros((batch, players), dtype=bool)
+        self._fire_held = np.zeros((batch, players, 4), dtype=bool)
+        self.enemies = np.zeros((batch, max_enemies, 33), dtype=np.float64)
+        self.enemy_mask = np.zeros((batch, max_enemies), dtype=bool)
+        self.player_projectiles = np.zeros((batch, max_projectiles, 13), dtype=np.float32)
+        self.player_projectile_mask = np.zeros((batch, max_projectiles), dtype=bool)
+        self.player_projectile_previous = np.zeros((batch, max_projectiles, 2), dtype=np.float32)
+        self.enemy_projectiles = np.zeros((batch, max_projectiles, 13), dtype=np.float32)
+        self.enemy_projectile_mask = np.zeros((batch, max_projectiles), dtype=bool)
+        self.enemy_projectile_previous = np.zeros((batch, max_projectiles, 2), dtype=np.float32)
+
+        # portal rows as in PortalManager, pair i at rows i and i + pairs
+        self.portal_pairs = len(portals)
+        self._portal_layout = np.zeros((2 * self.portal_pairs, 8), dtype=np.float32)
+        for i, ((position1, scale1), (position2, scale2)) in enumerate(portals):
+            self._portal_layout[i] = (*position1, scale1 / 3, 0, 1, 0, 0, 1)
+            self._portal_layout[i + self.portal_pairs] = (*position2, scale2 / 3, 0, 0, 1, 0, 1)
+        self.portals = np.zeros((batch, 2 * self.portal_pairs, 8), dtype=np.float32)
+        self.portal_mask = np.zeros((batch, 2 * self.portal_pairs), dtype=bool)
+
+        # enemies start on the same grid as in the game
+        grid = np.array([(i * 3, j * 3) for i in range(-11, 11) for j in range(-7, 7)], dtype=np.float64)
+        self._enemy_layout = np.array([enemy_row(FloatingFollower, 0, position, 0) for position in grid[:max_enemies]])
+        self._player_layout = np.array([(6 * (i % 8), 6 * (i // 8)) for i in range(players)], dtype=np.float64)
+
+        self.time = np.zeros(batch, dtype=np.float64)
+        self.steps = np.zeros(batch, dtype=np.int64)
+        self.returns = np.zeros(batch, dtype=np.float64)
+        # return and length of the last finished episode of each arena
+        self.final_returns = np.zeros(batch, dtype=np.float64)
+        self.final_steps = np.zeros(batch, dtype=np.int64)
+        self.episodes = 0
+        self.reset()
+
+    def reset(self, mask:np.ndarray | None = None) -> dict:
+        """Puts the arenas in `mask`, all by default, back to the start of the room"""
+        envs = np.arange(self.batch) if mask is None else np.flatnonzero(mask)
+        if len(envs):
+            self.players[envs] = 0
+            self.players[envs, :, 0:2] = self._player_layout
+            self.players[envs, :, 2] = 3
+            self.players[envs, :, 4:8] = (1, 1, 1, 1)
+            self.players[envs, :, 16:20] = (100, 100, 100, 100)
+            self.player_mask[envs] = True
+            self._fire_held[envs] = False
+
+            self.enemies[envs] = 0
+            self.enemies[envs, :len(self._enemy_layout)] = self._enemy_layout
+            self.enemy_mask[envs] = False
+            self.enemy_mask[envs, :len(self._enemy_layout)] = True
+
+            self.player_projectile_mask[envs] = False
+            self.enemy_projectile_mask[envs] = False
+            self.portals[envs] = self._portal_layout
+            self.portal_mask[envs] = True
+
+            self.time[envs] = 0
+            self.steps[envs] = 0
+            self.returns[envs] = 0
+            self.line_of_sight.invalidate()
+        return self.observe()
+
+    def observe(self) -> dict:
+        """Copies of the state a policy sees, rows past the masks are stale"""
+        return {
+            "players": self.players[..., DRAWABLE_OBSERVATION].astype(np.float32),
+            "player_mask": self.player_mask.copy(),
+            "enemies": self.enemies[..., DRAWABLE_OBSERVATION].astype(np.float32),
+            "enemy_mask": self.enemy_mask.copy(),
+            "player_projectiles": self.player_projectiles[..., PROJECTILE_OBSERVATION],
+            "player_projectile_mask": self.player_projectile_mask.copy(),
+            "enemy_projectiles": self.enemy_projectiles[..., PROJECTILE_OBSERVATION],
+            "enemy_projectile_mask": self.enemy_projectile_mask.copy(),
+            "time": self.time.copy(),
+        }
+
+    def step(self, move:np.ndarray, fire:np.ndarray) -> tuple[dict, np.ndarray, np.ndarray]:
+        dt = self.dt
+        self.time += dt
+        self.steps += 1
+        reward = np.zeros(self.batch, dtype=np.float64)
+
+        self.move_players(np.asarray(move, dtype=np.float64).reshape(self.batch, self.max_players, 2), dt)
+        self.fire_players(np.asarray(fire, dtype=bool).reshape(self.batch, self.max_players, 4), dt)
+        self.bound_players()
+        self.flow_field.update(*self._player_targets())
+        self.move_projectiles(self.player_projectiles, self.player_projectile_mask, self.player_projectile_previous, dt)
+        self.update_enemies(dt)
+        self.move_projectiles(self.enemy_projectiles, self.enemy_projectile_mask, self.enemy_projectile_previous, dt)
+        reward += self.hit_enemies()
+        reward -= self.hit_players()
+        self.teleport(self.players, self.player_mask, self.portal_cooldown, 1 / 6)
+        self.teleport(self.player_projectiles, self.player_projectile_mask)
+        self.teleport(self.enemies, self.enemy_mask)
+        self.teleport(self.enemy_projectiles, self.enemy_projectile_mask)
+
+        reward /= 100
+        self.returns += reward
+        done = ~np.any(self.enemy_mask, axis=1) | (self.steps >= self.max_steps)
+        if np.any(done):
+            self.final_returns[done] = self.returns[done]
+            self.final_steps[done] = self.steps[done]
+            self.episodes += int(np.count_nonzero(done))
+            return self.reset(done), reward, done
+        return self.observe(), reward, done
+
+    def _flat(self, data:np.ndarray, mask:np.ndarray) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """Flat (B * N, C) view, used flat rows and the arena of each"""
+        rows = np.flatnonzero(mask)
+        return data.reshape(-1, data.shape[-1]), rows, rows // mask.shape[1]
+
+    def _player_targets(self) -> tuple[np.ndarray, np.ndarray]:
+        players, rows, envs = self._flat(self.players, self.player_mask)
+        return players[rows, 0:2], envs
+
+    def _spawn(self, data:np.ndarray, mask:np.ndarray, previous:np.ndarray, envs:np.ndarray, rows:np.ndarray) -> None:
+        """Writes `rows` into free slots of arena envs[i], rows past an arena's capacity are dropped"""
+        if not len(rows):
+            return
+        order = np.argsort(envs, kind="stable")
+        envs, rows = envs[order], rows[order]
+        capacity = mask.shape[1]
+        free = np.flatnonzero(~mask)
+        first_free = np.searchsorted(free, envs * capacity)
+        free_count = np.bincount(free // capacity, minlength=self.batch)[envs]
+        rank = np.arange(len(envs)) - np.searchsorted(envs, envs)
+        fits = rank < free_count
+        slots = free[first_free[fits] + rank[fits]]
+        mask.ravel()[slots] = True
+        data.reshape(-1, data.shape[-1])[slots] = rows[fits]
+        previous.reshape(-1, 2)[slots] = rows[fits, 0:2]
+
+    def _query(self, data:np.ndarray, mask:np.ndarray, positions:np.ndarray, envs:np.ndarray, radii,
+               previous:np.ndarray | None = None, margin:float = 0.0, first_only:bool = False) -> tuple[np.ndarray, np.ndarray]:
+        """CircleColliderStore query over every arena at once, returns flat rows of `data`"""
+        flat, rows, row_envs = self._flat(data, mask)
+        offset = np.zeros((len(rows), 2))
+        offset[:, 0] = row_envs * self.stride
+        colliders = np.zeros((len(rows), 3))
+        colliders[:, 0:2] = flat[rows, 0:2] + offset
+        colliders[:, 2] = flat[rows, 2]
+        swept = previous.reshape(-1, 2)[rows] + offset if previous is not None else None
+        store = CircleColliderStore(colliders, lambda: np.arange(len(rows)), margin=margin, previous=swept)
+        positions = np.array(positions, dtype=np.float64).reshape(-1, 2)
+        positions[:, 0] += np.asarray(envs) * self.stride
+        offsets, hits = store.query(positions, radii, first_only=first_only)
+        return offsets, rows[hits]
+
+    def move_players(self, move:np.ndarray, dt:float) -> None:
+        players, active, _ = self._flat(self.players, self.player_mask)
+        if len(active):
+            kernels.move_players(players, active, move.reshape(-1, 2)[active], self, dt)
+
+    def fire_players(self, fire:np.ndarray, dt:float) -> None:
+        players, active, envs = self._flat(self.players, self.player_mask)
+        if not len(active):
+            return
+        ids, buffer = kernels.player_shots(
+            players, self._fire_held.reshape(-1, 4), active, fire.reshape(-1, 4)[active], self.time[envs], dt, self
+        )
+        self._spawn(self.player_projectiles, self.player_projectile_mask, self.player_projectile_previous, ids // self.max_players, buffer)
+
+    def bound_players(self) -> None:
+        players, active, _ = self._flat(self.players, self.player_mask)
+        kernels.resolve_walls(players, active, self.collision)
+
+    def move_projectiles(self, data:np.ndarray, mask:np.ndarray, previous:np.ndarray, dt:float) -> None:
+        flat, active, envs = self._flat(data, mask)
+        if not len(active):
+            return
+        expired = kernels.move_projectiles(flat, previous.reshape(-1, 2), active, dt, self.time[envs], self.collision)
+        mask.ravel()[active[expired]] = False
+
+    def update_enemies(self, dt:float) -> None:
+        enemies, active, envs = self._flat(self.enemies, self.enemy_mask)
+        if not len(active):
+            return
+
+        # nearest living player of the enemy's own arena
+        player_positions = self.players[envs, :, 0:2]
+        diffs = player_positions - enemies[active, None, 0:2]
+        distance = np.sqrt(np.sum(diffs * diffs, axis=-1))
+        distance[~self.player_mask[envs]] = np.inf
+        targets = np.argmin(distance, axis=1)
+        distance = distance[np.arange(len(active)), targets]
+
+        due, _, step = kernels.lod_rows(enemies, active, distance, self.lod_levels, self.lod_tick, dt)
+        self.lod_tick += 1
+        rows, row_envs, targets = active[due], envs[due], targets[due]
+        target_positions = player_positions[np.flatnonzero(due), targets]
+        seen = kernels.steer_enemies(
+            enemies, rows, step, distance[due], target_positions, self.players[row_envs, targets, 2],
+            self.line_of_sight.visible,
+            lambda positions, targets, steered: self.flow_field.sample(positions, targets, row_envs[steered]),
+        )
+        enemies[active, 9] -= self.gravity
+        if len(rows):
+            offsets, others = self._query(self.enemies, self.enemy_mask, enemies[rows, 0:2], row_envs, enemies[rows, 2] / 2)
+            kernels.overlap_push(enemies, rows, offsets, others, step)
+        kernels.move_enemies(enemies, rows, step, self.collision)
+
+        shooters = np.flatnonzero((enemies[rows, 32] == 1) & seen)
+        fired, buffer = kernels.enemy_shots(enemies, rows, shooters, self.time[row_envs], step, target_positions)
+        self._spawn(self.enemy_projectiles, self.enemy_projectile_mask, self.enemy_projectile_previous, row_envs[fired], buffer)
+
+        # enemies are pushed out of the players of their arena
+        kernels.push_out(enemies, active, self.players[envs, :, 0:2], self.players[envs, :, 2], self.player_mask[envs])
+
+    def hit_enemies(self) -> np.ndarray:
+        """Player projectile damage, shields first, returns damage dealt per arena"""
+        enemies, active, envs = self._flat(self.enemies, self.enemy_mask)
+        if not len(active) or not np.any(self.player_projectile_mask):
+            return np.zeros(self.batch)
+        offsets, projectiles = self._query(
+            self.player_projectiles, self.player_projectile_mask, enemies[active, 0:2], envs,
+            enemies[active, 2] / 2, previous=self.player_projectile_previous, first_only=True,
+        )
+        self.player_projectile_mask.ravel()[projectiles] = False
+        damage = self.damage * np.diff(offsets)
+        hit = damage > 0
+        dealt, killed = kernels.apply_damage(enemies, active[hit], damage[hit])
+        self.enemy_mask.ravel()[killed] = False
+        return np.bincount(envs[hit], weights=dealt, minlength=self.batch)
+
+    def hit_players(self) -> np.ndarray:
+        """Despawns enemy projectiles that hit a player, returns the damage they carried per arena"""
+        players, active, envs = self._flat(self.players, self.player_mask)
+        if not len(active) or not np.any(self.enemy_projectile_mask):
+            return np.zeros(self.batch)
+        offsets, projectiles = self._query(
+            self.enemy_projectiles, self.enemy_projectile_mask, players[active, 0:2], envs,
+            players[active, 2] / 2, previous=self.enemy_projectile_previous,
+        )
+        self.enemy_projectile_mask.ravel()[projectiles] = False
+        return np.bincount(envs, weights=self.damage * np.diff(offsets), minlength=self.batch)
+
+    def teleport(self, data:np.ndarray, mask:np.ndarray, cooldown:float = 0.5, radius_scale:float = 0.5) -> None:
+        """Same rules as Game.handle_portal_collisions_abstract, within each arena"""
+        flat, active, envs = self._flat(data, mask)
+        eligible = flat[active, 12] < self.time[envs]
+        active, envs = active[eligible], envs[eligible]
+        if not len(active):
+            return
+        offsets, portals = self._query(self.portals, self.portal_mask, flat[active, 0:2], envs, flat[active, 2] * radius_scale, margin=0.25)
+        if not len(portals):
+            return
+        kernels.teleport(flat, active, offsets, portals, self.portals.reshape(-1, 8), self.portal_pairs, self.time[envs], cooldown)
@@ -1,5 +1,31 @@
 # Classes to hold and handle world data and state
 
+# (position, scale) of each wall box in the starting room
+ROOM_WALLS = [
+    ((0, 22), (69, 5)),
+    ((0, -22), (69, 5)),
+    ((38, 0), (7, 50)),
+    ((-38, 0), (7, 50)),
+]
+
+# ((position, scale), (position, scale)) of both ends of each portal pair in the starting room
+ROOM_PORTALS = [
+    (((15, -15), 6), ((-15, 15), 6)),
+]
+
+# (position, radius, kind) of each trigger in the starting room, kind 0 is a pressure plate, 1 a zone
+ROOM_TRIGGERS = [
+    ((-27, -13), 2.5, 0),
+    ((27, 13), 2.5, 0),
+    ((0, 0), 8, 1),
+]
+
+def room_bounds(walls:list) -> tuple[float, float, float, float]:
+    """(x min, y min, x max, y max) of the outer edges of a room's wall boxes"""
+    low = [min(position[i] - scale[i] / 2 for position, scale in walls) for i in (0, 1)]
+    high = [max(position[i] + scale[i] / 2 for position, scale in walls) for i in (0, 1)]
+    return (low[0], low[1], high[0], high[1])
+
 # NYI
 
 class World:
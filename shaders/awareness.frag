@@ -1,48 +1,34 @@
 #version 150
-uniform vec2 positions[255];
-uniform vec2 radii[255];
+// coverage counts baked on the CPU, red awareness and green follow ranges
+uniform sampler2D awareness_field;
+uniform vec2 field_origin;
+uniform vec2 field_size;
 
-uniform int circle_count;
 uniform vec2 screen_size;
-uniform sampler2D p3d_Texture0;  // Texture sampler
+// world position at the center of the screen
+uniform vec2 view_center;
 
 out vec4 fragColor;
 
-void processBuffer(vec2 pos[255], vec2 rad[255], inout vec4 fragColor, vec2 uv, int count) {
-    for (int i = 0; i < count; i++) {
-        vec2 circle_pos = vec2(pos[i][0], pos[i][1]) / vec2(20);
-        float dist = length(uv - circle_pos);
-
-        vec4 circleColor = vec4(1, 0.2, 0.2, 1);
-
-        if ((dist > (rad[i][1] / 40.255)) && (dist < (rad[i][1] / 40.0))) {
-            // Edge of the circle
-            circleColor.a = 0.6;
-            circleColor.g = 0.6;
-        } else if (dist < (rad[i][1] / 40.0) && dist > (rad[i][0] / 41)) {
-            // Inside the circle
-            circleColor.a = 0.25;
-        } else if ((dist > (rad[i][0] / 42)) && (dist < (rad[i][0] / 40.0))) {
-            // Edge of the circle
-            circleColor.a = 0.6;
-        } else if (dist < (rad[i][0] / 40.0)) {
-            // Inside the circle
-            circleColor.a = 0.25;
-        } else {
-            continue; // Skip processing if not in circle bounds
-        }
-
-        // Apply multiplicative blending
-        fragColor = fragColor * (1.0 - circleColor.a) + circleColor * circleColor.a;
-    }
-}
-
 void main() {
     vec2 uv = gl_FragCoord.xy / screen_size;
     uv = uv * 2.0 - 1.0; // Normalize UV to -1 to 1
     uv = uv * vec2(screen_size[0] / screen_size[1], 1);
-    fragColor = vec4(1, 1, 1, 0); // Start with white background
-    processBuffer(positions, radii, fragColor, uv, circle_count);
+
+    vec2 counts = texture(awareness_field, (uv * 20.0 + view_center - field_origin) / field_size).rg * 255.0;
+    float aware = min(counts.x, 1.0);
+    float follow = min(counts.y, 1.0);
+
+    // covered areas get a base tint and crowding deepens it, capped so
+    // hundreds of overlapping ranges never hide the canvas below
+    float density = 1.0 - exp(-(counts.x + counts.y) / 32.0);
+    fragColor = vec4(1, 0.2, 0.2, 0.1 * (aware + follow) + 0.2 * density);
+
+    // rims where the filtered coverage crosses the circle edge
+    float aware_rim = 1.0 - smoothstep(0.0, 1.5 * fwidth(aware), abs(aware - 0.5));
+    float follow_rim = 1.0 - smoothstep(0.0, 1.5 * fwidth(follow), abs(follow - 0.5));
+    fragColor = mix(fragColor, vec4(1, 0.2, 0.2, 0.6), aware_rim * step(0.01, aware));
+    fragColor = mix(fragColor, vec4(1, 0.6, 0.2, 0.6), follow_rim * step(0.01, follow));
 
     // Ensure the final color stays in range
     fragColor = clamp(fragColor, 0.0, 1.0);
@@ -15,14 +15,53 @@ struct Drawable {
     float shield;
 };
 
+#ifdef COMPACT_SSBO
+// compact wire format, 16 bytes per drawable
+struct PackedDrawable {
+    uint position;      // half2
+    uint scale_type;    // half2
+    uint color;         // rgba8
+    uint health_shield; // unorm16 ratios
+};
+
+layout(std430, binding = 0) buffer EnemyData {
+    PackedDrawable enemy_data[255];
+};
+
+layout(std430, binding = 0) buffer PlayerData {
+    PackedDrawable player_data[];
+};
+
+Drawable unpack_drawable(PackedDrawable packed) {
+    Drawable draw;
+    draw.position = unpackHalf2x16(packed.position);
+    vec2 scale_type = unpackHalf2x16(packed.scale_type);
+    draw.scale = scale_type.x;
+    draw.type = scale_type.y;
+    draw.color = unpackUnorm4x8(packed.color);
+    vec2 ratios = unpackUnorm2x16(packed.health_shield);
+    draw.max_health = 1.0;
+    draw.max_shield = 1.0;
+    draw.health = ratios.x;
+    draw.shield = ratios.y;
+    return draw;
+}
+
+Drawable get_enemy(int i) { return unpack_drawable(enemy_data[i]); }
+Drawable get_player(int i) { return unpack_drawable(player_data[i]); }
+#else
 layout(std430, binding = 0) buffer EnemyData {
     Drawable enemy_data[255];
 };
 
 layout(std430, binding = 0) buffer PlayerData {
-    Drawable player_data[1];
+    Drawable player_data[];
 };
 
+Drawable get_enemy(int i) { return enemy_data[i]; }
+Drawable get_player(int i) { return player_data[i]; }
+#endif
+
 struct Portal {
     // First 4 floats
     vec2 position;
@@ -32,8 +71,9 @@ struct Portal {
     vec4 color;
 };
 
-layout(std430, binding = 0) buffer portalData {
-    Portal portals[32];
+// trigger volumes, same layout as portals with spawn replaced by occupied
+layout(std430, binding = 0) buffer ButtonData {
+    Portal buttons[];
 };
 
 struct Projectile {
@@ -45,6 +85,39 @@ struct Projectile {
     vec4 color;
 };
 
+#ifdef COMPACT_SSBO
+// compact wire format, 12 bytes per projectile
+struct PackedProjectile {
+    uint position;      // half2
+    uint scale;         // half, high bits unused
+    uint color;         // rgba8
+};
+
+layout(std430, binding = 0) buffer PlayerProjectileData {
+    PackedProjectile player_projectiles[255];
+};
+
+layout(std430, binding = 0) buffer EnemyProjectileData {
+    PackedProjectile enemy_projectiles[255];
+};
+
+Projectile unpack_projectile(PackedProjectile packed) {
+    Projectile proj;
+    proj.position = unpackHalf2x16(packed.position);
+    proj.scale = unpackHalf2x16(packed.scale).x;
+    proj.spawn = 0.0;
+    proj.color = unpackUnorm4x8(packed.color);
+    return proj;
+}
+
+// which: 0 player projectiles, 1 enemy projectiles
+Projectile get_projectile(int which, int i) {
+    if (which == 0) {
+        return unpack_projectile(player_projectiles[i]);
+    }
+    return unpack_projectile(enemy_projectiles[i]);
+}
+#else
 layout(std430, binding = 0) buffer PlayerProjectileData {
     Projectile player_projectiles[255];
 };
@@ -53,28 +126,42 @@ layout(std430, binding = 0) buffer EnemyProjectileData {
     Projectile enemy_projectiles[255];
 };
 
+// which: 0 player projectiles, 1 enemy projectiles
+Projectile get_projectile(int which, int i) {
+    if (which == 0) {
+        return player_projectiles[i];
+    }
+    return enemy_projectiles[i];
+}
+#endif
+
 uniform int count;
 uniform int enemy_count;
-uniform int portal_count;
 uniform int player_projectile_count;
 uniform int enemy_projectile_count;
+uniform int button_count;
 
 uniform vec2 screen_size;
 
 uniform sampler2D p3d_Texture0;         //# Texture 0
-uniform sampler2D background_texture;   //# Texture 1
-uniform sampler2D portal_texture;       //# Texture 2
+uniform sampler2D static_layer;         //# Texture 1
 uniform sampler2D projectile_texture;   //# Texture 3
 uniform sampler2D enemy_texture;        //# Texture 3
 
-uniform float grid_spacing;
-uniform vec4 grid_color;
+// uv extent of the baked static layer inside its texture
+uniform vec2 static_scale;
+// world position the static layer was baked around and its size as a multiple of the view
+uniform vec2 static_center;
+uniform float static_coverage;
+
+// world position at the center of the screen
+uniform vec2 view_center;
 
 out vec4 fragColor;
 
-void draw_projectiles(Projectile projectiles[255], int proj_count, vec2 proj_uv) {
+void draw_projectiles(int which, int proj_count, vec2 proj_uv) {
     for (int _i = 0; _i < proj_count; _i++) {
-        Projectile proj = projectiles[_i];
+        Projectile proj = get_projectile(which, _i);
         vec2 tex_center = proj.position / 20.0;
         vec2 tex_uv = (proj_uv - tex_center) / (proj.scale / 20.0) + 0.5;
 
@@ -94,9 +181,9 @@ void draw_projectiles(Projectile projectiles[255], int proj_count, vec2 proj_uv)
 }
 
 
-void draw_drawables(Drawable drawables[255], int draw_count, vec2 draw_uv, sampler2D tex) {
+void draw_enemies(int draw_count, vec2 draw_uv, sampler2D tex) {
     for (int _i = 0; _i < draw_count; _i++) {
-        Drawable draw = drawables[_i];
+        Drawable draw = get_enemy(_i);
         vec2 tex_center = draw.position / 20.0;
         vec2 tex_uv = (draw_uv - tex_center) / (draw.scale / 20.0) + 0.5;
 
@@ -142,39 +229,26 @@ void draw_drawables(Drawable drawables[255], int draw_count, vec2 draw_uv, sampl
 void main() {
     vec2 uv = (gl_FragCoord.xy / screen_size) * 2.0 - 1.0;
     uv *= vec2(screen_size.x / screen_size.y, 1.0);
+    uv += view_center / 20.0;
 
-    // draw background image
-    fragColor = vec4(texture(background_texture, uv*4).rgb/2, 1);
+    // background, portals and grid come prebaked from static.frag
+    vec2 static_uv = (uv - static_center / 20.0) / (vec2(screen_size.x / screen_size.y, 1.0) * static_coverage) * 0.5 + 0.5;
+    fragColor = vec4(texture(static_layer, static_uv * static_scale).rgb, 1);
 
-    // draw portals
-    for (int _i = 0; _i < portal_count*2; _i++) {
-        Portal portal = portals[_i];
-        vec2 tex_center = portal.position / 20.0;
-        vec2 tex_uv = (uv - tex_center) / (portal.scale / 7.0) + 0.5;
-
-        // Skip outside texture bounds
-        if (tex_uv.x < 0.0 || tex_uv.x > 1.0 || tex_uv.y < 0.0 || tex_uv.y > 1.0) {
+    // draw triggers as tinted discs with a rim, brighter while occupied
+    for (int _i = 0; _i < button_count; _i++) {
+        Portal button = buttons[_i];
+        float dist = length(uv - button.position / 20.0) * 20.0;
+        if (dist > button.scale) {
             continue;
         }
-
-        vec4 tex_color = texture(portal_texture, tex_uv);
-        fragColor = mix(fragColor, tex_color * portal.color, tex_color.a);
-
-        // Exit if fully opaque since lower layers won't contribute
-        if (fragColor.a >= 1.0) {
-            break;
-        }
+        float rim = step(button.scale - 0.3, dist);
+        float alpha = mix(0.2, 0.45, button.spawn) + rim * 0.4;
+        fragColor = mix(fragColor, button.color, alpha);
     }
 
-    // draw grid
-
-    vec2 grid_pos = abs(fract((uv * 40) / (grid_spacing) - 0.5));
-    float line_width = 0.03;
-    float grid_line = step(grid_pos.x, line_width) + step(grid_pos.y, line_width);
-    fragColor = mix(fragColor, grid_color, grid_line);
-
     for (int _i = 0; _i < player_projectile_count; _i++) {
-        Projectile proj = player_projectiles[_i];
+        Projectile proj = get_projectile(0, _i);
         vec2 tex_center = proj.position / 20.0;
         vec2 tex_uv = (uv - tex_center) / (proj.scale / 20.0) + 0.5;
 
@@ -193,13 +267,13 @@ void main() {
     }
     
     // draw enemeies 
-    draw_drawables(enemy_data, enemy_count, uv, enemy_texture);
-    draw_projectiles(enemy_projectiles, enemy_projectile_count, uv);
-    draw_projectiles(player_projectiles, player_projectile_count, uv);
+    draw_enemies(enemy_count, uv, enemy_texture);
+    draw_projectiles(1, enemy_projectile_count, uv);
+    draw_projectiles(0, player_projectile_count, uv);
 
     // draw players and NPCs
     for (int _i = 0; _i < count; _i++) {
-        Drawable draw = player_data[_i];
+        Drawable draw = get_player(_i);
         vec2 tex_center = draw.position / 20.0;
         vec2 tex_uv = (uv - tex_center) / (draw.scale / 20.0) + 0.5;
 
@@ -0,0 +1,13 @@
+#version 150
+
+in vec4 particle_color;
+out vec4 fragColor;
+
+void main() {
+    // round points with a soft edge
+    float d = length(gl_PointCoord - 0.5) * 2.0;
+    if (d > 1.0) {
+        discard;
+    }
+    fragColor = vec4(particle_color.rgb, particle_color.a * (1.0 - d * d));
+}
@@ -0,0 +1,20 @@
+#version 150
+
+// x, y in world units, z size in world units, w remaining life 1 -> 0
+in vec4 p3d_Vertex;
+in vec4 p3d_Color;
+
+// window width / height, the canvas maps world units / 20 to this aspect
+uniform float aspect;
+// window pixels per world unit
+uniform float pixels_per_unit;
+// world position at the center of the screen
+uniform vec2 view_center;
+
+out vec4 particle_color;
+
+void main() {
+    gl_Position = vec4((p3d_Vertex.xy - view_center) / 20.0 / vec2(aspect, 1.0), 0.0, 1.0);
+    gl_PointSize = max(1.0, p3d_Vertex.z * p3d_Vertex.w * pixels_per_unit);
+    particle_color = vec4(p3d_Color.rgb, p3d_Color.a * p3d_Vertex.w);
+}
@@ -0,0 +1,67 @@
+#version 430
+
+// background, portals and grid, rendered once into a texture the canvas starts from
+
+struct Portal {
+    // First 4 floats
+    vec2 position;
+    float scale;
+    float spawn;
+    // Second 4 floats
+    vec4 color;
+};
+
+layout(std430, binding = 0) buffer portalData {
+    Portal portals[32];
+};
+
+uniform int portal_count;
+
+uniform vec2 screen_size;
+// world position at the center of the bake, which spans view_scale screens
+uniform vec2 view_center;
+uniform float view_scale;
+
+uniform sampler2D background_texture;
+uniform sampler2D portal_texture;
+
+uniform float grid_spacing;
+uniform vec4 grid_color;
+
+out vec4 fragColor;
+
+void main() {
+    vec2 uv = (gl_FragCoord.xy / screen_size) * 2.0 - 1.0;
+    uv *= vec2(screen_size.x / screen_size.y, 1.0) * view_scale;
+    uv += view_center / 20.0;
+
+    // draw background image
+    fragColor = vec4(texture(background_texture, uv*4).rgb/2, 1);
+
+    // draw portals
+    for (int _i = 0; _i < portal_count*2; _i++) {
+        Portal portal = portals[_i];
+        vec2 tex_center = portal.position / 20.0;
+        vec2 tex_uv = (uv - tex_center) / (portal.scale / 7.0) + 0.5;
+
+        // Skip outside texture bounds
+        if (tex_uv.x < 0.0 || tex_uv.x > 1.0 || tex_uv.y < 0.0 || tex_uv.y > 1.0) {
+            continue;
+        }
+
+        vec4 tex_color = texture(portal_texture, tex_uv);
+        fragColor = mix(fragColor, tex_color * portal.color, tex_color.a);
+
+        // Exit if fully opaque since lower layers won't contribute
+        if (fragColor.a >= 1.0) {
+            break;
+        }
+    }
+
+    // draw grid
+
+    vec2 grid_pos = abs(fract((uv * 40) / (grid_spacing) - 0.5));
+    float line_width = 0.03;
+    float grid_line = step(grid_pos.x, line_width) + step(grid_pos.y, line_width);
+    fragColor = mix(fragColor, grid_color, grid_line);
+}
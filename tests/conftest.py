@@ -0,0 +1,17 @@
+import os
+import sys
+import pytest
+
+# the game imports its modules as include.*, relative to the repository root
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+@pytest.fixture(scope="session")
+def game():
+    """One headless game for the session, Ursina only starts once per process"""
+    from panda3d.core import loadPrcFileData
+    loadPrcFileData("", "window-type none\naudio-library-name null")
+    import app
+    game = app.Game(window_type="none")
+    yield game
+    game.end_game()
@@ -0,0 +1,19 @@
+# net bytes a stage may leave allocated per tick on average, more than this
+# retained every tick is what piles up into collector pauses
+STAGE_BUDGET = 4 * 1024
+WARMUP_TICKS = 30
+TICKS = 120
+
+def test_headless_ticks_stay_within_allocation_budgets(game):
+    for _ in range(WARMUP_TICKS):
+        game.update(1 / 60)
+    game.enable_allocation_tracking()
+    game.allocation_tracker.reset()
+    try:
+        for _ in range(TICKS):
+            game.update(1 / 60)
+    finally:
+        game.disable_allocation_tracking()
+    tracked = game.allocation_tracker.per_tick()
+    assert set(tracked) == {stage.name for stage in game.stage_scheduler.stages}
+    assert game.allocation_tracker.over_budget({}, default=STAGE_BUDGET) == {}
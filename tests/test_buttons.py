@@ -0,0 +1,74 @@
+from types import SimpleNamespace
+import numpy as np
+
+from include.buttons import ButtonManager, PLATE, ZONE
+
+class Source:
+    """The slice of a manager a trigger reads, circles with the diameter in column 2"""
+    def __init__(self, capacity:int, count:int, rng):
+        self.max_entities = capacity
+        self.data = np.zeros((capacity, 12), dtype=np.float32)
+        self.data[:, 2] = rng.uniform(0.5, 2, capacity)
+        self.active_indices = np.sort(rng.choice(capacity, count, replace=False))
+
+def make_buttons(seed:int = 0):
+    rng = np.random.default_rng(seed)
+    game = SimpleNamespace(shared=None, sim_time=0.0, visible_rows=lambda data, rows, radius_scale=0.5: rows)
+    # odd capacities so source slots straddle bitset bytes
+    sources = [Source(13, 9, rng), Source(37, 25, rng), Source(20, 14, rng)]
+    buttons = ButtonManager(game, "TestButton", sources, max_entities=16)
+    for _ in range(10):
+        kind = PLATE if rng.uniform() < 0.5 else ZONE
+        buttons.spawn(tuple(rng.uniform(-10, 10, 2)), rng.uniform(1, 4), kind)
+    return buttons, sources, rng
+
+def brute_force(buttons:ButtonManager, sources:list) -> set:
+    """(trigger, source, slot) of every allowed source circle touching a trigger"""
+    inside = set()
+    for trigger in buttons.active_indices:
+        position, radius, mask = buttons.data[trigger, 0:2], buttons.data[trigger, 2], int(buttons.data[trigger, 9])
+        for i, source in enumerate(sources):
+            if not mask & (1 << i):
+                continue
+            for slot in source.active_indices:
+                if np.linalg.norm(source.data[slot, 0:2] - position) <= radius + source.data[slot, 2] / 2:
+                    inside.add((int(trigger), i, int(slot)))
+    return inside
+
+def events(pairs:np.ndarray) -> set:
+    return {tuple(map(int, row)) for row in pairs}
+
+def test_enter_exit_and_stay_match_brute_force():
+    buttons, sources, rng = make_buttons()
+    previous = set()
+    for _ in range(20):
+        for source in sources:
+            source.data[:, 0:2] = rng.uniform(-12, 12, (source.max_entities, 2))
+        buttons.update(1 / 60)
+        current = brute_force(buttons, sources)
+        assert events(buttons.entered) == current - previous
+        assert events(buttons.exited) == previous - current
+        assert events(buttons.staying) == current & previous
+        counts = np.bincount([trigger for trigger, _, _ in current], minlength=buttons.max_entities)
+        active = buttons.active_indices
+        np.testing.assert_array_equal(buttons.data[active, 10], counts[active])
+        np.testing.assert_array_equal(buttons.data[active, 3], counts[active] > 0)
+        previous = current
+    # the random walk has to exercise every event
+    assert len(buttons.entered) and len(buttons.exited) and len(buttons.staying)
+
+def test_plates_ignore_projectiles_and_despawn_clears_occupancy():
+    buttons, sources, _ = make_buttons(1)
+    for source in sources:
+        source.data[:, 0:2] = 0
+    plate = buttons.spawn((0, 0), 3.0, PLATE)
+    zone = buttons.spawn((0, 0), 3.0, ZONE)
+    buttons.update(1 / 60)
+    found = {(trigger, source) for trigger, source, _ in events(buttons.entered)}
+    assert {(plate, 0), (plate, 1), (zone, 0), (zone, 1), (zone, 2)} <= found
+    assert (plate, 2) not in found
+    buttons.despawn(zone)
+    buttons.update(1 / 60)
+    # a despawned trigger drops its occupants without exit events
+    assert zone not in {trigger for trigger, _, _ in events(buttons.exited)}
+    assert not buttons.occupancy[zone].any()
@@ -0,0 +1,114 @@
+import numpy as np
+import pytest
+
+from include.colliders import CircleColliderStore
+from include.kernels import overlap_push
+from include.physics import swept_circle_toi
+
+def scene(count:int, seed:int = 0, used:float = 0.7):
+    """Random circle rows with some unused ones in between, previous positions a short step back"""
+    rng = np.random.default_rng(seed)
+    data = np.zeros((count, 8), dtype=np.float32)
+    data[:, 0:2] = rng.uniform(-30, 30, (count, 2))
+    data[:, 2] = rng.uniform(0.2, 3, count)
+    rows = np.flatnonzero(rng.uniform(0, 1, count) < used)
+    previous = data[:, 0:2] + rng.uniform(-6, 6, (count, 2)).astype(np.float32)
+    return data, rows, previous
+
+def queries(count:int, seed:int = 1):
+    rng = np.random.default_rng(seed)
+    return rng.uniform(-32, 32, (count, 2)), rng.uniform(0.1, 2, count)
+
+def segment_distance(starts, ends, point) -> np.ndarray:
+    """Distance from `point` to every segment starts -> ends"""
+    d = ends - starts
+    length = np.sum(d * d, axis=1)
+    t = np.clip(np.sum((point - starts) * d, axis=1) / np.where(length > 0, length, 1), 0, 1)
+    return np.linalg.norm(starts + t[:, None] * d - point, axis=1)
+
+def brute_force(data, rows, positions, radii, margin=0.0, previous=None) -> list:
+    ends = data[rows, 0:2].astype(np.float64)
+    starts = previous[rows].astype(np.float64) if previous is not None else ends
+    reach = data[rows, 2].astype(np.float64) + margin
+    return [
+        set(rows[segment_distance(starts, ends, position) <= reach + radius].tolist())
+        for position, radius in zip(positions, radii)
+    ]
+
+def as_sets(offsets, indices) -> list:
+    return [set(indices[offsets[i]:offsets[i + 1]].tolist()) for i in range(len(offsets) - 1)]
+
+@pytest.mark.parametrize("margin", [0.0, 0.5])
+def test_query_matches_brute_force(margin):
+    data, rows, _ = scene(200)
+    positions, radii = queries(150)
+    store = CircleColliderStore(data, lambda: rows, margin=margin)
+    offsets, indices = store.query(positions, radii)
+    assert offsets[0] == 0 and offsets[-1] == len(indices)
+    assert np.all(np.diff(offsets) >= 0)
+    assert as_sets(offsets, indices) == brute_force(data, rows, positions, radii, margin)
+    # the broadphase only has to narrow down the full cross product
+    assert store.candidates < len(rows) * len(positions)
+
+def test_swept_query_matches_brute_force():
+    data, rows, previous = scene(200, seed=2)
+    positions, radii = queries(150, seed=3)
+    store = CircleColliderStore(data, lambda: rows, previous=previous)
+    offsets, indices = store.query(positions, radii)
+    assert as_sets(offsets, indices) == brute_force(data, rows, positions, radii, previous=previous)
+    # a fast mover skipping clean over a query circle still hits it
+    static = CircleColliderStore(data, lambda: rows)
+    assert sum(map(len, as_sets(*static.query(positions, radii)))) < len(indices)
+
+def test_swept_toi_matches_sampled_motion():
+    data, rows, previous = scene(100, seed=4)
+    positions, radii = queries(40, seed=5)
+    steps = np.linspace(0, 1, 2001)
+    for position, radius in zip(positions, radii):
+        starts, ends = previous[rows].astype(np.float64), data[rows, 0:2].astype(np.float64)
+        toi = swept_circle_toi(starts, ends, data[rows, 2], position, radius)
+        path = starts[:, None] + steps[None, :, None] * (ends - starts)[:, None]
+        touching = np.linalg.norm(path - position, axis=2) <= data[rows, 2, None] + radius
+        sampled = np.where(touching.any(axis=1), steps[np.argmax(touching, axis=1)], np.inf)
+        assert np.array_equal(np.isinf(toi), np.isinf(sampled))
+        hit = np.isfinite(toi)
+        np.testing.assert_allclose(toi[hit], sampled[hit], atol=steps[1] + 1e-9)
+
+def test_first_only_reports_every_collider_for_its_earliest_query():
+    data, rows, previous = scene(120, seed=6)
+    positions, radii = queries(200, seed=7)
+    store = CircleColliderStore(data, lambda: rows, previous=previous)
+    offsets, indices = store.query(positions, radii, first_only=True)
+    assert len(indices) == len(set(indices.tolist()))
+    owners = np.repeat(np.arange(len(positions)), np.diff(offsets))
+    expected = {}
+    for row in rows:
+        toi = swept_circle_toi(previous[row], data[row, 0:2], data[row, 2], positions, radii)
+        if np.isfinite(toi).any():
+            # argmin keeps the earlier query on ties
+            expected[int(row)] = int(np.argmin(toi))
+    assert dict(zip(indices.tolist(), owners.tolist())) == expected
+
+def test_query_over_own_rows_reports_self_and_the_push_skips_it():
+    data, rows, _ = scene(60, seed=8)
+    store = CircleColliderStore(data, lambda: rows)
+    offsets, others = store.query(data[rows, 0:2], data[rows, 2] / 2)
+    for i, row in enumerate(rows):
+        assert row in others[offsets[i]:offsets[i + 1]]
+    # a lone circle only finds itself and stays where it is
+    alone = np.array([rows[0]])
+    lone = CircleColliderStore(data, lambda: alone)
+    offsets, others = lone.query(data[alone, 0:2], data[alone, 2] / 2)
+    assert others.tolist() == alone.tolist()
+    before = data[alone, 0:2].copy()
+    overlap_push(data, alone, offsets, others, np.ones(1))
+    np.testing.assert_array_equal(data[alone, 0:2], before)
+
+def test_empty_store_and_empty_queries():
+    data, _, _ = scene(10)
+    store = CircleColliderStore(data, lambda: np.zeros(0, dtype=np.intp))
+    offsets, indices = store.query(np.zeros((3, 2)), 1.0)
+    assert offsets.tolist() == [0, 0, 0, 0] and not len(indices)
+    store = CircleColliderStore(data, lambda: np.arange(10))
+    offsets, indices = store.query(np.zeros((0, 2)), 1.0)
+    assert offsets.tolist() == [0] and not len(indices)
@@ -0,0 +1,57 @@
+import time
+
+from include.frames import TickPacer
+from include.state import StateRing
+
+def test_pacer_catches_up_then_drops_the_backlog():
+    pacer = TickPacer(0.01, max_catch_up=3)
+    # two ticks behind, the next one is due at once
+    time.sleep(0.025)
+    started = time.perf_counter()
+    pacer.wait()
+    assert time.perf_counter() - started < 0.005
+    assert (pacer.late, pacer.dropped) == (1, 0)
+    # far past the catch up limit the backlog goes and the schedule restarts
+    time.sleep(0.1)
+    pacer.wait()
+    assert pacer.late == 2
+    assert pacer.dropped >= 8
+    started = time.perf_counter()
+    pacer.wait()
+    assert time.perf_counter() - started > 0.005
+
+def test_timers_run_on_the_sim_clock(game):
+    ring = StateRing(game.state_sources(), slots=1)
+    game.save_state(ring)
+    shooter = game.players.spawn(position=(0, 0))
+    try:
+        game.players.fire_input[shooter, 1] = True
+        sim_time, spawned = game.sim_time, game.player_projectiles.spawned
+        # the wall clock barely moves, every shot comes from the ticks' dt
+        for _ in range(30):
+            game.update(1 / 30)
+        assert abs(game.sim_time - sim_time - 1) < 1e-9
+        shots = game.player_projectiles.spawned - spawned
+        assert abs(shots - game.players.fire_rate) <= 1
+    finally:
+        game.restore_slot(ring, 0)
+    assert not game.players.used_mask[shooter]
+
+def test_keyboard_is_sampled_by_the_renderer_and_applied_by_the_tick(game):
+    import ursina
+    players = game.players
+    slot = next(id_ for id_ in players.active_indices.tolist() if players.input_maps[id_] is not None)
+    fire_key = players.input_maps[slot]["fire"][1]
+    try:
+        ursina.held_keys[fire_key] = 1
+        players.sample_input()
+        ursina.held_keys[fire_key] = 0
+        # the simulation only sees the sample once its input stage runs
+        assert not players.fire_input[slot, 1]
+        players.read_input()
+        assert players.fire_input[slot, 1]
+    finally:
+        ursina.held_keys[fire_key] = 0
+        players.sample_input()
+        players.read_input()
+    assert not players.fire_input[slot].any()
@@ -0,0 +1,18 @@
+from include.metrics import MetricsRecorder
+from include.state import StateRing
+
+def test_frame_times_are_measured_not_the_tick_dt(game):
+    ring = StateRing(game.state_sources(), slots=1)
+    game.save_state(ring)
+    game.metrics = MetricsRecorder(publish_interval=1)
+    try:
+        for _ in range(5):
+            game.update(0.5)
+        frame_times = game.metrics.snapshot.frame_times
+        assert len(frame_times) == 5
+        # the tick dt would put every frame at 500 ms
+        assert (frame_times > 0).all() and (frame_times < 250).all()
+        assert game.metrics.snapshot.histograms["Enemies Update"][2] == 5
+    finally:
+        game.metrics = None
+        game.restore_slot(ring, 0)
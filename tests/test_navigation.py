@@ -0,0 +1,84 @@
+import heapq
+import numpy as np
+
+from include.collision import CollisionField
+from include.navigation import FlowField
+
+# a closed room split by a wall with a gap at the top, plus a pillar
+WALLS = [
+    ((0, 20), (40, 1)), ((0, -20), (40, 1)), ((20, 0), (1, 40)), ((-20, 0), (1, 40)),
+    ((0, -4), (2, 32)), ((-9, 8), (4, 6)), ((10, -10), (6, 3)),
+]
+
+def make_field() -> FlowField:
+    return FlowField(CollisionField(WALLS, cell_size=0.5))
+
+def dijkstra(field:FlowField, sources) -> np.ndarray:
+    """8-connected shortest paths over the walkable cells, diagonals may not cut corners"""
+    walkable = field.walkable.reshape(field.height, field.width)
+    def open_(x, y):
+        return 0 <= x < field.width and 0 <= y < field.height and walkable[y, x]
+    distance = np.full(field.width * field.height, np.inf)
+    heap = [(0.0, int(cell)) for cell in sources]
+    for cell in sources:
+        distance[cell] = 0
+    while heap:
+        d, cell = heapq.heappop(heap)
+        if d > distance[cell]:
+            continue
+        y, x = divmod(cell, field.width)
+        for dx in (-1, 0, 1):
+            for dy in (-1, 0, 1):
+                if not (dx or dy) or not open_(x + dx, y + dy):
+                    continue
+                if dx and dy and not (open_(x + dx, y) and open_(x, y + dy)):
+                    continue
+                step = d + np.hypot(dx, dy)
+                neighbor = (y + dy) * field.width + x + dx
+                if step < distance[neighbor]:
+                    distance[neighbor] = step
+                    heapq.heappush(heap, (step, neighbor))
+    return distance
+
+def test_distances_match_dijkstra():
+    field = make_field()
+    for targets in ([(-15, -15)], [(15, -15), (-15, 15)]):
+        assert field.update(np.array(targets))
+        expected = dijkstra(field, np.unique(field.cell_indices(np.array(targets))))
+        np.testing.assert_array_equal(np.isinf(field.distance), np.isinf(expected))
+        reachable = np.isfinite(expected)
+        np.testing.assert_allclose(field.distance[reachable], expected[reachable], atol=1e-9)
+
+def test_flow_descends_along_a_shortest_path():
+    field = make_field()
+    field.update(np.array([(-15, -15)]))
+    cells = np.flatnonzero(np.isfinite(field.distance) & (field.distance > 0))
+    flow = field.flow[cells]
+    assert np.allclose(np.linalg.norm(flow, axis=1), 1)
+    y, x = np.divmod(cells, field.width)
+    # unit offsets round back to the neighbour they point at
+    step = np.round(flow).astype(np.intp)
+    neighbors = (y + step[:, 1]) * field.width + x + step[:, 0]
+    # each step costs exactly what it takes off the remaining distance
+    np.testing.assert_allclose(field.distance[neighbors] + np.hypot(step[:, 0], step[:, 1]), field.distance[cells], atol=1e-9)
+    # unreachable cells have no flow
+    assert not field.flow[np.isinf(field.distance)].any()
+
+def test_update_only_recomputes_when_a_target_changes_cell():
+    field = make_field()
+    assert field.update(np.array([(-15.1, -15.1)]))
+    assert not field.update(np.array([(-15.2, -15.2)]))
+    assert field.update(np.array([(15, 15)]))
+    assert field.recomputes == 2
+
+def test_sample_steers_straight_when_close_or_off_the_field():
+    field = make_field()
+    target = np.array([-15.0, -15.0])
+    field.update(target[None])
+    positions = np.array([(-15.2, -14.6), (15, -15), (40, 40)])
+    directions = field.sample(positions, target)
+    straight = (target - positions) / np.linalg.norm(target - positions, axis=1, keepdims=True)
+    np.testing.assert_allclose(directions[[0, 2]], straight[[0, 2]], atol=1e-6)
+    # across the wall the field leads up towards the gap instead
+    assert directions[1, 1] > 0.5
+    np.testing.assert_allclose(np.linalg.norm(directions, axis=1), 1, atol=1e-6)
@@ -0,0 +1,110 @@
+import time
+import numpy as np
+
+from include.netcode import (
+    CHANNELS, NO_TICK, SNAPSHOT_HEADER, quantize, dequantize, encode_snapshot, decode_snapshot,
+    SnapshotServer, SnapshotClient,
+)
+
+def channels(seed:int, moved:float = 0.05) -> dict:
+    """Random render rows for every channel, `moved` the fraction of rows each seed changes from a shared base"""
+    base = np.random.default_rng(0)
+    rng = np.random.default_rng(seed)
+    out = {}
+    for name, (capacity, steps, _) in CHANNELS.items():
+        count = capacity // 2
+        rows = base.uniform(-50, 50, (capacity, len(steps)))
+        changed = rng.uniform(0, 1, capacity) < moved
+        rows[changed] = rng.uniform(-50, 50, (int(changed.sum()), len(steps)))
+        out[name] = (count, rows.astype(np.float32))
+    return out
+
+def assert_round_trip(decoded:dict, source:dict) -> None:
+    for name, (capacity, steps, _) in CHANNELS.items():
+        count, rows = source[name]
+        assert decoded[name].shape == (capacity, len(steps))
+        # every column is within half of its quantization step
+        assert np.all(np.abs(decoded[name][:count] - rows[:count]) <= steps / 2 + 1e-4)
+        # rows past the count are zero so they never show up in a delta
+        assert not decoded[name][count:].any()
+
+def test_full_snapshot_round_trip():
+    source = channels(1)
+    counts, arrays = quantize(source)
+    tick, decoded_counts, decoded = decode_snapshot(encode_snapshot(7, counts, arrays), {})
+    assert tick == 7 and decoded_counts == counts
+    for name in CHANNELS:
+        np.testing.assert_array_equal(decoded[name], arrays[name])
+    assert_round_trip({name: dequantize(name, decoded[name]) for name in CHANNELS}, source)
+
+def test_delta_snapshot_matches_full_and_is_smaller():
+    _, base = quantize(channels(1))
+    source = channels(2)
+    counts, arrays = quantize(source)
+    delta = encode_snapshot(8, counts, arrays, base, base_tick=7)
+    _, _, decoded = decode_snapshot(delta, {7: base})
+    for name in CHANNELS:
+        np.testing.assert_array_equal(decoded[name], arrays[name])
+    assert len(delta) < len(encode_snapshot(8, counts, arrays)) / 2
+
+def test_decode_rejects_unknown_bases_and_foreign_packets():
+    counts, arrays = quantize(channels(1))
+    assert decode_snapshot(encode_snapshot(8, counts, arrays, arrays, base_tick=7), {}) is None
+    packet = encode_snapshot(8, counts, arrays)
+    assert decode_snapshot(b"XXXX" + packet[4:], {}) is None
+    assert decode_snapshot(packet[:SNAPSHOT_HEADER.size - 1], {}) is None
+
+class Players:
+    """The slice of PlayerManager the server touches"""
+    def __init__(self):
+        self.move_input = np.zeros((4, 2))
+        self.fire_input = np.zeros((4, 4), dtype=bool)
+        self.spawned, self.despawned = [], []
+
+    def spawn(self):
+        self.spawned.append(len(self.spawned))
+        return self.spawned[-1]
+
+    def despawn(self, slot):
+        self.despawned.append(slot)
+
+def poll(receive, timeout:float = 2.0):
+    deadline = time.perf_counter() + timeout
+    while time.perf_counter() < deadline:
+        result = receive()
+        if result:
+            return result
+        time.sleep(0.005)
+    return None
+
+def test_server_and_client_exchange_snapshots_and_input():
+    players = Players()
+    server = SnapshotServer(players, port=0)
+    client = SnapshotClient(server.address)
+    try:
+        client.send_input(move=(1, -1), fire=(False, True, False, False))
+        assert poll(lambda: server.receive() or server.clients)
+        assert players.spawned == [0]
+        assert players.move_input[0].tolist() == [1, -1]
+        assert players.fire_input[0].tolist() == [False, True, False, False]
+
+        first = channels(1)
+        server.broadcast(1, first)
+        received = poll(client.receive)
+        assert client.tick == 1
+        assert_round_trip({name: rows for name, (_, rows) in received.items()}, first)
+
+        # once tick 1 is acked the next snapshot is a delta against it
+        client.send_input()
+        poll(lambda: server.receive() or next(iter(server.clients.values())).acked != NO_TICK)
+        full_bytes = next(iter(server.clients.values())).bytes_last
+        second = channels(2)
+        server.broadcast(2, second)
+        received = poll(client.receive)
+        assert client.tick == 2
+        assert next(iter(server.clients.values())).bytes_last < full_bytes
+        assert_round_trip({name: rows for name, (_, rows) in received.items()}, second)
+        assert {name: count for name, (count, _) in received.items()} == {name: count for name, (count, _) in second.items()}
+    finally:
+        client.close()
+        server.close()
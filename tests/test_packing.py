@@ -0,0 +1,79 @@
+import os
+import re
+import numpy as np
+
+from conftest import ROOT
+from include.packing import (
+    pack_drawables, unpack_drawables, pack_projectiles, unpack_projectiles, byte_report,
+    DRAWABLE_FLOATS, PROJECTILE_FLOATS,
+)
+
+GLSL_BYTES = {"uint": 4, "float": 4, "vec2": 8, "vec4": 16}
+# a half float keeps 11 significant bits
+HALF_TOLERANCE = 2 ** -10
+
+def struct_bytes(name:str) -> int:
+    """std430 size of a canvas.frag struct made of 4 byte aligned members"""
+    with open(os.path.join(ROOT, "shaders", "canvas.frag")) as f:
+        source = f.read()
+    body = re.search(r"struct %s \{(.*?)\};" % name, source, re.S).group(1)
+    return sum(GLSL_BYTES[kind] for kind in re.findall(r"^\s*(\w+)\s+\w+;", body, re.M))
+
+def drawable_rows(count:int, seed:int = 0) -> np.ndarray:
+    rng = np.random.default_rng(seed)
+    rows = np.zeros((count, DRAWABLE_FLOATS), dtype=np.float32)
+    rows[:, 0:2] = rng.uniform(-40, 40, (count, 2))
+    rows[:, 2] = rng.uniform(0.5, 8, count)
+    rows[:, 3] = rng.integers(0, 4, count)
+    rows[:, 4:8] = rng.uniform(0, 1, (count, 4))
+    rows[:, 8:10] = rng.uniform(1, 100, (count, 2))
+    rows[:, 10:12] = rows[:, 8:10] * rng.uniform(0, 1, (count, 2))
+    return rows
+
+def test_drawables_round_trip():
+    rows = drawable_rows(255)
+    unpacked = unpack_drawables(pack_drawables(rows))
+    assert unpacked.shape == rows.shape
+    np.testing.assert_allclose(unpacked[:, 0:4], rows[:, 0:4], rtol=HALF_TOLERANCE)
+    np.testing.assert_allclose(unpacked[:, 4:8], rows[:, 4:8], atol=0.5 / 255)
+    # health and shield travel as ratios of their maximum
+    np.testing.assert_allclose(unpacked[:, 10:12], rows[:, 10:12] / rows[:, 8:10], atol=0.5 / 65535 + 1e-6)
+
+def test_drawables_without_maximum_pack_empty_bars():
+    rows = drawable_rows(4)
+    rows[:, 8:10] = 0
+    unpacked = unpack_drawables(pack_drawables(rows))
+    assert np.all(unpacked[:, 10:12] == 0)
+
+def test_projectiles_round_trip():
+    rng = np.random.default_rng(1)
+    rows = np.zeros((255, PROJECTILE_FLOATS), dtype=np.float32)
+    rows[:, 0:2] = rng.uniform(-40, 40, (255, 2))
+    rows[:, 2] = rng.uniform(0.1, 2, 255)
+    # spawn stamps far past the float16 range
+    rows[:, 3] = rng.uniform(0, 100000, 255)
+    rows[:, 4:8] = rng.uniform(0, 1, (255, 4))
+    packed = pack_projectiles(rows)
+    assert not (packed[:, 1] >> 16).any()
+    unpacked = unpack_projectiles(packed)
+    np.testing.assert_allclose(unpacked[:, 0:3], rows[:, 0:3], rtol=HALF_TOLERANCE)
+    assert not unpacked[:, 3].any()
+    np.testing.assert_allclose(unpacked[:, 4:8], rows[:, 4:8], atol=0.5 / 255)
+
+def test_packers_fill_preallocated_output():
+    rows = drawable_rows(8)
+    out = np.zeros((16, 4), dtype=np.uint32)
+    pack_drawables(rows, out=out[:8])
+    np.testing.assert_array_equal(out[:8], pack_drawables(rows))
+    assert not out[8:].any()
+
+def test_byte_report_matches_shader_structs():
+    assert struct_bytes("Drawable") == DRAWABLE_FLOATS * 4
+    assert struct_bytes("Projectile") == PROJECTILE_FLOATS * 4
+    assert struct_bytes("PackedDrawable") == 16
+    assert struct_bytes("PackedProjectile") == 12
+    report = byte_report({"EnemyData": ("drawable", 255), "EnemyProjectileData": ("projectile", 255)})
+    assert report["EnemyData"] == {"rows": 255, "float_bytes": 255 * struct_bytes("Drawable"), "compact_bytes": 255 * struct_bytes("PackedDrawable")}
+    assert report["EnemyProjectileData"]["float_bytes"] == 255 * struct_bytes("Projectile")
+    assert report["EnemyProjectileData"]["compact_bytes"] == 255 * struct_bytes("PackedProjectile")
+    assert report["total"]["compact_bytes"] == 255 * (16 + 12)
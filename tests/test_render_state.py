@@ -0,0 +1,48 @@
+import numpy as np
+
+from include.render_state import RenderState, swap_staged
+
+class Node:
+    def __init__(self):
+        self.inputs = {}
+
+    def set_shader_input(self, name, value):
+        self.inputs[name] = value
+
+class Owner:
+    def __init__(self, capacity:int = 8):
+        self._buffer = np.zeros((capacity, 4), dtype=np.float32)
+        self._staging = np.zeros_like(self._buffer)
+        self._uploaded_count = -1
+        self.ssbo_generation = 0
+
+def test_unchanged_rows_keep_the_generation():
+    owner = Owner()
+    owner._staging[:3] = 1
+    assert swap_staged(owner, 3)
+    assert owner.ssbo_generation == 1
+    owner._staging[:3] = 1
+    assert not swap_staged(owner, 3)
+    assert owner.ssbo_generation == 1
+
+def test_changed_rows_or_count_bump_the_generation():
+    owner = Owner()
+    swap_staged(owner, 0)
+    owner._staging[:2] = 2
+    assert swap_staged(owner, 2)
+    np.testing.assert_array_equal(owner._buffer[:2], 2)
+    owner._staging[:2] = 2
+    owner._staging[1, 3] = 5
+    assert swap_staged(owner, 2)
+    owner._staging[:1] = owner._buffer[:1]
+    assert swap_staged(owner, 1)
+    assert owner.ssbo_generation == 4
+
+def test_set_ssbo_skips_the_bound_key():
+    class Buffer:
+        data_size_bytes = 64
+    state = RenderState(Node())
+    assert state.set_ssbo("EnemyData", Buffer(), (1, 0))
+    assert not state.set_ssbo("EnemyData", Buffer(), (1, 0))
+    assert state.set_ssbo("EnemyData", Buffer(), (1, 1))
+    assert (state.pushes, state.skipped, state.bytes_pushed) == (2, 1, 128)
@@ -0,0 +1,40 @@
+from include.resolution import ResolutionController
+
+BUDGET = 1000 / 60
+
+def feed(controller:ResolutionController, frame_ms:float, frames:int) -> list:
+    """Scales the controller switched to while observing `frames` equal frame times"""
+    return [scale for scale in (controller.observe(frame_ms) for _ in range(frames)) if scale is not None]
+
+def test_over_budget_steps_down_once_per_window_and_clamps():
+    controller = ResolutionController(budget_ms=BUDGET, min_scale=0.5, window=10)
+    assert feed(controller, BUDGET * 2, 9) == []
+    assert feed(controller, BUDGET * 2, 1) == [0.75]
+    # the history is cleared, the next step needs a full window at the new scale
+    assert feed(controller, BUDGET * 2, 9) == []
+    assert feed(controller, BUDGET * 2, 1) == [0.5]
+    assert feed(controller, BUDGET * 2, 50) == []
+    assert controller.scale == 0.5
+    assert controller.changes == 2
+
+def test_headroom_steps_up_and_clamps():
+    controller = ResolutionController(budget_ms=BUDGET, window=10, scale=0.25)
+    assert feed(controller, BUDGET * 0.5, 30) == [0.5, 0.75, 1.0]
+    assert feed(controller, BUDGET * 0.5, 50) == []
+    assert controller.scale == 1.0
+
+def test_between_headroom_and_budget_holds():
+    controller = ResolutionController(budget_ms=BUDGET, window=10, headroom=0.7, scale=0.5)
+    assert feed(controller, BUDGET * 0.85, 100) == []
+    assert controller.scale == 0.5
+
+def test_percentile_ignores_rare_spikes():
+    controller = ResolutionController(budget_ms=BUDGET, window=20, percentile=90)
+    frames = [BUDGET * 0.8] * 19 + [BUDGET * 5]
+    assert [controller.observe(ms) for ms in frames * 3].count(None) == 60
+    assert controller.scale == 1.0
+
+def test_recovers_after_load_drops():
+    controller = ResolutionController(budget_ms=BUDGET, window=10)
+    assert feed(controller, BUDGET * 1.5, 20) == [0.75, 0.5]
+    assert feed(controller, BUDGET * 0.6, 20) == [0.75, 1.0]
@@ -0,0 +1,48 @@
+import time
+import pytest
+
+from include.scheduler import Stage, StageScheduler
+
+def stages(ran:list) -> list:
+    """A fails, B depends on what A writes, C runs alongside A and outlasts it"""
+    def fail(dt):
+        ran.append("A")
+        raise ValueError("A")
+
+    def slow(dt):
+        time.sleep(0.05)
+        ran.append("C")
+
+    return [
+        Stage("A", fail, writes=("a",)),
+        Stage("C", slow, writes=("c",)),
+        Stage("B", lambda dt: ran.append("B"), reads=("a",), writes=("b",)),
+    ]
+
+@pytest.mark.parametrize("workers", [1, 2])
+def test_a_failed_stage_stops_its_dependents(workers):
+    ran = []
+    scheduler = StageScheduler(stages(ran), workers=workers)
+    try:
+        with pytest.raises(ValueError):
+            scheduler.run(1 / 60)
+    finally:
+        scheduler.shutdown()
+    assert "B" not in ran
+    if workers > 1:
+        # stages already running when A failed are drained, not abandoned
+        assert sorted(ran) == ["A", "C"]
+
+def test_independent_stages_overlap_and_dependents_wait():
+    order = []
+    scheduler = StageScheduler([
+        Stage("A", lambda dt: (time.sleep(0.05), order.append("A")), writes=("a",)),
+        Stage("C", lambda dt: order.append("C"), writes=("c",)),
+        Stage("B", lambda dt: order.append("B"), reads=("a",), writes=("b",)),
+    ], workers=2)
+    try:
+        scheduler.run(1 / 60)
+    finally:
+        scheduler.shutdown()
+    assert order == ["C", "A", "B"]
+    assert scheduler.critical_path == ["A", "B"]
@@ -0,0 +1,75 @@
+import numpy as np
+
+from include.collision import CollisionField
+from include.sight import LineOfSight
+
+# a closed 40 x 40 room with a few pillars and a dividing wall
+WALLS = [
+    ((0, 20), (40, 1)), ((0, -20), (40, 1)), ((20, 0), (1, 40)), ((-20, 0), (1, 40)),
+    ((0, 4), (2, 16)), ((-10, -8), (5, 3)), ((10, -9), (3, 6)), ((11, 11), (4, 4)),
+]
+
+def make_sight(capacity:int = 64) -> LineOfSight:
+    return LineOfSight(CollisionField(WALLS, cell_size=0.5), capacity)
+
+def segment_crosses_cell(origin, target, lo, hi) -> bool:
+    """Slab test, True when the segment passes through the open box lo..hi"""
+    direction = target - origin
+    enter, leave = 0.0, 1.0
+    for axis in range(2):
+        if direction[axis] == 0:
+            if not lo[axis] < origin[axis] < hi[axis]:
+                return False
+            continue
+        t0, t1 = sorted(((lo[axis] - origin[axis]) / direction[axis], (hi[axis] - origin[axis]) / direction[axis]))
+        enter, leave = max(enter, t0), min(leave, t1)
+    return enter < leave
+
+def brute_force(sight:LineOfSight, origin, target) -> bool:
+    """Visible unless a blocked cell other than the end cells lies on the segment"""
+    o, t = sight._grid(origin)[0], sight._grid(target)[0]
+    ends = {(int(np.floor(o[0])), int(np.floor(o[1]))), (int(np.floor(t[0])), int(np.floor(t[1])))}
+    for y, x in zip(*np.nonzero(sight.blocked)):
+        if (x, y) not in ends and segment_crosses_cell(o, t, np.array([x, y]), np.array([x + 1, y + 1])):
+            return False
+    return True
+
+def random_points(count:int, seed:int) -> np.ndarray:
+    return np.random.default_rng(seed).uniform(-19, 19, (count, 2))
+
+def test_trace_matches_brute_force():
+    sight = make_sight()
+    origins, targets = random_points(300, 0), random_points(300, 1)
+    visible = sight.trace(origins, targets)
+    expected = [brute_force(sight, origin, target) for origin, target in zip(origins, targets)]
+    assert visible.tolist() == expected
+    # the sample has to exercise both outcomes
+    assert 0 < visible.sum() < len(visible)
+
+def test_walls_block_and_open_space_does_not():
+    sight = make_sight()
+    origins = np.array([(-5, 5), (-5, 5), (5, -15), (-15, 15)])
+    targets = np.array([(5, 5), (-5, 15), (5, 15), (15, 15)])
+    # through the dividing wall, alongside it, past its end, along the top wall
+    assert sight.trace(origins, targets).tolist() == [False, True, True, True]
+    # a single target broadcasts against every origin
+    assert sight.trace(origins[:2], np.array([5.0, 5.0])).tolist() == [False, False]
+
+def test_cache_only_retraces_slots_whose_cells_moved():
+    sight = make_sight()
+    origins, targets = random_points(64, 2), random_points(64, 3)
+    slots = np.arange(64)
+    assert sight.visible(slots, origins, targets).tolist() == sight.trace(origins, targets).tolist()
+    # moving within the same cell reuses every cached result
+    nudged = np.floor(origins / 0.5) * 0.5 + 0.25
+    sight.invalidate()
+    sight.visible(slots, nudged, targets)
+    traced = sight.traced
+    sight.visible(slots, nudged + 0.1, targets)
+    assert sight.traced == traced
+    # moving a few slots to new cells traces just those
+    moved = nudged.copy()
+    moved[:5] = random_points(5, 4)
+    result = sight.visible(slots, moved, targets)
+    assert sight.traced - traced == np.count_nonzero(sight._cells(sight._grid(moved)) != sight._cells(sight._grid(nudged)))
+    assert result.tolist() == [brute_force(sight, origin, target) for origin, target in zip(moved, targets)]
@@ -0,0 +1,73 @@
+import numpy as np
+
+from include.state import StateRing
+from include.buttons import PLATE
+
+def test_restore_replays_enemy_lod_slots_and_bot_choices(game):
+    ring = StateRing(game.state_sources(), slots=3)
+    before = game.save_state(ring)
+    bot = game.players.spawn(position=(0, 0), bot=True)
+    try:
+        spawned = game.save_state(ring)
+
+        def run():
+            for _ in range(3):
+                game.update(1 / 60)
+            players = game.players
+            return game.enemies.lod_tick, players.move_input[bot].copy(), players.fire_input[bot].copy(), players._rng.random()
+
+        first = run()
+        # a later save moves every captured array past the first one
+        game.save_state(ring)
+        game.restore_slot(ring, spawned)
+        second = run()
+        assert first[0] == second[0]
+        np.testing.assert_array_equal(first[1], second[1])
+        np.testing.assert_array_equal(first[2], second[2])
+        assert first[3] == second[3]
+    finally:
+        game.restore_slot(ring, before)
+    assert not game.players.bots.any()
+
+def test_save_and_restore_stay_under_a_millisecond(game):
+    ring = StateRing(game.state_sources(), slots=1)
+    tick, sim_time = game.tick, game.sim_time
+    timings = ring.benchmark()
+    assert timings["bytes"] == ring.slot_bytes
+    assert timings["save_ms"] < 1.0
+    assert timings["restore_ms"] < 1.0
+    # the clock goes through the snapshot too, so the live game keeps its time
+    assert game.tick == tick
+    assert game.sim_time == sim_time
+
+def test_restore_keeps_trigger_occupancy_after_an_odd_number_of_ticks(game):
+    buttons, players = game.buttons, game.players
+    ring = StateRing(game.state_sources(), slots=2)
+    before = game.save_state(ring)
+    player = int(players.active_indices[0])
+    trigger = buttons.spawn(tuple(players.data[player, 0:2]), 2.0, PLATE)
+    occupant = (trigger, 0, player)
+
+    def events(pairs):
+        return {tuple(pair) for pair in pairs.tolist()}
+
+    try:
+        game.update(1 / 60)
+        assert occupant in events(buttons.entered)
+        saved = game.save_state(ring)
+        occupancy = buttons.occupancy.copy()
+        # the player leaves the plate for three ticks, then the save comes back
+        players.data[player, 0:2] += 50
+        game.update(1 / 60)
+        assert occupant in events(buttons.exited)
+        game.update(1 / 60)
+        game.update(1 / 60)
+        game.restore_slot(ring, saved)
+        np.testing.assert_array_equal(buttons.occupancy, occupancy)
+        game.update(1 / 60)
+        assert occupant in events(buttons.staying)
+        assert occupant not in events(buttons.entered)
+        assert occupant not in events(buttons.exited)
+    finally:
+        game.restore_slot(ring, before)
+    assert not buttons.used_mask[trigger]